@@ -136,12 +136,25 @@ function calculateRowAmount(row) {
 }
 
 // Function to convert number to words (Simplified placeholder as requested)
-function numberToWords(n) {
-    if (isNaN(n) || n === 0) return "zero euro, zero cents";
-    const [euros, cents = '00'] = String(n.toFixed(2)).split('.');
-    
-    // Placeholder logic for immediate update confirmation
-    return `${euros} euro and ${cents} cents`;
+// Amount in words is worded by the server (the same text it saves)
+let amountInWordsRequest = 0;
+function refreshAmountInWords(total) {
+    const el = document.getElementById('amountInWords');
+    const currencySelect = document.getElementById('currencySelect');
+    const requestId = ++amountInWordsRequest;
+    fetch('/api/amount-in-words', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ amount: total.toFixed(2), currency: currencySelect ? currencySelect.value : '' })
+    })
+        .then(response => response.json())
+        .then(result => {
+            // Ignore stale replies and manual edits made meanwhile
+            if (result.success && el && requestId === amountInWordsRequest && !amountInWordsManuallyEdited) {
+                el.value = result.words;
+            }
+        })
+        .catch(() => {});
 }
 
 
@@ -194,7 +207,7 @@ function updateTotals() {
     // Update Amount in Words based on Total Invoice Value
     // Only auto-update if user hasn't manually edited it
     if (!amountInWordsManuallyEdited && amountInWordsEl) {
-        amountInWordsEl.value = numberToWords(totalInvoiceValue);
+        refreshAmountInWords(totalInvoiceValue);
     }
 }
 
@@ -238,7 +251,10 @@ document.addEventListener('DOMContentLoaded', () => {
         const sym = (currencySelect && currencySymbolMap[currencySelect.value]) || '';
         document.querySelectorAll('.currency-display').forEach(el => el.textContent = sym);
     }
-    if (currencySelect) currencySelect.addEventListener('change', updateCurrencySymbols);
+    if (currencySelect) {
+        currencySelect.addEventListener('change', updateCurrencySymbols);
+        currencySelect.addEventListener('change', updateTotals);
+    }
 
     // Initialize with one empty row
     if (container) {
@@ -414,6 +430,7 @@ document.addEventListener('DOMContentLoaded', () => {
             consigneeAddress: document.getElementById('consigneeAddress').value,
             deliveryAddress: document.getElementById('deliveryAddress').value,
             amountInWords: document.getElementById('amountInWords').value,
+            amountInWordsManual: amountInWordsManuallyEdited,
             totalExportValue: document.getElementById('totalExportValue').value,
             totalGstValue: document.getElementById('totalGstValue').value,
             totalInvoiceValue: document.getElementById('totalInvoiceValue').value,
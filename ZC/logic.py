@@ -3,6 +3,9 @@ Logic module for ZC Exporter invoice processing
 Handles dynamic table row generation and data transformation
 """
 
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
 def calculate_middle_row(total_items):
     """
     Calculate the middle row index for displaying "AS ADDRESS"
@@ -149,3 +152,62 @@ def prepare_invoice_data(record):
     }
     
     return data
+
+
+# Item fields the amounts are computed from (as in ZC/add_script.js)
+PRICE_FIELDS = frozenset(('quantity', 'rate', 'igstPercent'))
+_CENT = Decimal('0.01')
+
+
+def _decimal(value):
+    try:
+        number = Decimal(str(value if value is not None else '').replace(',', '').strip())
+    except InvalidOperation:
+        return Decimal(0)
+    return number if number.is_finite() else Decimal(0)
+
+
+def price_item(item):
+    """
+    Item with amount, taxableValue and igstAmount computed from quantity,
+    rate and igstPercent (amount = quantity x rate, IGST on the amount)
+    """
+    amount = (_decimal(item.get('quantity')) * _decimal(item.get('rate'))).quantize(_CENT, ROUND_HALF_UP)
+    igst = (amount * _decimal(item.get('igstPercent')) / 100).quantize(_CENT, ROUND_HALF_UP)
+    return dict(item, amount=str(amount), taxableValue=str(amount), igstAmount=str(igst))
+
+
+def price_patch(stored, touched, removed):
+    """
+    Incremental totals for a patch of the items (see document_patch.py)
+
+    Touched items whose quantity, rate or IGST % changed (and new items) are
+    priced; the export and GST totals move by their differences.
+
+    Args:
+        stored (dict): Stored 'export' and 'gst' totals
+        touched (list): PatchResult.touched
+        removed (list): PatchResult.removed
+
+    Returns:
+        dict: 'items' ({position: item}) and 'export', 'gst', 'invoice' totals
+    """
+    items = {}
+    export = _decimal(stored.get('export'))
+    gst = _decimal(stored.get('gst'))
+    for position, item, original, fields in touched:
+        if '*' in fields or fields & PRICE_FIELDS:
+            item = price_item(item)
+        items[position] = item
+        if isinstance(original, dict):
+            export -= _decimal(original.get('amount'))
+            gst -= _decimal(original.get('igstAmount'))
+        export += _decimal(item.get('amount'))
+        gst += _decimal(item.get('igstAmount'))
+    for original in removed:
+        if isinstance(original, dict):
+            export -= _decimal(original.get('amount'))
+            gst -= _decimal(original.get('igstAmount'))
+    export = export.quantize(_CENT, ROUND_HALF_UP)
+    gst = gst.quantize(_CENT, ROUND_HALF_UP)
+    return {'items': items, 'export': str(export), 'gst': str(gst), 'invoice': str(export + gst)}
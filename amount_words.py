@@ -0,0 +1,188 @@
+"""
+Amount-in-words for invoices
+Words for 0-999 are precomputed once; larger numbers are assembled from
+those groups (Indian Lakh/Crore for INR, Thousand/Million/Billion otherwise).
+Conversions are cached on the normalized amount and currency.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+
+_ONES = ('', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine',
+         'Ten', 'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen',
+         'Seventeen', 'Eighteen', 'Nineteen')
+_TENS = ('', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety')
+
+
+def _build_below_thousand():
+    words = []
+    for n in range(1000):
+        hundreds, rest = divmod(n, 100)
+        parts = []
+        if hundreds:
+            parts.append(_ONES[hundreds] + ' Hundred')
+        if rest >= 20:
+            parts.append(_TENS[rest // 10] + (' ' + _ONES[rest % 10] if rest % 10 else ''))
+        elif rest:
+            parts.append(_ONES[rest])
+        words.append(' '.join(parts))
+    return tuple(words)
+
+
+# BELOW_THOUSAND[n] is the words for n (empty for 0)
+BELOW_THOUSAND = _build_below_thousand()
+
+_INTERNATIONAL_SCALES = ('', 'Thousand', 'Million', 'Billion', 'Trillion', 'Quadrillion')
+
+# Code -> (major singular, major plural, minor singular, minor plural, decimals, scale system)
+CURRENCIES = {
+    'INR': ('Rupee', 'Rupees', 'Paisa', 'Paise', 2, 'indian'),
+    'USD': ('Dollar', 'Dollars', 'Cent', 'Cents', 2, 'international'),
+    'EUR': ('Euro', 'Euros', 'Cent', 'Cents', 2, 'international'),
+    'KWD': ('Kuwaiti Dinar', 'Kuwaiti Dinars', 'Fils', 'Fils', 3, 'international'),
+}
+
+# Other spellings used by the forms
+CURRENCY_ALIASES = {'DINAR': 'KWD', 'DNR': 'KWD', 'RS': 'INR', 'RUPEES': 'INR'}
+
+DEFAULT_CURRENCY = 'INR'
+CACHE_SIZE = 4096
+
+
+def currency_code(currency):
+    """
+    Canonical currency code; blank means DEFAULT_CURRENCY
+
+    Raises:
+        ValueError: Unsupported currency
+    """
+    code = str(currency or '').strip().upper() or DEFAULT_CURRENCY
+    code = CURRENCY_ALIASES.get(code, code)
+    if code not in CURRENCIES:
+        raise ValueError(f"Unsupported currency '{currency}' (expected one of: {', '.join(CURRENCIES)})")
+    return code
+
+
+def _international(n):
+    parts = []
+    scale = 0
+    while n:
+        n, group = divmod(n, 1000)
+        if group:
+            if scale >= len(_INTERNATIONAL_SCALES):
+                raise ValueError('Amount is too large')
+            parts.append((BELOW_THOUSAND[group] + ' ' + _INTERNATIONAL_SCALES[scale]).strip())
+        scale += 1
+    return ' '.join(reversed(parts))
+
+
+def _indian(n):
+    parts = []
+    crore, n = divmod(n, 10_000_000)
+    if crore:
+        parts.append(_indian(crore) + ' Crore')
+    lakh, n = divmod(n, 100_000)
+    if lakh:
+        parts.append(BELOW_THOUSAND[lakh] + ' Lakh')
+    thousand, n = divmod(n, 1000)
+    if thousand:
+        parts.append(BELOW_THOUSAND[thousand] + ' Thousand')
+    if n:
+        parts.append(BELOW_THOUSAND[n])
+    return ' '.join(parts)
+
+
+def integer_in_words(n, system='international'):
+    """Words for a non-negative integer, e.g. 1770 -> 'One Thousand Seven Hundred Seventy'"""
+    if n == 0:
+        return 'Zero'
+    return _indian(n) if system == 'indian' else _international(n)
+
+
+def normalize_amount(amount, decimals):
+    """
+    Parse ``amount`` (number or string such as '1,770.50') to a Decimal with
+    ``decimals`` places, rounded half up
+
+    Raises:
+        ValueError: Not a finite number
+    """
+    if isinstance(amount, bool):
+        raise ValueError(f'Invalid amount: {amount!r}')
+    if isinstance(amount, float):
+        amount = repr(amount)
+    text = str(amount if amount is not None else '').replace(',', '').strip()
+    try:
+        value = Decimal(text)
+        if not value.is_finite():
+            raise InvalidOperation
+        # Raises InvalidOperation too when the amount exceeds Decimal precision
+        return value.quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount: {amount!r}')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_words(normalized, code):
+    major_one, major_many, minor_one, minor_many, decimals, system = CURRENCIES[code]
+    value = Decimal(normalized)
+    sign = 'Minus ' if value < 0 else ''
+    value = abs(value)
+    major = int(value)
+    minor = int((value - major).scaleb(decimals))
+
+    words = f'{integer_in_words(major, system)} {major_one if major == 1 else major_many}'
+    if minor:
+        words += f' and {integer_in_words(minor, system)} {minor_one if minor == 1 else minor_many}'
+    return sign + words
+
+
+def amount_in_words(amount, currency=None):
+    """
+    Amount in words with currency units
+
+    Args:
+        amount: Number or numeric string ('1770.5', '1,770.50')
+        currency (str): INR, USD, EUR, KWD (or an alias); blank means INR
+
+    Returns:
+        str: e.g. 'One Thousand Seven Hundred Seventy Euros and Fifty Cents'
+
+    Raises:
+        ValueError: Invalid amount or unsupported currency
+    """
+    code = currency_code(currency)
+    normalized = normalize_amount(amount, CURRENCIES[code][4])
+    return _cached_words(str(normalized), code)
+
+
+def amounts_in_words(amounts, currency=None):
+    """
+    Convert a whole column of amounts in one call
+
+    Returns:
+        list: Words for each amount, None where the amount is invalid
+
+    Raises:
+        ValueError: Unsupported currency
+    """
+    code = currency_code(currency)
+    decimals = CURRENCIES[code][4]
+    # Repeated values in a column are converted once, however full the LRU is
+    seen = {}
+    out = []
+    for amount in amounts:
+        try:
+            normalized = str(normalize_amount(amount, decimals))
+            words = seen.get(normalized)
+            if words is None:
+                words = seen[normalized] = _cached_words(normalized, code)
+        except ValueError:
+            words = None
+        out.append(words)
+    return out
+
+
+def cache_info():
+    info = _cached_words.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxSize': info.maxsize}
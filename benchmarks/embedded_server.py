@@ -0,0 +1,168 @@
+"""
+Embedded server benchmark: concurrent print and list requests
+
+Serves the app on a scratch database with werkzeug's single-threaded
+make_server() (what the desktop launcher used before) and with the
+PooledWSGIServer from embedded_server.py, then runs client threads for a
+fixed time: print clients load uncached packing list print pages, list
+clients fetch the list and detail APIs the view pages call, each client
+sending its requests back to back. Reports throughput and p50/p95
+latency per request kind.
+
+Usage:
+    python benchmarks/embedded_server.py [--duration 10] [--print-clients 2] [--list-clients 6]
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+SEED_PACKING_LISTS = 20
+SEED_INVOICES = 50
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def _packing_list(i, boxes):
+    # One item per box (Module A1 rows, Module B1 rows): a long printed list
+    return {
+        'packingListNo': f'PL-{i}', 'poNumber': f'PO-{i}', 'currency': 'USD',
+        'moduleAType': 'A1', 'moduleBType': 'B1',
+        'moduleA': [{'boxNumbers': str(n), 'description': 'Butterfly valve DN50', 'qty': 4,
+                     'l': '40', 'w': '30', 'h': '20', 'netWt': 12.5, 'grossWt': 14.0}
+                    for n in range(1, boxes + 1)],
+        'moduleB': [{'itemNumbers': str(n), 'boxNumber': str(n)} for n in range(1, boxes + 1)],
+    }
+
+
+def _seed(app):
+    client = app.test_client()
+    packing_ids = []
+    for i in range(SEED_PACKING_LISTS):
+        r = client.post('/api/packaging-list/create', json=_packing_list(i, 300))
+        packing_ids.append(r.get_json()['id'])
+    invoice_ids = []
+    for i in range(SEED_INVOICES):
+        r = client.post('/api/proforma-invoice/create', json={
+            'invoiceNo': f'PI-{i}', 'currency': 'USD',
+            'lineItems': [{'lineNo': n, 'partNumber': f'P{n}', 'description': 'Valve',
+                           'quantity': '2', 'unitRate': '1500', 'total': ''} for n in range(20)],
+        })
+        invoice_ids.append(r.get_json()['id'])
+    return packing_ids, invoice_ids
+
+
+def _client(port, paths, stop, results, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while not stop.is_set():
+        kind, path = rng.choice(paths)
+        t0 = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        results.append((kind, time.perf_counter() - t0, ok))
+    conn.close()
+
+
+def run(server_kind, app, packing_ids, invoice_ids, duration, print_clients, list_clients, threads):
+    from werkzeug.serving import make_server
+    from embedded_server import PooledWSGIServer
+
+    port = _free_port()
+    if server_kind == 'single':
+        server = make_server('127.0.0.1', port, app)
+    else:
+        server = PooledWSGIServer('127.0.0.1', port, app, threads=threads)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    print_paths = [('print', f'/packaging_list/print/{i}') for i in packing_ids]
+    list_paths = [('list', '/api/proforma-invoice?limit=50'), ('list', '/api/packaging-list?limit=50')]
+    list_paths += [('detail', f'/api/proforma-invoice/{i}') for i in invoice_ids]
+
+    stop = threading.Event()
+    results = []
+    clients = [threading.Thread(target=_client, args=(port, print_paths, stop, results, i))
+               for i in range(print_clients)]
+    clients += [threading.Thread(target=_client, args=(port, list_paths, stop, results, 100 + i))
+                for i in range(list_clients)]
+    for c in clients:
+        c.start()
+    time.sleep(duration)
+    stop.set()
+    for c in clients:
+        c.join()
+    server.shutdown()
+    if server_kind == 'single':
+        server.server_close()
+
+    rows = []
+    for kind in ('print', 'list', 'detail'):
+        times = [t for k, t, ok in results if k == kind and ok]
+        errors = sum(1 for k, _, ok in results if k == kind and not ok)
+        rows.append((server_kind, kind, len(times) / duration, _percentile(times, 50) * 1000,
+                     _percentile(times, 95) * 1000, errors))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per server')
+    parser.add_argument('--print-clients', type=int, default=2)
+    parser.add_argument('--list-clients', type=int, default=6)
+    parser.add_argument('--threads', type=int, default=4, help='pool size of the threaded server')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Scratch database; print pages are rendered on every request
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db').replace('\\', '/')
+        os.environ['PRINT_CACHE_SIZE'] = '0'
+        import logging
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        import main as app_module
+        with app_module.app.app_context():
+            app_module.init_database()
+        packing_ids, invoice_ids = _seed(app_module.app)
+
+        print(f'{args.print_clients} print clients / {args.list_clients} list clients, '
+              f'{args.duration:.0f}s per server')
+        print(f"{'server':<10}{'kind':<8}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for server_kind in ('single', 'pooled'):
+            for row in run(server_kind, app_module.app, packing_ids, invoice_ids, args.duration,
+                           args.print_clients, args.list_clients, args.threads):
+                print(f'{row[0]:<10}{row[1]:<8}{row[2]:>8.1f}{row[3]:>10.1f}{row[4]:>10.1f}{row[5]:>8}')
+        with app_module.app.app_context():
+            app_module.db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+JSON backend micro-benchmark: standard library vs orjson
+
+Times the three places the app encodes/decodes JSON, on payloads built
+from packing_list_b.json (the packing list Module B blob) scaled up to
+the size of a big packing list:
+
+  column write   db.JSON bind (SQLAlchemy default json.dumps vs json_codec.dumps)
+  column read    db.JSON result (json.loads vs json_codec.loads)
+  api response   jsonify body (Flask's provider vs FastJSONProvider), sorted keys
+
+Every backend's output is decoded and compared with the input first.
+
+Usage:
+    python benchmarks/json_backends.py [--scale 1 50 500] [--repeat 5]
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from flask.json.provider import DefaultJSONProvider
+
+import json_codec
+
+
+def _module_b(scale):
+    # packing_list_b.json with its items repeated ``scale`` times and the
+    # box numbers continued, as a long packing list would have them
+    with open(os.path.join(current_dir, 'packing_list_b.json'), encoding='utf-8') as f:
+        base = json.load(f)
+    hierarchies = []
+    offset = 0
+    for _ in range(scale):
+        last = offset
+        for h in base['itemHierarchies']:
+            h = copy.deepcopy(h)
+            h['itemNumber'] = str(len(hierarchies) + 1)
+            for b in h.get('associatedBoxes') or []:
+                if str(b.get('boxNo', '')).isdigit():
+                    b['boxNo'] = str(int(b['boxNo']) + offset)
+                    last = max(last, int(b['boxNo']))
+            hierarchies.append(h)
+        offset = last
+    return dict(base, itemHierarchies=hierarchies)
+
+
+def _api_response(module_b):
+    # Shape of a packing list detail response around the blob
+    return {
+        'id': 1,
+        'packingListNo': 'PL-2024-001',
+        'consigneeAddress': 'Al Shuwaikh Industrial Area\nKuwait',
+        'moduleB_data': module_b,
+        'status': 'Completed',
+        'createdAt': '2024-06-01',
+    }
+
+
+def _best(stmt, repeat, number):
+    return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number
+
+
+def run(scale, repeat):
+    module_b = _module_b(scale)
+    response = _api_response(module_b)
+    default = DefaultJSONProvider.default   # http dates, Decimal as str, ...
+
+    encoded = json.dumps(module_b)
+    cases = {
+        'column write': (lambda: json.dumps(module_b), lambda: json_codec.dumps(module_b)),
+        'column read': (lambda: json.loads(encoded), lambda: json_codec.loads(encoded)),
+        'api response': (
+            lambda: json.dumps(response, default=default, sort_keys=True, separators=(',', ':')),
+            lambda: json_codec.dumps_bytes(response, default=default, sort_keys=True),
+        ),
+    }
+    for name, (_, fast) in cases.items():
+        out = fast()
+        expected = module_b if name.startswith('column') else response
+        decoded = out if name == 'column read' else json.loads(out)
+        if decoded != expected:
+            raise SystemExit(f'{name}: {json_codec.BACKEND} output differs from the input')
+
+    number = max(1, 2000 // scale)
+    results = []
+    for name, (stdlib, fast) in cases.items():
+        slow = _best(stdlib, repeat, number)
+        quick = _best(fast, repeat, number)
+        results.append((name, slow * 1000, quick * 1000, slow / quick if quick else 0.0))
+    return len(encoded), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 50, 500],
+                        help='copies of the packing_list_b.json items per payload')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if json_codec.BACKEND != 'orjson':
+        print('orjson is not installed (or JSON_BACKEND=json); both columns use the standard library')
+    print(f"{'scale':>6}{'bytes':>10}  {'case':<14}{'json ms':>10}{json_codec.BACKEND + ' ms':>12}{'speedup':>9}")
+    for scale in args.scale:
+        size, results = run(scale, args.repeat)
+        for name, slow, quick, speedup in results:
+            print(f'{scale:>6}{size:>10}  {name:<14}{slow:>10.3f}{quick:>12.3f}{speedup:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Read/write concurrency benchmark for the SQLite storage profiles
+
+Runs reader threads (print-style lookups of a record with a JSON blob) and
+writer threads (create-style inserts, one commit each) against a scratch
+database, once with SQLite defaults ('legacy', the old configuration) and
+once with the 'production' profile, and reports throughput, p95 latency
+and "database is locked" errors.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--duration 5] [--readers 8] [--writers 2]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from sqlite_profile import PROFILES, apply_profile, pool_options_from_env
+
+SEED_ROWS = 2000
+
+
+def _payload(rng):
+    items = [{
+        'lineNo': i,
+        'partNumber': f'ZK-{rng.randint(1000, 9999)}',
+        'description': 'Butterfly valve DN50 with actuator',
+        'quantity': str(rng.randint(1, 50)),
+        'unitRate': f'{rng.uniform(10, 900):.2f}',
+    } for i in range(40)]
+    return json.dumps(items)
+
+
+def _make_engine(url, profile):
+    if profile == 'legacy':
+        # What main.py used before: engine defaults, no pragmas
+        return create_engine(url)
+    pragmas = PROFILES[profile]
+    engine = create_engine(url, **pool_options_from_env({}, pragmas, url))
+    apply_profile(engine, pragmas)
+    return engine
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def run(profile, duration, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = 'sqlite:///' + os.path.join(tmp, 'bench.db').replace('\\', '/')
+        engine = _make_engine(url, profile)
+        rng = random.Random(42)
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE docs (id INTEGER PRIMARY KEY, number VARCHAR(100), payload TEXT)'))
+            conn.execute(
+                text('INSERT INTO docs (number, payload) VALUES (:number, :payload)'),
+                [{'number': f'PI-{i}', 'payload': _payload(rng)} for i in range(SEED_ROWS)],
+            )
+
+        stop = threading.Event()
+        stats = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def reader(seed):
+            r = random.Random(seed)
+            local = []
+            errors = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        row = conn.execute(text('SELECT payload FROM docs WHERE id = :id'),
+                                           {'id': r.randint(1, SEED_ROWS)}).first()
+                        if row:
+                            json.loads(row[0])
+                except OperationalError:
+                    errors += 1
+                    continue
+                local.append(time.perf_counter() - t0)
+            with lock:
+                stats['read'].extend(local)
+                stats['errors'] += errors
+
+        def writer(seed):
+            r = random.Random(seed)
+            local = []
+            errors = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('INSERT INTO docs (number, payload) VALUES (:number, :payload)'),
+                                     {'number': f'NEW-{r.random()}', 'payload': _payload(r)})
+                except OperationalError:
+                    errors += 1
+                    continue
+                local.append(time.perf_counter() - t0)
+            with lock:
+                stats['write'].extend(local)
+                stats['errors'] += errors
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    return {
+        'profile': profile,
+        'reads_per_s': len(stats['read']) / duration,
+        'writes_per_s': len(stats['write']) / duration,
+        'read_p95_ms': _percentile(stats['read'], 95) * 1000,
+        'write_p95_ms': _percentile(stats['write'], 95) * 1000,
+        'errors': stats['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per profile')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f'{args.readers} readers / {args.writers} writers, {args.duration:.0f}s per profile')
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read p95 ms':>14}{'write p95 ms':>14}{'errors':>8}")
+    for profile in ('legacy', 'production'):
+        r = run(profile, args.duration, args.readers, args.writers)
+        print(f"{r['profile']:<12}{r['reads_per_s']:>10.0f}{r['writes_per_s']:>10.0f}"
+              f"{r['read_p95_ms']:>14.2f}{r['write_p95_ms']:>14.2f}{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Static asset build
+Copies every file under static/ to static/dist/ with a content hash in its
+name (logo.jpg -> logo.59b6000955.jpg), writes .gz (and .br, when the
+brotli package is installed) next to the text files, and records the
+mapping in static/dist/manifest.json. The app reads the manifest through
+AssetManifest: asset_url() in templates and rewrite() for the plain form
+pages point at the fingerprinted names, which are served as immutable.
+
+Usage:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional, .br files are skipped
+    brotli = None
+
+OUTPUT_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+
+# Text formats worth precompressing (images are already compressed)
+COMPRESS_EXTENSIONS = frozenset(('.css', '.js', '.html', '.json', '.svg', '.txt', '.map'))
+MIN_COMPRESS_SIZE = 1024
+
+# "/static/<path>" in src/href attributes and CSS url()
+_STATIC_URL_RE = re.compile(r'''(["'(])/static/([^"'()?#\s]+)''')
+
+
+def fingerprint_name(relpath, digest):
+    """'vendor/bootstrap/bootstrap.min.css' -> 'vendor/bootstrap/bootstrap.min.<hash>.css'"""
+    head, ext = os.path.splitext(relpath)
+    return f'{head}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def _source_files(static_dir):
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        if os.path.abspath(dirpath) == os.path.abspath(static_dir):
+            dirnames[:] = [d for d in dirnames if d != OUTPUT_DIR]
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            yield os.path.relpath(path, static_dir).replace(os.sep, '/'), path
+
+
+def _write_if_changed(path, data):
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def build(static_dir):
+    """
+    Build static/dist/ from static/
+
+    Unchanged outputs are not rewritten, and files left over from earlier
+    builds are removed.
+
+    Returns:
+        dict: Manifest (source path -> fingerprinted path, relative to static/)
+    """
+    out_dir = os.path.join(static_dir, OUTPUT_DIR)
+    manifest = {}
+    written = set()
+    for relpath, path in _source_files(static_dir):
+        with open(path, 'rb') as f:
+            data = f.read()
+        target = fingerprint_name(relpath, hashlib.sha256(data).hexdigest())
+        manifest[relpath] = f'{OUTPUT_DIR}/{target}'
+        out_path = os.path.join(out_dir, *target.split('/'))
+        _write_if_changed(out_path, data)
+        written.add(out_path)
+
+        if os.path.splitext(relpath)[1].lower() in COMPRESS_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+            _write_if_changed(out_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            written.add(out_path + '.gz')
+            if brotli is not None:
+                _write_if_changed(out_path + '.br', brotli.compress(data, quality=11))
+                written.add(out_path + '.br')
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    _write_if_changed(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    written.add(manifest_path)
+
+    for dirpath, _, filenames in os.walk(out_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if path not in written:
+                os.remove(path)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Fingerprinted URLs from static/dist/manifest.json; without a build every
+    URL stays as it is
+
+    Args:
+        static_dir (str): The app's static folder
+        url_prefix (str): URL the static folder is served under
+        watch (bool): Reload the manifest when it changes on disk
+    """
+
+    def __init__(self, static_dir, url_prefix='/static', watch=False):
+        self.path = os.path.join(static_dir, OUTPUT_DIR, MANIFEST_NAME)
+        self.url_prefix = url_prefix
+        self.watch = watch
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns == self._mtime_ns:
+            return
+        entries = {}
+        if mtime_ns is not None:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        with self._lock:
+            self._entries, self._mtime_ns = entries, mtime_ns
+
+    def url(self, path):
+        """asset_url('logo.jpg') -> '/static/dist/logo.<hash>.jpg'"""
+        if self.watch:
+            self._load()
+        path = path.lstrip('/')
+        return f'{self.url_prefix}/{self._entries.get(path, path)}'
+
+    def rewrite(self, html):
+        """Point the "/static/..." URLs of an HTML page at the fingerprinted files"""
+        if self.watch:
+            self._load()
+        entries = self._entries
+        if not entries:
+            return html
+        was_bytes = isinstance(html, bytes)
+        text = html.decode('utf-8') if was_bytes else html
+
+        def _replace(m):
+            target = entries.get(m.group(2))
+            return f'{m.group(1)}{self.url_prefix}/{target}' if target else m.group(0)
+
+        text = _STATIC_URL_RE.sub(_replace, text)
+        return text.encode('utf-8') if was_bytes else text
+
+
+def main():
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    manifest = build(static_dir)
+    for source, target in sorted(manifest.items()):
+        print(f'{source} -> {target}')
+    if brotli is None:
+        print('brotli is not installed; only .gz variants were written', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
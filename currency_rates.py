@@ -0,0 +1,134 @@
+"""
+INR -> invoice currency rates
+Rates live in the currency_rate table with an effective date; RateBook is
+the in-process read-through cache in front of it. Lookups are dict hits;
+the whole table is reloaded when the TTL expires, when a future rate
+becomes effective, or after invalidate() (called on every write).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Rates used to seed an empty table (the divisors the forms always used)
+DEFAULT_RATES = {'USD': Decimal('90'), 'KWD': Decimal('286')}
+
+# Other spellings used by the forms
+CURRENCY_ALIASES = {'DINAR': 'KWD', 'DNR': 'KWD'}
+
+BASE_CURRENCY = 'INR'
+
+Rate = namedtuple('Rate', 'id currency divisor effective_from')
+
+# INR itself, and any currency without a rate, converts 1:1
+UNIT_RATE = Rate(None, BASE_CURRENCY, Decimal('1'), None)
+
+
+def rate_code(currency):
+    """Canonical code used in the rate table ('dinar' -> 'KWD')"""
+    code = str(currency or '').strip().upper()
+    return CURRENCY_ALIASES.get(code, code)
+
+
+def legacy_rate(currency):
+    """Rate of invoices saved before the rate table: DEFAULT_RATES, else 1:1"""
+    code = rate_code(currency)
+    if code in DEFAULT_RATES:
+        return Rate(None, code, DEFAULT_RATES[code], None)
+    return UNIT_RATE
+
+
+def parse_divisor(value):
+    """
+    Raises:
+        ValueError: Not a positive number
+    """
+    try:
+        divisor = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Invalid rate: {value!r}')
+    if not divisor.is_finite() or divisor <= 0:
+        raise ValueError(f'Invalid rate: {value!r}')
+    return divisor
+
+
+class RateBook:
+    """
+    Read-through cache of the rate table
+
+    Args:
+        loader (callable): Returns every rate row as (id, currency, divisor,
+            effective_from); called with the cache lock held
+        ttl (float): Seconds before the table is read again; 0 reads it on
+            every lookup
+    """
+
+    def __init__(self, loader, ttl=300.0):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._current = None      # code -> Rate effective now
+        self._by_id = {}
+        self._expires = 0.0
+        self.loads = 0
+
+    def _load(self):
+        now = datetime.now()
+        current = {}
+        by_id = {}
+        next_change = None
+        for row_id, currency, divisor, effective_from in self.loader():
+            rate = Rate(row_id, rate_code(currency), Decimal(str(divisor)), effective_from)
+            by_id[row_id] = rate
+            if effective_from is not None and effective_from > now:
+                next_change = effective_from if next_change is None else min(next_change, effective_from)
+                continue
+            best = current.get(rate.currency)
+            if best is None or (effective_from or datetime.min, row_id) > (best.effective_from or datetime.min, best.id):
+                current[rate.currency] = rate
+
+        expires = time.monotonic() + self.ttl
+        if next_change is not None:
+            expires = min(expires, time.monotonic() + max((next_change - now).total_seconds(), 0.0))
+        self._current, self._by_id, self._expires = current, by_id, expires
+        self.loads += 1
+
+    def _table(self):
+        current = self._current
+        if current is not None and time.monotonic() < self._expires:
+            return current, self._by_id
+        with self._lock:
+            if self._current is None or time.monotonic() >= self._expires:
+                self._load()
+            return self._current, self._by_id
+
+    def current(self, currency):
+        """Rate effective now for ``currency``; UNIT_RATE for INR and unknown codes"""
+        current, _ = self._table()
+        return current.get(rate_code(currency), UNIT_RATE)
+
+    def get(self, rate_id):
+        """Rate by id (None when unknown); an id the cached table does not
+        have yet (added by another process) reloads it once"""
+        _, by_id = self._table()
+        rate = by_id.get(rate_id)
+        if rate is None and rate_id is not None:
+            self.invalidate()
+            _, by_id = self._table()
+            rate = by_id.get(rate_id)
+        return rate
+
+    def invalidate(self):
+        with self._lock:
+            self._current = None
+            self._by_id = {}
+            self._expires = 0.0
+
+    def stats(self):
+        return {
+            'ttl': self.ttl,
+            'loads': self.loads,
+            'rates': {code: str(rate.divisor) for code, rate in (self._current or {}).items()},
+        }
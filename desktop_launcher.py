@@ -1,13 +1,92 @@
+import time
+
+# Taken before anything heavy is imported; every phase is measured from here
+_LAUNCH_PERF = time.perf_counter()
+_LAUNCH_WALL = time.time()
+
+import html
+import json
+import multiprocessing
 import socket
 import threading
 import os
 import sys
+import urllib.request
 import webbrowser
 
 import webview
-from werkzeug.serving import make_server
 
-from main import app, db
+from embedded_server import PooledWSGIServer
+
+SPLASH_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><style>
+html, body { height: 100%; margin: 0; font-family: "Segoe UI", Arial, sans-serif; background: #f8f9fa; color: #495057; }
+body { display: flex; flex-direction: column; align-items: center; justify-content: center; }
+.spinner { width: 36px; height: 36px; border: 4px solid #dee2e6; border-top-color: #0d6efd; border-radius: 50%; animation: spin 0.8s linear infinite; }
+@keyframes spin { to { transform: rotate(360deg); } }
+p { margin-top: 16px; font-size: 15px; }
+</style></head>
+<body><div class="spinner"></div><p>Starting Report Generation&hellip;</p></body></html>
+"""
+
+
+class _StartupTimer:
+    """Per-phase launch timings, appended to the startup log as one JSON line per launch.
+
+    Phases run on two threads (window on the GUI thread, the rest on the
+    startup thread), so each one is timed from its own start.
+    """
+
+    def __init__(self) -> None:
+        self.phases = {}
+        unpack = _unpack_seconds()
+        if unpack is not None:
+            self.phases["unpack"] = round(unpack, 3)
+
+    def record(self, phase: str, started: float) -> float:
+        now = time.perf_counter()
+        self.phases[phase] = round(now - started, 3)
+        return now
+
+    def write(self, error: str | None = None) -> None:
+        record = {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(_LAUNCH_WALL)),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "phases": self.phases,
+            "total": round(time.perf_counter() - _LAUNCH_PERF + self.phases.get("unpack", 0.0), 3),
+        }
+        if error:
+            record["error"] = error
+        path = _startup_log_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not write startup log {path}: {e}", file=sys.stderr)
+
+
+def _unpack_seconds() -> float | None:
+    # One-file builds extract to sys._MEIPASS before Python starts; the
+    # directory's creation time approximates the start of the extraction
+    meipass = getattr(sys, "_MEIPASS", None)
+    if not meipass:
+        return None
+    try:
+        created = os.stat(meipass).st_ctime
+    except OSError:
+        return None
+    return max(0.0, _LAUNCH_WALL - created)
+
+
+def _startup_log_path() -> str:
+    override = os.environ.get("STARTUP_LOG", "").strip()
+    if override:
+        return override
+    if getattr(sys, "frozen", False):
+        appdata_dir = os.environ.get("APPDATA") or os.path.expanduser("~")
+        return os.path.join(appdata_dir, "ReportGeneration", "startup.log")
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup.log")
 
 
 def _get_free_port() -> int:
@@ -17,9 +96,16 @@ def _get_free_port() -> int:
 
 
 class _ServerThread(threading.Thread):
-    def __init__(self, host: str, port: int):
+    def __init__(self, app, host: str, port: int):
         super().__init__(daemon=True)
-        self._server = make_server(host, port, app)
+        # Worker pool so a slow print render does not hold up the API fetches
+        self._server = PooledWSGIServer(
+            host,
+            port,
+            app,
+            threads=int(os.environ.get("SERVER_THREADS", "4")),
+            queue_limit=int(os.environ.get("SERVER_QUEUE_LIMIT", "64")),
+        )
 
     def run(self) -> None:
         self._server.serve_forever()
@@ -55,7 +141,61 @@ class _JsApi:
         return webbrowser.open(url)
 
 
+class _Startup(threading.Thread):
+    """Imports the app, prepares the database and starts the server off the GUI thread."""
+
+    def __init__(self, timer: _StartupTimer, host: str):
+        super().__init__(daemon=True)
+        self.timer = timer
+        self.host = host
+        self.url = None
+        self.server = None
+        self.pdf_renderer = None
+        self.error = None
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        try:
+            started = time.perf_counter()
+            import main as app_module
+            started = self.timer.record("imports", started)
+
+            with app_module.app.app_context():
+                app_module.init_database()
+            self.pdf_renderer = app_module.pdf_renderer
+            started = self.timer.record("db_init", started)
+
+            port = _get_free_port()
+            self.server = _ServerThread(app_module.app, self.host, port)
+            self.server.start()
+            self.url = f"http://{self.host}:{port}/"
+            # Also warms the home page for the window
+            with urllib.request.urlopen(self.url, timeout=30) as r:
+                r.read()
+            self.timer.record("first_response", started)
+            self.timer.record("ready", _LAUNCH_PERF)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.done.set()
+
+
+def _show_app(window, startup: _Startup) -> None:
+    # Runs on pywebview's worker thread once the splash window is up
+    startup.done.wait()
+    if startup.error:
+        startup.timer.write(startup.error)
+        window.load_html(f"<p style='font-family: Arial, sans-serif; margin: 24px'>"
+                         f"Report Generation could not start.<br><br>{html.escape(startup.error)}</p>")
+        return
+    window.load_url(startup.url)
+    startup.timer.write()
+
+
 def main() -> None:
+    timer = _StartupTimer()
+    timer.record("launcher_imports", _LAUNCH_PERF)
+
     root = os.path.dirname(os.path.abspath(__file__))
     required_assets = [
         os.path.join(root, "static", "vendor", "bootstrap", "bootstrap.min.css"),
@@ -69,31 +209,33 @@ def main() -> None:
             print(f"Missing: {p}", file=sys.stderr)
         raise SystemExit(1)
 
-    with app.app_context():
-        db.create_all()
-
-    host = "127.0.0.1"
-    port = _get_free_port()
-
-    server_thread = _ServerThread(host, port)
-    server_thread.start()
+    # The app import and database work run while the splash is on screen
+    startup = _Startup(timer, "127.0.0.1")
+    startup.start()
+    window_started = time.perf_counter()
 
     js_api = _JsApi()
 
     window = webview.create_window(
         "Report Generation",
-        f"http://{host}:{port}/",
+        html=SPLASH_HTML,
         width=1200,
         height=800,
         resizable=True,
         js_api=js_api,
     )
+    timer.record("window", window_started)
 
     try:
-        webview.start()
+        webview.start(_show_app, (window, startup))
     finally:
-        server_thread.shutdown()
+        if startup.server is not None:
+            startup.server.shutdown()
+        if startup.pdf_renderer is not None:
+            startup.pdf_renderer.shutdown()
 
 
 if __name__ == "__main__":
+    # PDF worker processes re-launch the frozen executable
+    multiprocessing.freeze_support()
     main()
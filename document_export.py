@@ -0,0 +1,220 @@
+"""
+Streaming export of packing lists, proforma invoices and ZC invoices
+Every document is flattened to one row per line item (header columns
+repeated on each row) and written as CSV, NDJSON or XLSX chunk by chunk,
+so the whole table is never held in memory
+"""
+
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime
+
+from json_codec import dumps
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+except ImportError:  # XLSX export is optional
+    Workbook = None
+    ILLEGAL_CHARACTERS_RE = None
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# Document kind -> header columns (table column names), item columns and the
+# JSON column holding the line items. Item columns are keys of the stored
+# item dicts; for packing lists, one row per item and associated box range.
+EXPORT_SPECS = {
+    'packaging_list': {
+        'columns': (
+            'id', 'packingListNo', 'date', 'poNumber', 'consigneeAddress', 'deliveryAddress',
+            'exporterAddress', 'loadingPort', 'dischargePort', 'hsCode', 'taxNumber', 'currency',
+            'total_net_weight', 'total_gross_weight', 'status', 'created_at',
+        ),
+        'source': 'moduleB_data',
+        'items': (
+            'itemNumber', 'relationship', 'boxNo', 'boxCount', 'description', 'qty',
+            'l', 'w', 'h', 'netWt', 'grossWt',
+        ),
+    },
+    'proforma_invoice': {
+        'columns': (
+            'id', 'invoice_no', 'invoice_date', 'po_wo_number', 'our_ref_no', 'your_reference_no',
+            'supplier_address', 'bill_to_address', 'currency', 'total_amount', 'advance_amount',
+            'receivable_amount', 'received_amount', 'balance_amount', 'country_of_origin',
+            'port_of_embarkation', 'port_of_discharge', 'status', 'created_at', 'updated_at',
+        ),
+        'source': 'line_items',
+        'items': ('lineNo', 'partNumber', 'description', 'quantity', 'unitRate', 'total'),
+    },
+    'zc_exporter': {
+        'columns': (
+            'id', 'invoice_number', 'invoice_date', 'buyer_order_number', 'buyer_order_date',
+            'exporter_reference', 'iec_number', 'currency', 'port_of_loading', 'port_of_discharge',
+            'port_of_destination', 'final_destination', 'hs_code', 'consignee_address',
+            'delivery_address', 'amount_in_words', 'total_export_value', 'total_gst_value',
+            'total_invoice_value', 'number_of_boxes', 'status', 'created_at', 'updated_at',
+        ),
+        'source': 'items',
+        'items': (
+            'from', 'to', 'description', 'unit', 'quantity', 'rate', 'amount',
+            'taxableValue', 'igstPercent', 'igstAmount',
+        ),
+    },
+}
+
+CHUNK_ROWS = 500            # rows buffered per CSV/NDJSON chunk
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def export_header(kind):
+    """Column names of the flattened export: header columns, then item_<key> columns"""
+    spec = EXPORT_SPECS[kind]
+    return list(spec['columns']) + ['item_' + key for key in spec['items']]
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _packing_items(module_b):
+    if not isinstance(module_b, dict):
+        return
+    for h in module_b.get('itemHierarchies') or []:
+        if not isinstance(h, dict):
+            continue
+        boxes = [b for b in h.get('associatedBoxes') or [] if isinstance(b, dict)]
+        if not boxes:
+            yield {'itemNumber': h.get('itemNumber'), 'relationship': h.get('relationship')}
+            continue
+        for b in boxes:
+            dims = b.get('dimensions') if isinstance(b.get('dimensions'), dict) else {}
+            weights = b.get('weights') if isinstance(b.get('weights'), dict) else {}
+            yield {
+                'itemNumber': h.get('itemNumber'),
+                'relationship': h.get('relationship'),
+                'boxNo': b.get('boxNo'),
+                'boxCount': b.get('boxCount'),
+                'description': b.get('description'),
+                'qty': b.get('qty'),
+                'l': dims.get('l'),
+                'w': dims.get('w'),
+                'h': dims.get('h'),
+                'netWt': weights.get('net'),
+                'grossWt': weights.get('gross'),
+            }
+
+
+def _line_items(items):
+    for it in items or []:
+        if isinstance(it, dict):
+            yield it
+
+
+def flatten(kind, record):
+    """
+    Flatten one record to export rows
+
+    Args:
+        kind (str): 'packaging_list', 'proforma_invoice' or 'zc_exporter'
+        record (Mapping): Row mapping with the spec's columns and item source
+
+    Yields:
+        list: One row per line item; a record without items yields one row
+        with empty item columns
+    """
+    spec = EXPORT_SPECS[kind]
+    head = [_cell(record.get(col)) for col in spec['columns']]
+    source = record.get(spec['source'])
+    items = _packing_items(source) if kind == 'packaging_list' else _line_items(source)
+    empty = True
+    for item in items:
+        empty = False
+        yield head + [_cell(item.get(key)) for key in spec['items']]
+    if empty:
+        yield head + [None] * len(spec['items'])
+
+
+def csv_chunks(header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow(['' if v is None else v for v in row])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
+
+
+def ndjson_chunks(header, rows):
+    lines = []
+    for row in rows:
+        lines.append(dumps(dict(zip(header, row)), default=str))
+        if len(lines) >= CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _xlsx_value(value):
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def xlsx_chunks(header, rows, title='Export'):
+    """
+    Write-only workbook: openpyxl spools each appended row to a temporary
+    file, so memory stays flat; the finished file is then streamed in chunks
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])
+    ws.append(header)
+    for row in rows:
+        ws.append([_xlsx_value(v) for v in row])
+    with tempfile.TemporaryFile() as out:
+        wb.save(out)
+        out.seek(0)
+        while True:
+            chunk = out.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_chunks(fmt, kind, records):
+    """
+    Chunks of the export file for ``records`` (an iterable of row mappings)
+
+    Raises:
+        ValueError: Unknown format
+        RuntimeError: XLSX requested but openpyxl is not installed
+    """
+    header = export_header(kind)
+    rows = (row for record in records for row in flatten(kind, record))
+    if fmt == 'csv':
+        return csv_chunks(header, rows)
+    if fmt == 'ndjson':
+        return ndjson_chunks(header, rows)
+    if fmt == 'xlsx':
+        if Workbook is None:
+            raise RuntimeError('XLSX export requires openpyxl (pip install openpyxl)')
+        return xlsx_chunks(header, rows, title=kind)
+    raise ValueError(f"Unknown export format '{fmt}' (expected one of: {', '.join(EXPORT_FORMATS)})")
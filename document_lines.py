@@ -0,0 +1,140 @@
+"""
+Relational copies of the line items stored as JSON
+Proforma invoice lines, ZC invoice lines and packing list boxes are also
+written to child tables (see the *Line/*Box models in main.py) so
+cross-document totals run as SQL GROUP BY. The JSON columns stay the
+source of truth; the rows are rebuilt from them on every create/update.
+"""
+
+import math
+
+from packaging_list.box_ranges import RangeSet
+
+
+def parse_number(value):
+    # Lenient numeric parse for aggregates; blank or unparseable -> None
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value) if isinstance(value, (int, float)) else float(str(value).replace(',', '').strip())
+    except (ValueError, OverflowError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _box_number(value):
+    numbers = RangeSet.parse(value).intervals
+    return numbers[0][0] if numbers else None
+
+
+def _text(value, limit=None):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text[:limit] if limit else text
+
+
+def proforma_invoice_lines(line_items):
+    rows = []
+    for position, it in enumerate(line_items or []):
+        if not isinstance(it, dict):
+            continue
+        rows.append({
+            'position': position,
+            'line_no': _text(it.get('lineNo'), 50),
+            'part_number': _text(it.get('partNumber'), 100),
+            'description': _text(it.get('description')),
+            'quantity': parse_number(it.get('quantity')),
+            'unit_rate': parse_number(it.get('unitRate')),
+            'total': parse_number(it.get('total')),
+        })
+    return rows
+
+
+def zc_exporter_lines(items, hs_code):
+    rows = []
+    for position, it in enumerate(items or []):
+        if not isinstance(it, dict):
+            continue
+        rows.append({
+            'position': position,
+            'box_from': _box_number(it.get('from')),
+            'box_to': _box_number(it.get('to')),
+            'description': _text(it.get('description')),
+            'unit': _text(it.get('unit'), 50),
+            'quantity': parse_number(it.get('quantity')),
+            'rate': parse_number(it.get('rate')),
+            'amount': parse_number(it.get('amount')),
+            'taxable_value': parse_number(it.get('taxableValue')),
+            'igst_percent': parse_number(it.get('igstPercent')),
+            'igst_amount': parse_number(it.get('igstAmount')),
+            'hs_code': _text(it.get('hsCode') or hs_code, 100),
+        })
+    return rows
+
+
+def packing_list_boxes(module_b, hs_code):
+    """
+    One row per item and associated box range, as on the printed packing
+    list; weights are per box, so a range weighs weight x box_count
+    """
+    rows = []
+    if not isinstance(module_b, dict):
+        return rows
+    for h in module_b.get('itemHierarchies') or []:
+        if not isinstance(h, dict):
+            continue
+        for b in h.get('associatedBoxes') or []:
+            if not isinstance(b, dict):
+                continue
+            boxes = RangeSet.parse(b.get('boxNo'))
+            dims = b.get('dimensions') if isinstance(b.get('dimensions'), dict) else {}
+            weights = b.get('weights') if isinstance(b.get('weights'), dict) else {}
+            rows.append({
+                'position': len(rows),
+                'item_number': _text(h.get('itemNumber'), 100),
+                'relationship': _text(h.get('relationship'), 20),
+                'box_no': _text(b.get('boxNo')),
+                'box_start': boxes.intervals[0][0] if boxes.intervals else None,
+                'box_end': boxes.intervals[-1][1] if boxes.intervals else None,
+                'box_count': int(parse_number(b.get('boxCount')) or 1),
+                'description': _text(b.get('description')),
+                'qty': parse_number(b.get('qty')),
+                'length': parse_number(dims.get('l')),
+                'width': parse_number(dims.get('w')),
+                'height': parse_number(dims.get('h')),
+                'net_weight': parse_number(weights.get('net')),
+                'gross_weight': parse_number(weights.get('gross')),
+                'hs_code': _text(hs_code, 100),
+            })
+    return rows
+
+
+def document_lines(kind, record, positions=None):
+    """
+    Child rows of a record
+
+    Args:
+        kind (str): 'packaging_list', 'proforma_invoice' or 'zc_exporter'
+        record: PackagingList, ProformaInvoice or ZCExporter instance
+        positions (iterable): Only the rows of these line positions
+            (proforma invoice and ZC lines); None for every row
+
+    Returns:
+        list: Column dicts for the kind's child table (without the parent id)
+    """
+    if kind == 'packaging_list':
+        return packing_list_boxes(record.moduleB_data, record.hsCode)
+    if kind == 'proforma_invoice':
+        build, items = proforma_invoice_lines, record.line_items
+    elif kind == 'zc_exporter':
+        build, items = (lambda lines: zc_exporter_lines(lines, record.hs_code)), record.items
+    else:
+        raise ValueError(f'Unknown document kind: {kind}')
+    if positions is None:
+        return build(items)
+    rows = []
+    for position in positions:
+        for row in build(items[position:position + 1]):
+            rows.append(dict(row, position=position))
+    return rows
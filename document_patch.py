@@ -0,0 +1,191 @@
+"""
+JSON-Patch style partial updates
+Operations (RFC 6902 subset: add, remove, replace, test) address header
+fields by payload name ("/invoiceNo") and line items by index
+("/lineItems/12/quantity", "/lineItems/-" to append). The patch is applied
+to copies; the caller then reprices only the lines that were touched.
+"""
+
+OPS = ('add', 'remove', 'replace', 'test')
+
+
+class PatchError(ValueError):
+    """Invalid patch document or an operation that cannot be applied"""
+
+
+def parse_pointer(path):
+    """
+    Split a JSON pointer into reference tokens ('/a~1b/0' -> ['a/b', '0'])
+
+    Raises:
+        PatchError: Not a JSON pointer
+    """
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise PatchError(f'Invalid path: {path!r}')
+    return [t.replace('~1', '/').replace('~0', '~') for t in path[1:].split('/')]
+
+
+def parse_operations(body):
+    """
+    Validate a patch body: a list of operations or {"operations": [...]}
+
+    Returns:
+        list: (op, tokens, value) tuples
+
+    Raises:
+        PatchError: Malformed body or operation
+    """
+    if isinstance(body, dict):
+        body = body.get('operations')
+    if not isinstance(body, list) or not body:
+        raise PatchError('Expected a non-empty list of operations')
+    ops = []
+    for i, raw in enumerate(body):
+        if not isinstance(raw, dict) or raw.get('op') not in OPS:
+            raise PatchError(f"Operation {i}: 'op' must be one of {', '.join(OPS)}")
+        if raw['op'] != 'remove' and 'value' not in raw:
+            raise PatchError(f"Operation {i}: '{raw['op']}' needs a value")
+        ops.append((raw['op'], parse_pointer(raw.get('path')), raw.get('value')))
+    return ops
+
+
+class PatchResult:
+    """
+    Outcome of apply_patch
+
+    Attributes:
+        header (dict): Changed header fields (payload name -> new value)
+        lines (list): The line items after the patch
+        touched (list): (position, line, original line or None when added,
+            set of changed fields or {'*'} for a new/replaced line)
+        removed (list): Original lines that were removed
+        lines_changed (bool): Whether any line operation was applied
+    """
+
+    def __init__(self, header, lines, touched, removed, lines_changed):
+        self.header = header
+        self.lines = lines
+        self.touched = touched
+        self.removed = removed
+        self.lines_changed = lines_changed
+
+    @property
+    def structural(self):
+        """Lines were added or removed (positions may have shifted)"""
+        return bool(self.removed) or any(original is None for _, _, original, _ in self.touched)
+
+
+def _index(token, size, allow_end=False):
+    if allow_end and token == '-':
+        return size
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise PatchError(f'Invalid line index: {token!r}')
+    index = int(token)
+    if index > size or (index == size and not allow_end):
+        raise PatchError(f'Line index out of range: {index}')
+    return index
+
+
+def apply_patch(ops, current, header_fields, line_key, line_fields, lines):
+    """
+    Apply operations to a document's header and line items
+
+    Args:
+        ops (list): From parse_operations
+        current (callable): Current value of a header field by payload name
+        header_fields (iterable): Header fields that may be patched
+        line_key (str): Payload name of the line items ('lineItems', 'items'),
+            None when the document has no patchable lines
+        line_fields (iterable): Line item fields that may be patched
+        lines (list): Stored line items (left unmodified)
+
+    Returns:
+        PatchResult
+
+    Raises:
+        PatchError: Unknown path, bad index or failed test
+    """
+    header_fields = set(header_fields)
+    line_fields = set(line_fields)
+    header = {}
+    lines = list(lines or [])
+    originals = {}      # id(copied line) -> original line (None for added lines)
+    changed = {}        # id(copied line) -> set of changed fields
+    removed = []
+    lines_changed = False
+
+    def _own(i):
+        # Copy-on-write: the first change to a stored line copies it
+        line = lines[i]
+        if id(line) not in changed:
+            original = line
+            line = dict(line) if isinstance(line, dict) else {}
+            lines[i] = line
+            originals[id(line)] = original
+            changed[id(line)] = set()
+        return line
+
+    for op, tokens, value in ops:
+        name = tokens[0]
+        if len(tokens) == 1 and name in header_fields:
+            if op == 'test':
+                present = header[name] if name in header else current(name)
+                if present != value:
+                    raise PatchError(f'Test failed for /{name}')
+                continue
+            header[name] = None if op == 'remove' else value
+            continue
+
+        if line_key is None or name != line_key or len(tokens) not in (2, 3):
+            raise PatchError(f"Unknown path: /{'/'.join(tokens)}")
+        lines_changed = lines_changed or op != 'test'
+
+        if len(tokens) == 2:
+            if op == 'add':
+                if not isinstance(value, dict):
+                    raise PatchError('A line item must be an object')
+                line = dict(value)
+                lines.insert(_index(tokens[1], len(lines), allow_end=True), line)
+                originals[id(line)] = None
+                changed[id(line)] = {'*'}
+                continue
+            i = _index(tokens[1], len(lines))
+            if op == 'test':
+                if lines[i] != value:
+                    raise PatchError(f'Test failed for /{line_key}/{i}')
+            elif op == 'remove':
+                line = lines.pop(i)
+                original = originals.pop(id(line), line) if id(line) in changed else line
+                changed.pop(id(line), None)
+                if original is not None:
+                    removed.append(original)
+            else:  # replace
+                if not isinstance(value, dict):
+                    raise PatchError('A line item must be an object')
+                line = _own(i)
+                line.clear()
+                line.update(value)
+                changed[id(line)] = {'*'}
+            continue
+
+        i = _index(tokens[1], len(lines))
+        field = tokens[2]
+        if field not in line_fields:
+            raise PatchError(f'Unknown line field: {field}')
+        if op == 'test':
+            stored = lines[i].get(field) if isinstance(lines[i], dict) else None
+            if stored != value:
+                raise PatchError(f'Test failed for /{line_key}/{i}/{field}')
+            continue
+        line = _own(i)
+        if op == 'remove':
+            line.pop(field, None)
+        else:
+            line[field] = value
+        changed[id(line)].add(field)
+
+    touched = [
+        (position, line, originals[id(line)], changed[id(line)])
+        for position, line in enumerate(lines) if id(line) in changed
+    ]
+    return PatchResult(header, lines, touched, removed, lines_changed)
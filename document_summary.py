@@ -0,0 +1,80 @@
+"""
+Running totals per document type, day, currency and port of discharge
+Each create/update adds the record's contribution to its summary row (and
+removes the previous contribution on update) in the same transaction, so
+analytics read a few summary rows instead of scanning the documents.
+"""
+
+from document_lines import packing_list_boxes, parse_number
+
+SUMMARY_KEYS = ('kind', 'day', 'currency', 'port')
+SUMMARY_MEASURES = ('documents', 'export_value', 'gst_value', 'invoice_value', 'net_weight', 'gross_weight')
+
+
+def _key_text(value):
+    return str(value or '').strip().upper()[:100]
+
+
+def summary_row(kind, record):
+    """
+    A record's contribution to its summary row
+
+    Args:
+        kind (str): 'packaging_list', 'proforma_invoice' or 'zc_exporter'
+        record: PackagingList, ProformaInvoice or ZCExporter instance (flushed,
+            so created_at is set)
+
+    Returns:
+        dict: SUMMARY_KEYS and SUMMARY_MEASURES values
+    """
+    row = {
+        'kind': kind,
+        'day': record.created_at.date() if record.created_at else None,
+        'documents': 1,
+        'export_value': 0.0,
+        'gst_value': 0.0,
+        'invoice_value': 0.0,
+        'net_weight': 0.0,
+        'gross_weight': 0.0,
+    }
+    if kind == 'packaging_list':
+        row['currency'] = _key_text(record.currency)
+        row['port'] = _key_text(record.dischargePort)
+        # Per-box weight x box count, as in the box rows and on the print
+        # (total_net_weight/total_gross_weight count a box range once)
+        for box in packing_list_boxes(record.moduleB_data, record.hsCode):
+            row['net_weight'] += (box['net_weight'] or 0.0) * box['box_count']
+            row['gross_weight'] += (box['gross_weight'] or 0.0) * box['box_count']
+    elif kind == 'proforma_invoice':
+        row['currency'] = _key_text(record.currency)
+        row['port'] = _key_text(record.port_of_discharge)
+        row['export_value'] = row['invoice_value'] = parse_number(record.total_amount) or 0.0
+    elif kind == 'zc_exporter':
+        row['currency'] = _key_text(record.currency)
+        row['port'] = _key_text(record.port_of_discharge)
+        row['export_value'] = parse_number(record.total_export_value) or 0.0
+        row['gst_value'] = parse_number(record.total_gst_value) or 0.0
+        row['invoice_value'] = parse_number(record.total_invoice_value) or 0.0
+    else:
+        raise ValueError(f'Unknown document kind: {kind}')
+    return row
+
+
+def summary_deltas(before, after):
+    """
+    Rows to add to the summary table when a record changes from ``before``
+    to ``after`` (either may be None for a create or a delete)
+
+    Returns:
+        list: Rows with SUMMARY_KEYS and signed SUMMARY_MEASURES; rows that
+        change nothing are left out
+    """
+    deltas = []
+    if before is not None and after is not None and all(before[k] == after[k] for k in SUMMARY_KEYS):
+        deltas.append(dict(after, **{m: after[m] - before[m] for m in SUMMARY_MEASURES}))
+    else:
+        if before is not None:
+            deltas.append(dict(before, **{m: -before[m] for m in SUMMARY_MEASURES}))
+        if after is not None:
+            deltas.append(after)
+    return [d for d in deltas if d['day'] is not None and any(d[m] for m in SUMMARY_MEASURES)]
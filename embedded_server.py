@@ -0,0 +1,96 @@
+"""
+Thread-pool WSGI server for the desktop app
+werkzeug's make_server() handles one connection at a time, so one slow
+print render holds up every /api fetch behind it. PooledWSGIServer hands
+accepted connections to a fixed pool of worker threads through a bounded
+queue: connections beyond the queue limit get an immediate 503, and
+shutdown() lets in-flight requests finish. Connections are not kept alive:
+werkzeug's handler drains the socket after each response, which would
+swallow a following request.
+"""
+
+import queue
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+_BUSY_RESPONSE = (b'HTTP/1.1 503 Service Unavailable\r\n'
+                  b'Content-Length: 0\r\nConnection: close\r\nRetry-After: 1\r\n\r\n')
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    # A client that stalls mid-request gives its worker back after this long
+    timeout = 60
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Args:
+        host (str), port (int), app: As for werkzeug's make_server
+        threads (int): Worker threads
+        queue_limit (int): Accepted connections waiting for a worker (and the
+            listen backlog); more are answered 503
+        shutdown_timeout (float): Seconds shutdown() waits for the workers
+    """
+
+    multithread = True
+    daemon_threads = True
+
+    def __init__(self, host, port, app, threads=4, queue_limit=64, shutdown_timeout=10.0,
+                 handler=PooledRequestHandler):
+        self.request_queue_size = queue_limit
+        self.shutdown_timeout = shutdown_timeout
+        self._pending = queue.Queue(maxsize=queue_limit)
+        self._stopping = threading.Event()
+        self.rejected = 0
+        super().__init__(host, port, app, handler=handler)
+        self._workers = [
+            threading.Thread(target=self._work, name=f'wsgi-worker-{i}', daemon=True)
+            for i in range(max(1, threads))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        # Called by serve_forever for each accepted connection
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            try:
+                request.sendall(_BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            try:
+                request, client_address = self._pending.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def shutdown(self):
+        """Stop accepting, then let the workers finish what they have (up to shutdown_timeout)"""
+        super().shutdown()
+        self._stopping.set()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        self.server_close()
+
+    def stats(self):
+        return {
+            'threads': len(self._workers),
+            'queued': self._pending.qsize(),
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,63 @@
+"""
+Response compression
+Buffered JSON/HTML responses above a size threshold are sent gzip (or
+brotli when the brotli package is installed and the client accepts it).
+Streamed responses (exports, file downloads) are left alone.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset(('application/json', 'text/html'))
+
+
+def available_encodings():
+    """Encodings this server can produce, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress_body(body, encoding, gzip_level=6, brotli_quality=5):
+    """Encode ``body`` (bytes) as 'gzip' or 'br'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def compress_response(response, accept_encodings, min_size=1024, gzip_level=6, brotli_quality=5):
+    """
+    Compress a buffered response in place when it is worth it
+
+    Args:
+        response: Flask response
+        accept_encodings: request.accept_encodings
+        min_size (int): Smallest body (bytes) that is compressed
+        gzip_level (int): 1-9
+        brotli_quality (int): 0-11
+
+    Returns:
+        The same response
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    # Varies on Accept-Encoding even when this body is sent as is
+    response.vary.add('Accept-Encoding')
+
+    encoding = accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    response.set_data(compress_body(body, encoding, gzip_level, brotli_quality))
+    response.headers['Content-Encoding'] = encoding
+    # ETags are weak, so they match the compressed and plain bodies alike
+    return response
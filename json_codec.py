@@ -0,0 +1,107 @@
+"""
+JSON encoding backend
+orjson when it is installed, the standard library otherwise (JSON_BACKEND=json
+forces the standard library). Used for API responses (FastJSONProvider, set
+as app.json) and for the db.JSON columns (engine_options(), passed to the
+engine as json_serializer/json_deserializer).
+
+Both backends give the same documents: dates, datetimes and dataclasses go
+through the ``default`` hook as with the standard library, and anything orjson
+refuses (integers over 64 bits, say) is encoded by the standard library.
+Only the bytes differ: orjson writes compact UTF-8 instead of \\u escapes.
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+if (os.environ.get('JSON_BACKEND') or '').strip().lower() in {'json', 'stdlib'}:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    # Leave these to ``default`` like the standard library does
+    _BASE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def dumps_bytes(obj, default=None, sort_keys=False, indent=False):
+    """
+    Encode ``obj`` as UTF-8 JSON
+
+    Args:
+        obj: Value to encode
+        default (callable): Called for values JSON has no type for
+        sort_keys (bool): Sort object keys
+        indent (bool): Pretty-print with two spaces
+
+    Returns:
+        bytes
+    """
+    if orjson is not None:
+        option = _BASE_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    separators = None if indent else (',', ':')
+    return json.dumps(obj, default=default, sort_keys=sort_keys, indent=2 if indent else None,
+                      separators=separators, ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj, default=None, sort_keys=False, indent=False):
+    """dumps_bytes() as text"""
+    return dumps_bytes(obj, default=default, sort_keys=sort_keys, indent=indent).decode('utf-8')
+
+
+def loads(data):
+    """Decode JSON text or UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def engine_options():
+    """
+    Engine options that route the db.JSON columns through this module; with
+    the standard library backend SQLAlchemy's own defaults are kept
+    """
+    if orjson is None:
+        return {}
+    return {'json_serializer': dumps, 'json_deserializer': loads}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider on the orjson backend; keeps sort_keys, compact and
+    the default hook (http dates, Decimal as str, ...) of Flask's provider.
+    Calls with extra json.dumps/json.loads arguments go to Flask's provider.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, default=self.default, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
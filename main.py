@@ -1,79 +1,46 @@
-from flask import Flask, render_template, send_from_directory, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from markupsafe import escape
+from sqlalchemy import event, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, load_only
 import os
+import base64
+import functools
+import io
 import json
 import sys
 import webbrowser
-from datetime import datetime
-from ZC.logic import prepare_invoice_data
+import zipfile
+from datetime import datetime, timedelta
+from ZC.logic import prepare_invoice_data, price_patch as price_zc_patch
+from proforma_invoice.logic import PRICE_FIELDS, price_invoice, price_patch, revalue_invoice
+from currency_rates import DEFAULT_RATES, CURRENCY_ALIASES, RateBook, legacy_rate, parse_divisor, rate_code
+from document_export import EXPORT_FORMATS, EXPORT_SPECS, export_chunks
+from print_batch import batch_document
+from pdf_render import PdfRenderer
+from amount_words import amount_in_words, amounts_in_words
+from packaging_list.box_ranges import BoxMap, RangeSet, group_items, iter_items
+from packaging_list.logic import PRINT_MODEL_VERSION, build_print_model, load_print_model, refresh_print_header
+from render_cache import RenderCache
+from snapshot_writer import SnapshotWriter
+from search_index import FTS_TABLES, SearchIndex, document_fields
+from document_lines import document_lines
+from document_patch import PatchError, apply_patch, parse_operations
+from document_summary import SUMMARY_KEYS, SUMMARY_MEASURES, summary_deltas, summary_row
+from sqlite_profile import apply_profile, pool_options_from_env, profile_from_env
+from migrations import Migration, backfill, migrate
+from http_compression import compress_response
+from static_pages import StaticCache
+from build_assets import AssetManifest
+from json_codec import FastJSONProvider, engine_options as json_engine_options, loads as json_loads
 
 def number_to_words(num):
-    """Convert number to words for currency amounts"""
-    if not num or num == '0' or num == '0.00':
-        return "Zero"
-    
-    # Convert to float and handle decimal places
+    """Convert number to words for currency amounts (Rupees/Paise), see amount_words.py"""
     try:
-        num_float = float(num)
-    except (ValueError, TypeError):
+        return amount_in_words(num, 'INR')
+    except ValueError:
         return "Zero"
-    
-    # Split into integer and decimal parts
-    integer_part = int(num_float)
-    decimal_part = round((num_float - integer_part) * 100)
-    
-    # Words for numbers
-    ones = ['', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine']
-    teens = ['Ten', 'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen', 'Seventeen', 'Eighteen', 'Nineteen']
-    tens = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
-    
-    def convert_less_than_thousand(n):
-        if n == 0:
-            return ''
-        elif n < 10:
-            return ones[n]
-        elif n < 20:
-            return teens[n - 10]
-        elif n < 100:
-            return tens[n // 10] + (' ' + ones[n % 10] if n % 10 != 0 else '')
-        else:
-            return ones[n // 100] + ' Hundred' + (' ' + convert_less_than_thousand(n % 100) if n % 100 != 0 else '')
-    
-    def convert_integer(n):
-        if n == 0:
-            return 'Zero'
-        result = ''
-        
-        # Crore (10 million)
-        if n >= 10000000:
-            result += convert_less_than_thousand(n // 10000000) + ' Crore '
-            n %= 10000000
-        
-        # Lakh (100 thousand)
-        if n >= 100000:
-            result += convert_less_than_thousand(n // 100000) + ' Lakh '
-            n %= 100000
-        
-        # Thousand
-        if n >= 1000:
-            result += convert_less_than_thousand(n // 1000) + ' Thousand '
-            n %= 1000
-        
-        # Hundred and below
-        if n > 0:
-            result += convert_less_than_thousand(n)
-        
-        return result.strip()
-    
-    # Convert integer part
-    words = convert_integer(integer_part)
-    
-    # Add decimal part if exists
-    if decimal_part > 0:
-        words += ' and ' + convert_less_than_thousand(decimal_part) + ' Paise'
-    
-    return words + ' Rupees'
 
 app = Flask(__name__, template_folder=os.path.dirname(os.path.abspath(__file__)), static_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
 
@@ -84,21 +51,45 @@ if getattr(sys, 'frozen', False):
     os.makedirs(db_dir, exist_ok=True)
     db_path = os.path.join(db_dir, 'web_forms.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path.replace('\\', '/')
+    snapshot_root = os.path.join(db_dir, 'snapshots')
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///web_forms.db'
+    snapshot_root = os.path.dirname(os.path.abspath(__file__))
+# DATABASE_URL overrides the location (scratch databases for benchmarks)
+if os.environ.get('DATABASE_URL'):
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Storage profile: WAL + tuning pragmas on every connection (SQLITE_PROFILE=legacy
+# restores SQLite defaults), with explicit pool sizing. See sqlite_profile.py.
+sqlite_pragmas = profile_from_env(os.environ)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options_from_env(
+    os.environ, sqlite_pragmas, app.config['SQLALCHEMY_DATABASE_URI'])
+# orjson (when installed) for API responses and the db.JSON columns; see json_codec.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(json_engine_options())
+app.json = FastJSONProvider(app)
 db = SQLAlchemy(app)
+with app.app_context():
+    apply_profile(db.engine, sqlite_pragmas)
+
+# Debug JSON snapshots of print/create data, written off the request thread.
+# Opt-in: SNAPSHOTS=1 (optionally SNAPSHOT_DIR, SNAPSHOT_KEEP)
+snapshots = SnapshotWriter(
+    root=os.environ.get('SNAPSHOT_DIR') or snapshot_root,
+    enabled=os.environ.get('SNAPSHOTS', '').strip().lower() in {'1', 'true', 'yes', 'on'},
+    keep=int(os.environ.get('SNAPSHOT_KEEP', '20')),
+)
 
 # Database Models
 class PackagingList(db.Model):
     __tablename__ = 'packaging_list'
     id = db.Column(db.Integer, primary_key=True)
-    packingListNo = db.Column(db.String(100), nullable=True)
+    packingListNo = db.Column(db.String(100), nullable=True, index=True)
     date = db.Column(db.Date, nullable=True)
     consigneeAddress = db.Column(db.Text, nullable=True)
     deliveryAddress = db.Column(db.Text, nullable=True)
     exporterAddress = db.Column(db.Text, nullable=True)
-    poNumber = db.Column(db.String(100), nullable=True)
+    poNumber = db.Column(db.String(100), nullable=True, index=True)
     loadingPort = db.Column(db.String(100), nullable=True)
     dischargePort = db.Column(db.String(100), nullable=True)
     hsCode = db.Column(db.String(100), nullable=True)
@@ -113,16 +104,18 @@ class PackagingList(db.Model):
     
     total_net_weight = db.Column(db.Float, default=0.0)
     total_gross_weight = db.Column(db.Float, default=0.0)
-    status = db.Column(db.String(20), default='Completed')
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    print_model = db.Column(db.JSON)       # Precomputed print data, see packaging_list/logic.py
+    status = db.Column(db.String(20), default='Completed', index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
 
 class ProformaInvoice(db.Model):
     __tablename__ = 'proforma_invoice'
     id = db.Column(db.Integer, primary_key=True)
     invoice_date = db.Column(db.String(50), nullable=True)
-    invoice_no = db.Column(db.String(100), nullable=True)
-    po_wo_number = db.Column(db.String(100), nullable=True)
+    invoice_no = db.Column(db.String(100), nullable=True, index=True)
+    po_wo_number = db.Column(db.String(100), nullable=True, index=True)
     our_ref_no = db.Column(db.String(100), nullable=True)
     your_reference_no = db.Column(db.String(100), nullable=True)
     supplier_address = db.Column(db.Text, nullable=True)
@@ -139,16 +132,17 @@ class ProformaInvoice(db.Model):
     port_of_embarkation = db.Column(db.String(100), nullable=True)
     port_of_discharge = db.Column(db.String(100), nullable=True)
     line_items = db.Column(db.JSON, nullable=True)
-    status = db.Column(db.String(20), default='Completed')
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    currency_rate_id = db.Column(db.Integer, db.ForeignKey('currency_rate.id'), nullable=True, index=True)
+    status = db.Column(db.String(20), default='Completed', index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
 class ZCExporter(db.Model):
     __tablename__ = 'zc_exporter'
     id = db.Column(db.Integer, primary_key=True)
-    invoice_number = db.Column(db.String(100), nullable=True)
+    invoice_number = db.Column(db.String(100), nullable=True, index=True)
     invoice_date = db.Column(db.String(50), nullable=True)
-    buyer_order_number = db.Column(db.String(100), nullable=True)
+    buyer_order_number = db.Column(db.String(100), nullable=True, index=True)
     buyer_order_date = db.Column(db.String(50), nullable=True)
     exporter_reference = db.Column(db.String(100), nullable=True)
     iec_number = db.Column(db.String(100), nullable=True)
@@ -178,13 +172,104 @@ class ZCExporter(db.Model):
     total_invoice_value = db.Column(db.String(50), nullable=True)
     number_of_boxes = db.Column(db.Integer, nullable=True)
     items = db.Column(db.JSON, nullable=True)
-    status = db.Column(db.String(20), default='Completed')
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    status = db.Column(db.String(20), default='Completed', index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
+class CurrencyRate(db.Model):
+    __tablename__ = 'currency_rate'
+    __table_args__ = (db.Index('ix_currency_rate_currency_effective', 'currency', 'effective_from'),)
+    id = db.Column(db.Integer, primary_key=True)
+    currency = db.Column(db.String(10), nullable=False)
+    divisor = db.Column(db.String(50), nullable=False)    # INR per unit of currency
+    effective_from = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
-def _ensure_packaging_list_schema():
-    if not (db.engine and db.engine.url and db.engine.url.drivername and db.engine.url.drivername.startswith('sqlite')):
+# Line items as rows (see document_lines.py), rebuilt from the JSON columns
+# on every write so totals across documents run as SQL GROUP BY
+class PackagingListBox(db.Model):
+    __tablename__ = 'packaging_list_box'
+    id = db.Column(db.Integer, primary_key=True)
+    packaging_list_id = db.Column(db.Integer, db.ForeignKey('packaging_list.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    item_number = db.Column(db.String(100), nullable=True, index=True)
+    relationship = db.Column(db.String(20), nullable=True)
+    box_no = db.Column(db.Text, nullable=True)            # range text as printed, e.g. "1-20"
+    box_start = db.Column(db.Integer, nullable=True, index=True)
+    box_end = db.Column(db.Integer, nullable=True)
+    box_count = db.Column(db.Integer, nullable=False, default=1)
+    description = db.Column(db.Text, nullable=True)
+    qty = db.Column(db.Float, nullable=True)
+    length = db.Column(db.Float, nullable=True)
+    width = db.Column(db.Float, nullable=True)
+    height = db.Column(db.Float, nullable=True)
+    net_weight = db.Column(db.Float, nullable=True)       # per box
+    gross_weight = db.Column(db.Float, nullable=True)     # per box
+    hs_code = db.Column(db.String(100), nullable=True, index=True)
+
+class ProformaInvoiceLine(db.Model):
+    __tablename__ = 'proforma_invoice_line'
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('proforma_invoice.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    line_no = db.Column(db.String(50), nullable=True)
+    part_number = db.Column(db.String(100), nullable=True, index=True)
+    description = db.Column(db.Text, nullable=True)
+    quantity = db.Column(db.Float, nullable=True)
+    unit_rate = db.Column(db.Float, nullable=True)
+    total = db.Column(db.Float, nullable=True)
+
+class ZCExporterLine(db.Model):
+    __tablename__ = 'zc_exporter_line'
+    id = db.Column(db.Integer, primary_key=True)
+    exporter_id = db.Column(db.Integer, db.ForeignKey('zc_exporter.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    box_from = db.Column(db.Integer, nullable=True, index=True)
+    box_to = db.Column(db.Integer, nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    unit = db.Column(db.String(50), nullable=True)
+    quantity = db.Column(db.Float, nullable=True)
+    rate = db.Column(db.Float, nullable=True)
+    amount = db.Column(db.Float, nullable=True)
+    taxable_value = db.Column(db.Float, nullable=True)
+    igst_percent = db.Column(db.Float, nullable=True)
+    igst_amount = db.Column(db.Float, nullable=True)
+    hs_code = db.Column(db.String(100), nullable=True, index=True)
+
+# Running totals per document type x day (created_at) x currency x port of
+# discharge, maintained with each write; see document_summary.py
+class DocumentSummary(db.Model):
+    __tablename__ = 'document_summary'
+    __table_args__ = (db.UniqueConstraint('kind', 'day', 'currency', 'port', name='uq_document_summary_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+    currency = db.Column(db.String(10), nullable=False, default='')
+    port = db.Column(db.String(100), nullable=False, default='')
+    documents = db.Column(db.Integer, nullable=False, default=0)
+    export_value = db.Column(db.Float, nullable=False, default=0.0)
+    gst_value = db.Column(db.Float, nullable=False, default=0.0)
+    invoice_value = db.Column(db.Float, nullable=False, default=0.0)
+    net_weight = db.Column(db.Float, nullable=False, default=0.0)
+    gross_weight = db.Column(db.Float, nullable=False, default=0.0)
+
+# Change counter per document table, bumped in the writing transaction;
+# list API ETags are derived from it (see _table_version)
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+    kind = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Document kind -> (parent model, child model, foreign key column name)
+LINE_TABLES = {
+    'packaging_list': (PackagingList, PackagingListBox, 'packaging_list_id'),
+    'proforma_invoice': (ProformaInvoice, ProformaInvoiceLine, 'invoice_id'),
+    'zc_exporter': (ZCExporter, ZCExporterLine, 'exporter_id'),
+}
+
+
+def _ensure_packaging_list_schema(conn):
+    if not conn.engine.url.drivername.startswith('sqlite'):
         return
 
     wanted = {
@@ -195,34 +280,347 @@ def _ensure_packaging_list_schema():
         'moduleB_data': 'TEXT',
         'total_net_weight': 'REAL DEFAULT 0.0',
         'total_gross_weight': 'REAL DEFAULT 0.0',
+        'print_model': 'TEXT',
         'status': "VARCHAR(20) DEFAULT 'Completed'",
         'created_at': 'DATETIME',
+        'updated_at': 'DATETIME',
     }
 
-    with db.engine.begin() as conn:
-        cols = conn.execute(text('PRAGMA table_info(packaging_list)')).fetchall()
-        existing = {row[1] for row in cols}
-        for col, ddl in wanted.items():
-            if col in existing:
-                continue
-            conn.execute(text(f'ALTER TABLE packaging_list ADD COLUMN {col} {ddl}'))
+    cols = conn.execute(text('PRAGMA table_info(packaging_list)')).fetchall()
+    existing = {row[1] for row in cols}
+    for col, ddl in wanted.items():
+        if col in existing:
+            continue
+        conn.execute(text(f'ALTER TABLE packaging_list ADD COLUMN {col} {ddl}'))
 
 
-def _ensure_proforma_invoice_schema():
-    if not (db.engine and db.engine.url and db.engine.url.drivername and db.engine.url.drivername.startswith('sqlite')):
+def _ensure_proforma_invoice_schema(conn):
+    if not conn.engine.url.drivername.startswith('sqlite'):
         return
 
     wanted = {
         'advance_amount': 'VARCHAR(50)',
+        'currency_rate_id': 'INTEGER REFERENCES currency_rate(id)',
     }
 
-    with db.engine.begin() as conn:
-        cols = conn.execute(text('PRAGMA table_info(proforma_invoice)')).fetchall()
-        existing = {row[1] for row in cols}
-        for col, ddl in wanted.items():
-            if col in existing:
+    cols = conn.execute(text('PRAGMA table_info(proforma_invoice)')).fetchall()
+    existing = {row[1] for row in cols}
+    for col, ddl in wanted.items():
+        if col in existing:
+            continue
+        conn.execute(text(f'ALTER TABLE proforma_invoice ADD COLUMN {col} {ddl}'))
+
+
+def _ensure_indexes(conn):
+    # create_all() only creates indexes together with new tables
+    for model in (PackagingList, ProformaInvoice, ZCExporter, CurrencyRate,
+                  PackagingListBox, ProformaInvoiceLine, ZCExporterLine, DocumentSummary):
+        for index in model.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _create_search_tables(session):
+    # Creates the missing FTS5 tables in one short write transaction, so two
+    # workers starting together do not both try; returns the kinds created
+    session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+    created = search_index.ensure(session.connection())
+    session.commit()
+    return created
+
+
+def _index_missing(session, kind):
+    # Indexes the records of ``kind`` that have no FTS row yet
+    model = LINE_TABLES[kind][0]
+    fts = db.table(FTS_TABLES[kind], db.column('rowid'))
+    backfill(session, model, lambda records: search_index.index_many(
+        session, kind, [(record.id, document_fields(kind, record)) for record in records]),
+        where=[~db.exists().where(fts.c.rowid == model.id)])
+
+
+def _ensure_search_index(session):
+    # Creates the FTS5 tables and indexes the records missing from them
+    _create_search_tables(session)
+    if search_index.available:
+        for kind in FTS_TABLES:
+            _index_missing(session, kind)
+
+
+def _ensure_currency_rates(session):
+    # Seeds an empty rate table with the divisors the forms always used, and
+    # pins the invoices priced before the table existed to those rows
+    if session.query(CurrencyRate.id).first() is None:
+        for currency, divisor in DEFAULT_RATES.items():
+            session.add(CurrencyRate(currency=currency, divisor=str(divisor), effective_from=datetime(2000, 1, 1)))
+        session.commit()
+        rate_book.invalidate()
+    _pin_legacy_invoice_rates(session)
+
+
+def _load_currency_rates():
+    return db.session.execute(db.select(
+        CurrencyRate.id, CurrencyRate.currency, CurrencyRate.divisor, CurrencyRate.effective_from,
+    )).all()
+
+# INR -> currency rates, read through a TTL cache (RATE_CACHE_TTL seconds)
+# that every rate write invalidates. See currency_rates.py.
+rate_book = RateBook(_load_currency_rates, ttl=float(os.environ.get('RATE_CACHE_TTL', '300')))
+
+
+def _invoice_rate(invoice):
+    # The rate a stored invoice was priced with. Invoices saved before the
+    # rate table were priced with the defaults (migration 3 pins them to the
+    # seeded rows), never with whatever rate is current now.
+    if invoice.currency_rate_id is not None:
+        rate = rate_book.get(invoice.currency_rate_id)
+        if rate is not None:
+            return rate
+    return legacy_rate(invoice.currency)
+
+
+def _pin_legacy_invoice_rates(session):
+    # Points invoices without a rate at the seeded default rate of their currency
+    for currency, divisor in DEFAULT_RATES.items():
+        rows = (session.query(CurrencyRate.id, CurrencyRate.divisor)
+                .filter(CurrencyRate.currency == currency)
+                .order_by(CurrencyRate.effective_from, CurrencyRate.id)
+                .all())
+        rate_id = next((row.id for row in rows if parse_divisor(row.divisor) == divisor), None)
+        if rate_id is None:
+            continue
+        spellings = [currency] + [alias for alias, code in CURRENCY_ALIASES.items() if code == currency]
+        # Core update naming updated_at itself, so its onupdate leaves the
+        # invoices' own timestamps alone
+        table = ProformaInvoice.__table__
+        session.execute(table.update()
+                        .where(table.c.currency_rate_id.is_(None),
+                               db.func.upper(db.func.trim(table.c.currency)).in_(spellings))
+                        .values(currency_rate_id=rate_id, updated_at=table.c.updated_at))
+    session.commit()
+
+
+def _index_for_search(kind, record):
+    # Runs in the caller's transaction so the FTS row commits with the record
+    search_index.index(db.session, kind, record.id, document_fields(kind, record))
+
+
+def _sync_lines(kind, record, positions=None, session=None):
+    # Rebuilds the record's child rows (only those at ``positions`` when
+    # given) in the caller's transaction
+    session = db.session if session is None else session
+    _, line_model, fk = LINE_TABLES[kind]
+    table = line_model.__table__
+    stmt = table.delete().where(table.c[fk] == record.id)
+    if positions is not None:
+        positions = sorted(positions)
+        if not positions:
+            return
+        stmt = stmt.where(table.c.position.in_(positions))
+    session.execute(stmt)
+    rows = document_lines(kind, record, positions)
+    if rows:
+        session.execute(table.insert(), [dict(row, **{fk: record.id}) for row in rows])
+
+
+def _update_summary(kind, record, before=None):
+    # Adds the record's change (from the summary_row taken before an update)
+    # to its summary row in the caller's transaction
+    table = DocumentSummary.__table__
+    for delta in summary_deltas(before, summary_row(kind, record)):
+        stmt = sqlite_insert(table).values(**delta)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=list(SUMMARY_KEYS),
+            set_={m: table.c[m] + stmt.excluded[m] for m in SUMMARY_MEASURES},
+        ))
+
+
+# Parent model -> document kind, for the table change counter
+VERSIONED_MODELS = {model: kind for kind, (model, _, _) in LINE_TABLES.items()}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_table_versions(session, flush_context):
+    # Every flush that writes documents bumps their table's counter in the
+    # same transaction, so a rolled back write leaves the counter alone
+    kinds = {VERSIONED_MODELS[type(obj)] for objs in (session.new, session.dirty, session.deleted)
+             for obj in objs if type(obj) in VERSIONED_MODELS}
+    table = TableVersion.__table__
+    conn = session.connection()
+    for kind in sorted(kinds):
+        stmt = sqlite_insert(table).values(kind=kind, version=1)
+        conn.execute(stmt.on_conflict_do_update(index_elements=['kind'], set_={'version': table.c.version + 1}))
+
+
+def _table_version(kind):
+    return db.session.query(TableVersion.version).filter(TableVersion.kind == kind).scalar() or 0
+
+
+def _ensure_summaries(session):
+    # Builds the summary table from the documents when it is empty. The scan
+    # only reads; the rows go in with one short write transaction that checks
+    # again that no other worker filled the table meanwhile
+    if session.query(DocumentSummary.id).first() is not None:
+        return
+    totals = {}
+    for kind, (model, _, _) in LINE_TABLES.items():
+        for record in session.query(model).yield_per(500):
+            row = summary_row(kind, record)
+            if row['day'] is None:
                 continue
-            conn.execute(text(f'ALTER TABLE proforma_invoice ADD COLUMN {col} {ddl}'))
+            key = tuple(row[k] for k in SUMMARY_KEYS)
+            acc = totals.setdefault(key, dict.fromkeys(SUMMARY_MEASURES, 0))
+            for m in SUMMARY_MEASURES:
+                acc[m] += row[m]
+    session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+    if totals and session.query(DocumentSummary.id).first() is None:
+        session.execute(DocumentSummary.__table__.insert(), [
+            dict(zip(SUMMARY_KEYS, key), **measures) for key, measures in totals.items()
+        ])
+    session.commit()
+
+
+def _ensure_line_tables(session):
+    # Fills the child rows of records that have none (child tables created
+    # for an existing database)
+    for kind, (model, line_model, fk) in LINE_TABLES.items():
+        no_lines = ~db.exists().where(line_model.__table__.c[fk] == model.id)
+        backfill(session, model, lambda records, kind=kind: [
+            _sync_lines(kind, record, session=session) for record in records], where=[no_lines])
+
+
+def _backfill_print_models(session):
+    # Precomputes missing or stale packing list print models (otherwise
+    # built on the first print)
+    stale = db.func.json_extract(PackagingList.print_model, '$.version').isnot(PRINT_MODEL_VERSION)
+
+    table = PackagingList.__table__
+    # Core update naming updated_at itself: the column's onupdate would
+    # otherwise stamp every packing list with the migration time
+    stmt = (table.update()
+            .where(table.c.id == db.bindparam('record_id'))
+            .values(print_model=db.bindparam('model'), updated_at=table.c.updated_at))
+
+    def _build(records):
+        session.execute(stmt, [{'record_id': record.id, 'model': build_print_model(record)} for record in records])
+
+    backfill(session, PackagingList, _build, where=[stale], batch_size=100)
+
+
+def _create_schema(session):
+    conn = session.connection()
+    db.metadata.create_all(conn)
+    _ensure_packaging_list_schema(conn)
+    _ensure_proforma_invoice_schema(conn)
+    _ensure_indexes(conn)
+
+
+# Ordered schema/data steps, applied once per database (PRAGMA user_version).
+# Append new steps with the next version; never renumber or edit applied ones.
+# Data steps are online: chunked backfills outside the exclusive lock, each
+# picking the rows still missing (see migrations.py).
+MIGRATIONS = [
+    Migration(1, 'base schema', _create_schema),
+    Migration(2, 'full-text search index', _ensure_search_index, online=True),
+    Migration(3, 'default currency rates', _ensure_currency_rates),
+    Migration(4, 'line item tables', _ensure_line_tables, online=True),
+    Migration(5, 'document summaries', _ensure_summaries, online=True),
+    Migration(6, 'packing list print models', _backfill_print_models, online=True),
+]
+
+
+def init_database():
+    """Bring the database up to date; one PRAGMA read when it already is (call in an app context)"""
+    versions = migrate(db.engine, MIGRATIONS)
+    # search_index.available belongs to this process, and step 2 only runs
+    # once per database: check the FTS tables on every start
+    with Session(db.engine) as session:
+        for kind in _create_search_tables(session):
+            _index_missing(session, kind)
+    return versions
+
+# Rendered print pages, keyed by record id and version (created_at, updated_at).
+# The version is read from the database on every request, so a write made by
+# another worker is never served stale; invalidate() only frees memory early.
+print_cache = RenderCache(max_entries=int(os.environ.get('PRINT_CACHE_SIZE', '256')))
+
+
+def _record_version(model, record_id):
+    # Loads only the timestamp columns, not the JSON blobs; None if the record is missing
+    cols = [model.created_at]
+    if 'updated_at' in model.__table__.columns:
+        cols.append(model.updated_at)
+    row = db.session.query(*cols).filter(model.id == record_id).first()
+    return None if row is None else tuple(row)
+
+
+def _loaded_record_version(record):
+    # Same version tuple as _record_version, read from an already loaded record
+    columns = type(record).__table__.columns
+    return tuple(getattr(record, name) for name in ('created_at', 'updated_at') if name in columns)
+
+def _list_etag(kind):
+    return f'{kind}-{_table_version(kind)}'
+
+
+def _detail_etag(kind, model, record_id):
+    # From the record's timestamps
+    version = _record_version(model, record_id)
+    if version is None:
+        return None
+    stamps = '-'.join(ts.strftime('%Y%m%d%H%M%S%f') if ts else '0' for ts in version)
+    return f'{kind}-{record_id}-{stamps}'
+
+
+def conditional(etag_for):
+    """
+    Weak ETag + If-None-Match for a GET API route
+
+    ``etag_for`` gets the view arguments and computes the ETag from
+    timestamps/counters only, so an unchanged resource is answered with
+    304 Not Modified before the record is loaded or serialized.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            try:
+                etag = etag_for(**kwargs)
+            except Exception:
+                # Let the view report the error in its usual format
+                etag = None
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(view(**kwargs))
+                if etag is None or response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Browsers keep the body but revalidate on every fetch
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+
+
+@app.after_request
+def _compress(response):
+    return compress_response(response, request.accept_encodings, COMPRESS_MIN_SIZE, COMPRESS_LEVEL)
+
+# Full-text search over addresses and line items (SQLite FTS5)
+search_index = SearchIndex()
+
+# Form pages, ZC scripts and static/ are served from memory with ETags
+# (see static_pages.py); STATIC_WATCH=1 or the debug server re-reads edited files.
+# After `python build_assets.py`, pages and templates (asset_url) link the
+# fingerprinted, precompressed copies in static/dist/.
+STATIC_WATCH = os.environ.get('STATIC_WATCH', '').strip().lower() in {'1', 'true', 'yes', 'on'}
+assets = AssetManifest(app.static_folder, app.static_url_path, watch=STATIC_WATCH)
+app.jinja_env.globals['asset_url'] = assets.url
+pages = StaticCache(os.path.dirname(os.path.abspath(__file__)), watch=STATIC_WATCH, transform=assets.rewrite)
+static_files = StaticCache(app.static_folder, watch=STATIC_WATCH)
+app.view_functions['static'] = lambda filename: static_files.response(request, filename)
 
 # Define the folders and their routes
 FORMS = {
@@ -237,31 +635,31 @@ def home():
 
 @app.route('/packaging_list')
 def packaging_list():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'packaging_list'), 'add.html')
+    return pages.response(request, 'packaging_list', 'add.html')
 
 @app.route('/packaging_list/view')
 def packaging_list_view():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'packaging_list'), 'view.html')
+    return pages.response(request, 'packaging_list', 'view.html')
 
 @app.route('/proforma_invoice')
 def proforma_invoice():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'proforma_invoice'), 'add.html')
+    return pages.response(request, 'proforma_invoice', 'add.html')
 
 @app.route('/proforma_invoice/view')
 def proforma_invoice_view():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'proforma_invoice'), 'view.html')
+    return pages.response(request, 'proforma_invoice', 'view.html')
 
 @app.route('/zc_exporter')
 def zc_exporter():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'ZC'), 'add.html')
+    return pages.response(request, 'ZC', 'add.html')
 
 @app.route('/ZC/<path:filename>')
 def zc_exporter_assets(filename):
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'ZC'), filename)
+    return pages.response(request, 'ZC', filename)
 
 @app.route('/zc_exporter/view')
 def zc_exporter_view():
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'ZC'), 'view.html')
+    return pages.response(request, 'ZC', 'view.html')
 
 # Edit Routes with data loaded from database
 @app.route('/packaging_list/edit')
@@ -270,8 +668,8 @@ def packaging_list_edit():
     if record_id:
         record = PackagingList.query.get(record_id)
         if record:
-            return render_template('packaging_list/edit.html', record=record)
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'packaging_list'), 'edit.html')
+            return assets.rewrite(render_template('packaging_list/edit.html', record=record))
+    return pages.response(request, 'packaging_list', 'edit.html')
 
 @app.route('/proforma_invoice/edit')
 def proforma_invoice_edit():
@@ -279,8 +677,8 @@ def proforma_invoice_edit():
     if record_id:
         record = ProformaInvoice.query.get(record_id)
         if record:
-            return render_template('proforma_invoice/edit.html', record=record)
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'proforma_invoice'), 'edit.html')
+            return assets.rewrite(render_template('proforma_invoice/edit.html', record=record))
+    return pages.response(request, 'proforma_invoice', 'edit.html')
 
 @app.route('/zc_exporter/edit')
 def zc_exporter_edit():
@@ -288,525 +686,552 @@ def zc_exporter_edit():
     if record_id:
         record = ZCExporter.query.get(record_id)
         if record:
-            return render_template('ZC/edit.html', record=record)
-    return send_from_directory(os.path.join(os.path.dirname(__file__), 'ZC'), 'edit.html')
+            return assets.rewrite(render_template('ZC/edit.html', record=record))
+    return pages.response(request, 'ZC', 'edit.html')
 
 @app.route('/packaging_list/print/<int:id>')
 def packaging_list_print(id):
     try:
-        record = PackagingList.query.get(id)
-        if not record:
+        version = _record_version(PackagingList, id)
+        if version is None:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
-        
-        def _as_dict(v):
-            if v is None:
-                return {}
-            if isinstance(v, dict):
-                return v
-            if isinstance(v, str):
-                try:
-                    return json.loads(v)
-                except Exception:
-                    return {}
-            return {}
-
-        # Prepare data for template
-        items_data = []
-        moduleB_data = _as_dict(getattr(record, 'moduleB_data', None))
-
-        # Expected shape: { itemHierarchies: [ { itemNumber, associatedBoxes:[{boxNo, description, qty, dimensions, weights}, ...] } ] }
-        if isinstance(moduleB_data.get('itemHierarchies'), list):
-            for h in moduleB_data.get('itemHierarchies'):
-                if not isinstance(h, dict):
-                    continue
-                item_no = str(h.get('itemNumber', '')).strip()
-                for b in h.get('associatedBoxes') or []:
-                    if not isinstance(b, dict):
-                        continue
-                    dims = b.get('dimensions') if isinstance(b.get('dimensions'), dict) else {}
-                    wts = b.get('weights') if isinstance(b.get('weights'), dict) else {}
-                    items_data.append({
-                        'itemNos': item_no,
-                        'boxNos': str(b.get('boxNo', '')).strip(),
-                        'description': str(b.get('description', '')).strip(),
-                        'qty': b.get('qty', ''),
-                        'l': dims.get('l', ''),
-                        'w': dims.get('w', ''),
-                        'h': dims.get('h', ''),
-                        'netWt': wts.get('net', ''),
-                        'grossWt': wts.get('gross', ''),
-                    })
-        else:
-            legacy_items = getattr(record, 'items', None)
-            if isinstance(legacy_items, list):
-                items_data = legacy_items
-        
-        # Calculate totals
-        total_net_weight = 0
-        total_gross_weight = 0
-        total_boxes = 0
+        html = print_cache.get('packaging_list', id, version)
+        if html is not None:
+            return html
 
-        def _safe_float(value):
-            try:
-                return float(value)
-            except (TypeError, ValueError):
-                return 0.0
+        record = PackagingList.query.get(id)
+        html = _render_packaging_list_print(record)
+        print_cache.put('packaging_list', id, version, html)
+        return html
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-        unique_boxes = set()
-        for item in items_data:
-            net = item.get('netWt') or item.get('netWeight') or item.get('net_weight', 0)
-            gross = item.get('grossWt') or item.get('grossWeight') or item.get('gross_weight', 0)
-            total_net_weight += _safe_float(net)
-            total_gross_weight += _safe_float(gross)
+def _packaging_list_print_data(record):
+    data = load_print_model(record.print_model)
+    if data is None:
+        # Missing (created before print models existed) or stale version:
+        # built for this page only. A print is a read, so it saves nothing;
+        # migration 6 stores the models.
+        data = build_print_model(record)['data']
+    return data
 
-            box_nos = item.get('boxNos') or ''
-            for part in str(box_nos).split(','):
-                box = part.strip()
-                if box:
-                    unique_boxes.add(box)
-
-        total_boxes = len(unique_boxes)
-
-        def _to_int_or_str(val):
-            s = str(val).strip()
-            if s.isdigit():
-                return int(s)
-            return s
-
-        sorted_items = sorted(
-            items_data,
-            key=lambda x: (
-                _to_int_or_str(x.get('itemNos', '')),
-                _to_int_or_str(x.get('boxNos', '')),
-                str(x.get('description', '')).strip(),
-            ),
-        )
+def _render_packaging_list_print(record):
+    data = _packaging_list_print_data(record)
 
-        grouped_items = []
-        current = None
-        for item in sorted_items:
-            item_nos = str(item.get('itemNos', '')).strip()
-            desc = str(item.get('description', '')).strip()
-
-            row = {
-                'boxNos': str(item.get('boxNos', '')).strip(),
-                'description': desc,
-                'qty': item.get('qty', ''),
-                'l': item.get('l', ''),
-                'w': item.get('w', ''),
-                'h': item.get('h', ''),
-                'netWt': item.get('netWt') or item.get('netWeight') or item.get('net_weight', ''),
-                'grossWt': item.get('grossWt') or item.get('grossWeight') or item.get('gross_weight', ''),
-            }
-
-            if current and current.get('itemNos') == item_nos:
-                current['rows'].append(row)
-                current['rowspan'] = len(current['rows'])
-            else:
-                current = {
-                    'itemNos': item_nos,
-                    'rows': [row],
-                    'rowspan': 1,
-                }
-                grouped_items.append(current)
-
-        for g in grouped_items:
-            descriptions = [str(r.get('description', '')).strip() for r in g.get('rows', [])]
-            first_desc = descriptions[0] if descriptions else ''
-            g['description_merged'] = bool(descriptions) and all(d == first_desc for d in descriptions)
-            g['description'] = first_desc if g['description_merged'] else ''
-            g['description_rowspan'] = g['rowspan'] if g['description_merged'] else 1
-        
-        data = {
-            'consigneeAddress': record.consigneeAddress or '',
-            'taxNumber': record.taxNumber or '',
-            'deliveryAddress': record.deliveryAddress or '',
-            'date': record.date.strftime('%Y-%m-%d') if record.date else '',
-            'po_no': record.poNumber or '',
-            'packing_list_no': record.packingListNo or '',
-            'loding_port': record.loadingPort or '',
-            'discharge_port': record.dischargePort or '',
-            'hs_code': record.hsCode or '',
-            'total_boxes': total_boxes,
-            'items': grouped_items,
-            'total_net_weight': f"{total_net_weight:.2f}",
-            'total_gross_weight': f"{total_gross_weight:.2f}"
-        }
-        
-        # Save data to JSON file in packaging_list folder
-        packaging_folder = os.path.join(os.path.dirname(__file__), 'packaging_list')
-        json_file_path = os.path.join(packaging_folder, 'data.json')
-        
-        with open(json_file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        return render_template('packaging_list/packing_start.html', **data)
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 400
+    snapshots.submit('packaging_list', 'print', record.id, data)
+
+    return render_template('packaging_list/packing_start.html', **data)
 
 @app.route('/proforma_invoice/print/<int:id>')
 def proforma_invoice_print(id):
     try:
-        record = ProformaInvoice.query.get(id)
-        if not record:
+        version = _record_version(ProformaInvoice, id)
+        if version is None:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
+        html = print_cache.get('proforma_invoice', id, version)
+        if html is not None:
+            return html
 
-        def _sf(v):
-            try:
-                if v is None:
-                    return 0.0
-                if isinstance(v, (int, float)):
-                    return float(v)
-                s = str(v)
-                cleaned = ''.join(ch for ch in s if (ch.isdigit() or ch in '.-'))
-                return float(cleaned) if cleaned else 0.0
-            except Exception:
+        record = ProformaInvoice.query.get(id)
+        html = _render_proforma_invoice_print(record)
+        print_cache.put('proforma_invoice', id, version, html)
+        return html
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+def _proforma_invoice_print_data(record):
+    def _sf(v):
+        try:
+            if v is None:
                 return 0.0
+            if isinstance(v, (int, float)):
+                return float(v)
+            s = str(v)
+            cleaned = ''.join(ch for ch in s if (ch.isdigit() or ch in '.-'))
+            return float(cleaned) if cleaned else 0.0
+        except Exception:
+            return 0.0
+
+    currency = (record.currency or 'USD').strip()
+    # The rate the invoice was priced with
+    rate = float(_invoice_rate(record).divisor)
+
+    total_in_inr = _sf(record.total_amount)
+    advance_in_inr = _sf(record.advance_amount)
+    received_in_inr = _sf(record.received_amount)
+    balance_in_inr = _sf(record.balance_amount)
+
+    # These are used in the right-side numeric cells.
+    total_amount_fmt = f"{total_in_inr:.2f}"
+    advance_amount_fmt = f"{advance_in_inr:.2f}"
+    received_amount_fmt = f"{received_in_inr:.2f}"
+    balance_amount_fmt = f"{balance_in_inr:.2f}"
+
+    # These are used in the left-side spans; convert from INR when currency is USD/DINAR.
+    advance_amount_display = f"{(advance_in_inr / rate):.2f}"
+    balance_amount_display = f"{(balance_in_inr / rate):.2f}"
+
+    data = {
+        'bill_to_address': record.bill_to_address or '',
+        'date': record.invoice_date or '',
+        'invoice_no': record.invoice_no or '',
+        'po_wo_number': record.po_wo_number or '',
+        'your_reference_no': record.your_reference_no or '',
+        'our_reference_no': record.our_ref_no or '',
+        'currency': currency,
+        'items': record.line_items or [],
+
+        'total_amount': total_amount_fmt,
+        'advance_amount': advance_amount_fmt,
+        'received_details': record.receivable_amount or '',
+        'received_amount': received_amount_fmt,
+        'balance_amount': balance_amount_fmt,
+
+        'advance_amount_display': advance_amount_display,
+        'balance_amount_display': balance_amount_display,
+
+        'country_of_origin': record.country_of_origin or '',
+        'port_of_embarkation': record.port_of_embarkation or '',
+        'port_of_discharge': record.port_of_discharge or '',
+        'date_created': record.created_at.strftime('%Y-%m-%d') if record.created_at else ''
+    }
+    return data
 
-        currency = (record.currency or 'USD').strip()
-        currency_u = currency.upper()
-        rate = 1.0
-        if currency_u == 'USD':
-            rate = 90.0
-        elif currency_u in ('DINAR', 'DNR', 'KWD'):
-            rate = 286.0
-
-        total_in_inr = _sf(record.total_amount)
-        advance_in_inr = _sf(record.advance_amount)
-        received_in_inr = _sf(record.received_amount)
-        balance_in_inr = _sf(record.balance_amount)
-
-        # These are used in the right-side numeric cells.
-        total_amount_fmt = f"{total_in_inr:.2f}"
-        advance_amount_fmt = f"{advance_in_inr:.2f}"
-        received_amount_fmt = f"{received_in_inr:.2f}"
-        balance_amount_fmt = f"{balance_in_inr:.2f}"
-
-        # These are used in the left-side spans; convert from INR when currency is USD/DINAR.
-        advance_amount_display = f"{(advance_in_inr / rate):.2f}"
-        balance_amount_display = f"{(balance_in_inr / rate):.2f}"
-
-        data = {
-            'bill_to_address': record.bill_to_address or '',
-            'date': record.invoice_date or '',
-            'invoice_no': record.invoice_no or '',
-            'po_wo_number': record.po_wo_number or '',
-            'your_reference_no': record.your_reference_no or '',
-            'our_reference_no': record.our_ref_no or '',
-            'currency': currency,
-            'items': record.line_items or [],
+def _render_proforma_invoice_print(record):
+    return render_template('proforma_invoice/start.html', **_proforma_invoice_print_data(record))
+
+@app.route('/zc_exporter/print/<int:id>')
+def zc_exporter_print(id):
+    try:
+        version = _record_version(ZCExporter, id)
+        if version is None:
+            return jsonify({'success': False, 'message': 'Record not found'}), 404
+        html = print_cache.get('zc_exporter', id, version)
+        if html is not None:
+            return html
 
-            'total_amount': total_amount_fmt,
-            'advance_amount': advance_amount_fmt,
-            'received_details': record.receivable_amount or '',
-            'received_amount': received_amount_fmt,
-            'balance_amount': balance_amount_fmt,
+        record = ZCExporter.query.get(id)
+        html = _render_zc_exporter_print(record)
+        print_cache.put('zc_exporter', id, version, html)
+        return html
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-            'advance_amount_display': advance_amount_display,
-            'balance_amount_display': balance_amount_display,
+def _render_zc_exporter_print(record):
+    # Use logic module to prepare data with dynamic row calculation
+    data = prepare_invoice_data(record)
 
-            'country_of_origin': record.country_of_origin or '',
-            'port_of_embarkation': record.port_of_embarkation or '',
-            'port_of_discharge': record.port_of_discharge or '',
-            'date_created': record.created_at.strftime('%Y-%m-%d') if record.created_at else ''
-        }
+    snapshots.submit('ZC', 'print', record.id, data)
 
-        return render_template('proforma_invoice/start.html', **data)
+    return render_template('ZC/start.html', **data)
+
+# Batch print: /print/batch?type=<document type>&ids=3,1,2 loads the records
+# with one IN query and streams a single document, one page per record in the
+# order given, reusing the per-type renderers and cached pages.
+PRINT_RENDERERS = {
+    'packaging_list': (PackagingList, _render_packaging_list_print),
+    'proforma_invoice': (ProformaInvoice, _render_proforma_invoice_print),
+    'zc_exporter': (ZCExporter, _render_zc_exporter_print),
+}
+PRINT_BATCH_MAX = int(os.environ.get('PRINT_BATCH_MAX', '200'))
 
+
+
+def _batch_ids(raw):
+    # "3,1,2" (or a list) -> unique ids in the order given; ValueError with a user-facing message
+    parts = raw if isinstance(raw, list) else str(raw or '').split(',')
+    try:
+        ids = list(dict.fromkeys(int(x) for x in parts if str(x).strip()))
+    except (TypeError, ValueError):
+        raise ValueError('ids must be a comma separated list of record ids')
+    if not ids:
+        raise ValueError('No record ids given')
+    if len(ids) > PRINT_BATCH_MAX:
+        raise ValueError(f'At most {PRINT_BATCH_MAX} records per batch')
+    return ids
+
+
+@app.route('/print/batch')
+def print_batch():
+    kind = (request.args.get('type') or '').strip().replace('-', '_')
+    if kind not in PRINT_RENDERERS:
+        return jsonify({'success': False, 'message': f"Unknown document type: {request.args.get('type')}"}), 400
+    model, render = PRINT_RENDERERS[kind]
+    try:
+        ids = _batch_ids(request.args.get('ids'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        records = {record.id: record for record in model.query.filter(model.id.in_(ids)).all()}
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
+    missing = [record_id for record_id in ids if record_id not in records]
+    if missing:
+        return jsonify({'success': False, 'message': f"Record not found: {', '.join(map(str, missing))}"}), 404
+
+    def _rendered_pages():
+        for record_id in ids:
+            record = records[record_id]
+            version = _loaded_record_version(record)
+            html = print_cache.get(kind, record_id, version)
+            if html is None:
+                try:
+                    html = render(record)
+                except Exception as e:
+                    # Headers are already sent; keep the failure visible on the printout
+                    yield f'<p>Record {record_id} could not be rendered: {escape(str(e))}</p>'
+                    continue
+                print_cache.put(kind, record_id, version, html)
+            yield html
+
+    return Response(stream_with_context(batch_document(_rendered_pages())), content_type='text/html; charset=utf-8')
+
+# PDF: /<document>/pdf/<id> renders the print model with fpdf2 in a process
+# pool (PDF_WORKERS, default one per CPU); finished files are cached by record
+# version. Batches run as jobs: POST /api/pdf/jobs {"type", "ids"}, then poll
+# /api/pdf/jobs/<job_id> and fetch /api/pdf/jobs/<job_id>/download (zip).
+PDF_SOURCES = {
+    'packaging_list': (PackagingList, _packaging_list_print_data),
+    'proforma_invoice': (ProformaInvoice, _proforma_invoice_print_data),
+    'zc_exporter': (ZCExporter, prepare_invoice_data),
+}
+PDF_TIMEOUT = float(os.environ.get('PDF_TIMEOUT', '120'))
 
-@app.route('/zc_exporter/print/<int:id>')
-def zc_exporter_print(id):
+def _current_record_version(kind, record_id):
+    # Called when a PDF finishes rendering, outside the request that started it
+    with app.app_context():
+        return _record_version(PDF_SOURCES[kind][0], record_id)
+
+
+pdf_cache = RenderCache(max_entries=int(os.environ.get('PDF_CACHE_SIZE', '64')))
+pdf_renderer = PdfRenderer(
+    pdf_cache,
+    assets_dir=app.static_folder,
+    max_workers=int(os.environ.get('PDF_WORKERS', '0')) or None,
+    current_version=_current_record_version,
+)
+
+
+def _pdf_response(kind, record_id):
+    if not pdf_renderer.available:
+        return jsonify({'success': False, 'message': 'PDF rendering requires fpdf2'}), 503
+    model, prepare = PDF_SOURCES[kind]
     try:
-        record = ZCExporter.query.get(id)
-        if not record:
+        version = _record_version(model, record_id)
+        if version is None:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
-        
-        # Use logic module to prepare data with dynamic row calculation
-        data = prepare_invoice_data(record)
-        
-        # Save data to JSON file in ZC folder
-        zc_folder = os.path.join(os.path.dirname(__file__), 'ZC')
-        json_file_path = os.path.join(zc_folder, 'data.json')
-        
-        with open(json_file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        return render_template('ZC/start.html', **data)
+        pdf = pdf_renderer.render(kind, record_id, version,
+                                  lambda: prepare(model.query.get(record_id)), timeout=PDF_TIMEOUT)
+        return Response(pdf, mimetype='application/pdf',
+                        headers={'Content-Disposition': f'inline; filename="{kind}_{record_id}.pdf"'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
-@app.route('/api/packaging-list/create', methods=['POST'])
-def create_packaging_list():
-    try:
-        data = request.get_json()
-        
-        # --- 1. Helper for Float Conversion ---
-        def _sf(v):
-            try: return float(v) if v else 0.0
-            except: return 0.0
-
-        a_type = data.get('moduleAType')
-        a_data = data.get('moduleA', {})
-        b_type = data.get('moduleBType')
-        b_data = data.get('moduleB', [])
-
-        def _normalize_a1_rows(raw_a1):
-            # Supports:
-            # - Flattened rows: [{boxNumbers, description, qty, l, w, h, netWt, grossWt}, ...]
-            # - Nested sections: [{material:{description}, boxes:[{boxNumber,...}, ...]}, ...]
-            out = []
-            if not isinstance(raw_a1, list):
-                return out
-
-            for entry in raw_a1:
-                if not isinstance(entry, dict):
-                    continue
+@app.route('/packaging_list/pdf/<int:id>')
+def packaging_list_pdf(id):
+    return _pdf_response('packaging_list', id)
 
-                is_nested = isinstance(entry.get('boxes'), list) and isinstance(entry.get('material'), dict)
-                if is_nested:
-                    desc = str((entry.get('material') or {}).get('description') or '')
-                    for box in entry.get('boxes') or []:
-                        if not isinstance(box, dict):
-                            continue
-                        out.append({
-                            'boxNumbers': box.get('boxNumber') or box.get('boxNumbers') or '',
-                            'description': desc,
-                            'qty': box.get('qty'),
-                            'l': box.get('l'),
-                            'w': box.get('w'),
-                            'h': box.get('h'),
-                            'netWt': box.get('netWt'),
-                            'grossWt': box.get('grossWt'),
-                        })
-                    continue
+@app.route('/proforma_invoice/pdf/<int:id>')
+def proforma_invoice_pdf(id):
+    return _pdf_response('proforma_invoice', id)
 
-                # Assume already-flat row (keep a stable shape for downstream)
-                out.append({
-                    'boxNumbers': entry.get('boxNumbers') or entry.get('boxNumber') or '',
-                    'description': entry.get('description') or '',
-                    'qty': entry.get('qty'),
-                    'l': entry.get('l'),
-                    'w': entry.get('w'),
-                    'h': entry.get('h'),
-                    'netWt': entry.get('netWt'),
-                    'grossWt': entry.get('grossWt'),
-                })
+@app.route('/zc_exporter/pdf/<int:id>')
+def zc_exporter_pdf(id):
+    return _pdf_response('zc_exporter', id)
 
+@app.route('/api/pdf/jobs', methods=['POST'])
+def create_pdf_job():
+    if not pdf_renderer.available:
+        return jsonify({'success': False, 'message': 'PDF rendering requires fpdf2'}), 503
+    try:
+        data = request.get_json() or {}
+        kind = str(data.get('type') or '').strip().replace('-', '_')
+        if kind not in PDF_SOURCES:
+            return jsonify({'success': False, 'message': f"Unknown document type: {data.get('type')}"}), 400
+        ids = _batch_ids(data.get('ids'))
+        model, prepare = PDF_SOURCES[kind]
+        records = {record.id: record for record in model.query.filter(model.id.in_(ids)).all()}
+        missing = [record_id for record_id in ids if record_id not in records]
+        if missing:
+            return jsonify({'success': False, 'message': f"Record not found: {', '.join(map(str, missing))}"}), 404
+        job_id = pdf_renderer.start_job(kind, [
+            (record_id, _loaded_record_version(records[record_id]),
+             lambda record=records[record_id]: prepare(record))
+            for record_id in ids
+        ])
+        return jsonify({
+            'success': True,
+            'jobId': job_id,
+            'statusUrl': f'/api/pdf/jobs/{job_id}',
+            'downloadUrl': f'/api/pdf/jobs/{job_id}/download',
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/pdf/jobs/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    status = pdf_renderer.job(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(status), 200
+
+@app.route('/api/pdf/jobs/<job_id>/download', methods=['GET'])
+def download_pdf_job(job_id):
+    status = pdf_renderer.job(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if status['status'] == 'running':
+        return jsonify({'success': False, 'message': 'Job is still running', 'job': status}), 409
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as zf:
+        for record_id, pdf in pdf_renderer.job_files(job_id):
+            zf.writestr(f"{status['type']}_{record_id}.pdf", pdf)
+    return Response(buf.getvalue(), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{status["type"]}_{job_id[:8]}.zip"'})
+
+def _build_packaging_list(data):
+    """Transform a create payload into an unsaved PackagingList (shared by create and bulk import)"""
+    # --- 1. Helper for Float Conversion ---
+    def _sf(v):
+        try: return float(v) if v else 0.0
+        except: return 0.0
+
+    a_type = data.get('moduleAType')
+    a_data = data.get('moduleA', {})
+    b_type = data.get('moduleBType')
+    b_data = data.get('moduleB', [])
+
+    def _normalize_a1_rows(raw_a1):
+        # Supports:
+        # - Flattened rows: [{boxNumbers, description, qty, l, w, h, netWt, grossWt}, ...]
+        # - Nested sections: [{material:{description}, boxes:[{boxNumber,...}, ...]}, ...]
+        out = []
+        if not isinstance(raw_a1, list):
             return out
 
-        def _parse_tokens(v):
-            raw = str(v or '').strip()
-            if not raw:
-                return []
-            out = []
-            for token in raw.split(','):
-                t = token.strip()
-                if not t:
-                    continue
-                if '-' in t:
-                    parts = [p.strip() for p in t.split('-', 1)]
-                    if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
-                        a = int(parts[0])
-                        b = int(parts[1])
-                        start = min(a, b)
-                        end = max(a, b)
-                        out.extend([str(n) for n in range(start, end + 1)])
+        for entry in raw_a1:
+            if not isinstance(entry, dict):
+                continue
+
+            is_nested = isinstance(entry.get('boxes'), list) and isinstance(entry.get('material'), dict)
+            if is_nested:
+                desc = str((entry.get('material') or {}).get('description') or '')
+                for box in entry.get('boxes') or []:
+                    if not isinstance(box, dict):
                         continue
-                out.append(t)
-            return out
+                    out.append({
+                        'boxNumbers': box.get('boxNumber') or box.get('boxNumbers') or '',
+                        'description': desc,
+                        'qty': box.get('qty'),
+                        'l': box.get('l'),
+                        'w': box.get('w'),
+                        'h': box.get('h'),
+                        'netWt': box.get('netWt'),
+                        'grossWt': box.get('grossWt'),
+                    })
+                continue
 
-        def _safe_max(a, b):
-            try:
-                fa = float(a) if a not in (None, '') else None
-            except Exception:
-                fa = None
-            try:
-                fb = float(b) if b not in (None, '') else None
-            except Exception:
-                fb = None
-            if fa is None:
-                return fb
-            if fb is None:
-                return fa
-            return max(fa, fb)
-
-        def _aggregate_a2_materials(materials):
-            descs = []
-            qty_sum = 0.0
-            net_sum = 0.0
-            gross_sum = 0.0
-            l_max = None
-            w_max = None
-            h_max = None
-            for m in materials or []:
-                d = (m.get('description') or '').strip() if isinstance(m, dict) else ''
-                if d:
-                    descs.append(d)
-                if isinstance(m, dict):
-                    qty_sum += _sf(m.get('qty'))
-                    net_sum += _sf(m.get('netWt'))
-                    gross_sum += _sf(m.get('grossWt'))
-                    l_max = _safe_max(l_max, m.get('l'))
-                    w_max = _safe_max(w_max, m.get('w'))
-                    h_max = _safe_max(h_max, m.get('h'))
-            return {
-                'description': ' | '.join(descs) if descs else 'N/A',
-                'qty': qty_sum,
-                'l': l_max,
-                'w': w_max,
-                'h': h_max,
-                'netWt': net_sum,
-                'grossWt': gross_sum,
-                'materials': materials or []
-            }
-
-        # --- 2. Calculate Weights (User Logic) ---
-        total_net = 0.0
-        total_gross = 0.0
-
-        if a_type == 'A1': # List of multiple box objects
-            for r in _normalize_a1_rows(a_data):
-                total_net += _sf(r.get('netWt'))
-                total_gross += _sf(r.get('grossWt'))
-        elif a_type == 'A2': # Nested Materials
-            for m in a_data.get('materials', []):
-                total_net += _sf(m.get('netWt'))
-                total_gross += _sf(m.get('grossWt'))
-        elif a_type == 'A3': # Single Box Object
-            total_net = _sf(a_data.get('netWt'))
-            total_gross = _sf(a_data.get('grossWt'))
-
-        # --- 3. Transformation: Build the Relational JSON ---
-        # We pivot on Box Number but group by Item Number (Left Side)
-        
-        # Step A: Create a lookup for Box Details from Module A
-        # (Handling the common A3 single-object case or A1 list case)
-        box_lookup = {}
-        if a_type == 'A3' and isinstance(a_data, dict):
-            for b_no in _parse_tokens(a_data.get('boxNumber')):
-                box_lookup[str(b_no)] = a_data
-        elif a_type == 'A1' and isinstance(a_data, list):
-            for r in _normalize_a1_rows(a_data):
-                for b_no in _parse_tokens(r.get('boxNumbers')):
-                    box_lookup[str(b_no)] = r
-        elif a_type == 'A2' and isinstance(a_data, dict):
-            for b_no in _parse_tokens(a_data.get('boxNumber')):
-                box_lookup[str(b_no)] = _aggregate_a2_materials(a_data.get('materials', []))
-
-        # Normalize Module B to: item_number -> set(box_numbers)
-        item_to_boxes = {}
-        if b_type == 'B1' and isinstance(b_data, list):
-            for r in b_data:
-                if not isinstance(r, dict):
-                    continue
-                for box_no in _parse_tokens(r.get('boxNumber')):
-                    for item_no in _parse_tokens(r.get('itemNumbers')):
-                        item_to_boxes.setdefault(str(item_no), set()).add(str(box_no))
-        elif b_type == 'B2' and isinstance(b_data, list):
-            for r in b_data:
-                if not isinstance(r, dict):
-                    continue
-                for item_no in _parse_tokens(r.get('itemNumber')):
-                    for box_no in _parse_tokens(r.get('boxNumbers')):
-                        item_to_boxes.setdefault(str(item_no), set()).add(str(box_no))
-        elif b_type == 'B3' and isinstance(b_data, dict):
-            for item_no in _parse_tokens(b_data.get('itemNumber')):
-                for box_no in _parse_tokens(b_data.get('boxNumber')):
-                    item_to_boxes.setdefault(str(item_no), set()).add(str(box_no))
-
-        # Determine box -> items, for Many-to-One detection
-        box_to_items = {}
-        for item_no, boxes in item_to_boxes.items():
-            for b_no in boxes:
-                box_to_items.setdefault(b_no, set()).add(item_no)
-
-        # Step B: Build Item Hierarchies (The "Left Side" logic)
-        item_hierarchies = []
-        def _sort_key(x):
-            return int(x) if str(x).isdigit() else str(x)
-
-        for item_no in sorted(item_to_boxes.keys(), key=_sort_key):
-            box_list = sorted(list(item_to_boxes.get(item_no, set())), key=_sort_key)
-
-            # Determine Relationship Type
-            rel_type = "One-to-One"
-            if any(len(box_to_items.get(b_no, set())) > 1 for b_no in box_list):
-                rel_type = "Many-to-One"
-            elif len(box_list) > 1:
-                rel_type = "One-to-Many"
-
-            # Map details from the "Right Side" (Module A)
-            associated_boxes = []
-            for b_no in box_list:
-                details = box_lookup.get(b_no, {})
-                associated_boxes.append({
-                    "boxNo": b_no,
-                    "description": details.get('description', 'N/A') if isinstance(details, dict) else 'N/A',
-                    "qty": _sf(details.get('qty')) if isinstance(details, dict) else 0.0,
-                    "dimensions": {
-                        "l": details.get('l') if isinstance(details, dict) else None,
-                        "w": details.get('w') if isinstance(details, dict) else None,
-                        "h": details.get('h') if isinstance(details, dict) else None
-                    },
-                    "weights": {
-                        "net": _sf(details.get('netWt')) if isinstance(details, dict) else 0.0,
-                        "gross": _sf(details.get('grossWt')) if isinstance(details, dict) else 0.0
-                    }
-                })
+            # Assume already-flat row (keep a stable shape for downstream)
+            out.append({
+                'boxNumbers': entry.get('boxNumbers') or entry.get('boxNumber') or '',
+                'description': entry.get('description') or '',
+                'qty': entry.get('qty'),
+                'l': entry.get('l'),
+                'w': entry.get('w'),
+                'h': entry.get('h'),
+                'netWt': entry.get('netWt'),
+                'grossWt': entry.get('grossWt'),
+            })
 
+        return out
+
+    def _safe_max(a, b):
+        try:
+            fa = float(a) if a not in (None, '') else None
+        except Exception:
+            fa = None
+        try:
+            fb = float(b) if b not in (None, '') else None
+        except Exception:
+            fb = None
+        if fa is None:
+            return fb
+        if fb is None:
+            return fa
+        return max(fa, fb)
+
+    def _aggregate_a2_materials(materials):
+        descs = []
+        qty_sum = 0.0
+        net_sum = 0.0
+        gross_sum = 0.0
+        l_max = None
+        w_max = None
+        h_max = None
+        for m in materials or []:
+            d = (m.get('description') or '').strip() if isinstance(m, dict) else ''
+            if d:
+                descs.append(d)
+            if isinstance(m, dict):
+                qty_sum += _sf(m.get('qty'))
+                net_sum += _sf(m.get('netWt'))
+                gross_sum += _sf(m.get('grossWt'))
+                l_max = _safe_max(l_max, m.get('l'))
+                w_max = _safe_max(w_max, m.get('w'))
+                h_max = _safe_max(h_max, m.get('h'))
+        return {
+            'description': ' | '.join(descs) if descs else 'N/A',
+            'qty': qty_sum,
+            'l': l_max,
+            'w': w_max,
+            'h': h_max,
+            'netWt': net_sum,
+            'grossWt': gross_sum,
+            'materials': materials or []
+        }
+
+    # --- 2. Calculate Weights (User Logic) ---
+    total_net = 0.0
+    total_gross = 0.0
+
+    if a_type == 'A1': # List of multiple box objects
+        for r in _normalize_a1_rows(a_data):
+            total_net += _sf(r.get('netWt'))
+            total_gross += _sf(r.get('grossWt'))
+    elif a_type == 'A2': # Nested Materials
+        for m in a_data.get('materials', []):
+            total_net += _sf(m.get('netWt'))
+            total_gross += _sf(m.get('grossWt'))
+    elif a_type == 'A3': # Single Box Object
+        total_net = _sf(a_data.get('netWt'))
+        total_gross = _sf(a_data.get('grossWt'))
+
+    # --- 3. Transformation: Build the Relational JSON ---
+    # We pivot on Box Number but group by Item Number (Left Side)
+
+    # Step A: Map box ranges to their details from Module A
+    # (Handling the common A3 single-object case or A1 list case)
+    box_lookup = BoxMap()
+    if a_type == 'A3' and isinstance(a_data, dict):
+        box_lookup.assign(RangeSet.parse(a_data.get('boxNumber')), a_data)
+    elif a_type == 'A1' and isinstance(a_data, list):
+        for r in _normalize_a1_rows(a_data):
+            box_lookup.assign(RangeSet.parse(r.get('boxNumbers')), r)
+    elif a_type == 'A2' and isinstance(a_data, dict):
+        box_lookup.assign(RangeSet.parse(a_data.get('boxNumber')), _aggregate_a2_materials(a_data.get('materials', [])))
+
+    # Normalize Module B to (item ranges, box ranges) pairs
+    item_box_pairs = []
+    if b_type == 'B1' and isinstance(b_data, list):
+        for r in b_data:
+            if not isinstance(r, dict):
+                continue
+            item_box_pairs.append((RangeSet.parse(r.get('itemNumbers')), RangeSet.parse(r.get('boxNumber'))))
+    elif b_type == 'B2' and isinstance(b_data, list):
+        for r in b_data:
+            if not isinstance(r, dict):
+                continue
+            item_box_pairs.append((RangeSet.parse(r.get('itemNumber')), RangeSet.parse(r.get('boxNumbers'))))
+    elif b_type == 'B3' and isinstance(b_data, dict):
+        item_box_pairs.append((RangeSet.parse(b_data.get('itemNumber')), RangeSet.parse(b_data.get('boxNumber'))))
+
+    # Step B: Build Item Hierarchies (The "Left Side" logic)
+    # Items that share the same boxes are joined once as a group; each box
+    # range is split against Module A so "1-20000" stays a single entry.
+    item_hierarchies = []
+    for group in group_items(item_box_pairs):
+        box_list = group['boxes']
+
+        # Determine Relationship Type
+        rel_type = "One-to-One"
+        if group['shared']:
+            rel_type = "Many-to-One"
+        elif len(box_list) > 1:
+            rel_type = "One-to-Many"
+
+        # Map details from the "Right Side" (Module A)
+        associated_boxes = []
+        for boxes, details in box_lookup.split(box_list, default={}):
+            if not isinstance(details, dict):
+                details = {}
+            associated_boxes.append({
+                "boxNo": boxes.to_text(),
+                "boxCount": len(boxes),
+                "description": details.get('description', 'N/A'),
+                "qty": _sf(details.get('qty')),
+                "dimensions": {
+                    "l": details.get('l'),
+                    "w": details.get('w'),
+                    "h": details.get('h')
+                },
+                "weights": {
+                    "net": _sf(details.get('netWt')),
+                    "gross": _sf(details.get('grossWt'))
+                }
+            })
+
+        for item_no in iter_items(group['items']):
             item_hierarchies.append({
                 "itemNumber": item_no,
                 "relationship": rel_type,
                 "associatedBoxes": associated_boxes
             })
 
-        # --- 4. Final Structured Data Object ---
-        # This reflects the format you requested for the JSON output and DB storage
-        final_relational_data = {
-            "itemHierarchies": item_hierarchies,
-            "summary": {
-                "total_net": total_net,
-                "total_gross": total_gross,
-                "currency": data.get('currency', 'USD')
-            }
+    # --- 4. Final Structured Data Object ---
+    # This reflects the format you requested for the JSON output and DB storage
+    final_relational_data = {
+        "itemHierarchies": item_hierarchies,
+        "summary": {
+            "total_net": total_net,
+            "total_gross": total_gross,
+            "currency": data.get('currency', 'USD')
         }
+    }
 
-        # --- 5. Save to Database ---
-        packaging = PackagingList(
-            packingListNo=data.get('packingListNo'),
-            date=datetime.strptime(data.get('date'), '%Y-%m-%d').date() if data.get('date') else None,
-            consigneeAddress=data.get('consigneeAddress'),
-            deliveryAddress=data.get('deliveryAddress'),
-            exporterAddress=data.get('exporterAddress'),
-            poNumber=data.get('poNumber'),
-            loadingPort=data.get('loadingPort'),
-            dischargePort=data.get('dischargePort'),
-            hsCode=data.get('hsCode'),
-            taxNumber=data.get('taxNumber'),
-            currency=data.get('currency'),
-            moduleAType=a_type,
-            moduleA_data=a_data,          # Original raw box data
-            moduleBType=data.get('moduleBType'),
-            moduleB_data=final_relational_data, # STORE THE NEW STRUCTURED RELATIONSHIP HERE
-            total_net_weight=total_net,
-            total_gross_weight=total_gross
-        )
+    # --- 5. Save to Database ---
+    packaging = PackagingList(
+        packingListNo=data.get('packingListNo'),
+        date=datetime.strptime(data.get('date'), '%Y-%m-%d').date() if data.get('date') else None,
+        consigneeAddress=data.get('consigneeAddress'),
+        deliveryAddress=data.get('deliveryAddress'),
+        exporterAddress=data.get('exporterAddress'),
+        poNumber=data.get('poNumber'),
+        loadingPort=data.get('loadingPort'),
+        dischargePort=data.get('dischargePort'),
+        hsCode=data.get('hsCode'),
+        taxNumber=data.get('taxNumber'),
+        currency=data.get('currency'),
+        moduleAType=a_type,
+        moduleA_data=a_data,          # Original raw box data
+        moduleBType=data.get('moduleBType'),
+        moduleB_data=final_relational_data, # STORE THE NEW STRUCTURED RELATIONSHIP HERE
+        total_net_weight=total_net,
+        total_gross_weight=total_gross
+    )
+    packaging.print_model = build_print_model(packaging)
+    return packaging, final_relational_data
+
+
+@app.route('/api/packaging-list/create', methods=['POST'])
+def create_packaging_list():
+    try:
+        data = request.get_json()
+        packaging, final_relational_data = _build_packaging_list(data)
         db.session.add(packaging)
+        db.session.flush()
+        _index_for_search('packaging_list', packaging)
+        _sync_lines('packaging_list', packaging)
+        _update_summary('packaging_list', packaging)
         db.session.commit()
 
-        # --- 6. Create .json file ---
-        filename = f"packing_list_{data.get('packingListNo') or 'temp'}.json"
-        file_path = os.path.join(os.getcwd(), filename)
-        
-        with open(file_path, 'w') as f:
-            # We dump the relational data to the file as well
-            json.dump(final_relational_data, f, indent=4)
+        # --- 6. Snapshot the relational data (opt-in, written in the background) ---
+        snapshots.submit('packaging_list', 'created', packaging.id, final_relational_data, indent=4)
 
         return jsonify({
             'success': True, 
-            'message': f'Saved to DB and created {filename}', 
+            'message': 'Saved to DB', 
             'data': final_relational_data, # Return the relational format
             'id': packaging.id
         }), 201
@@ -824,6 +1249,7 @@ def update_packaging_list(id):
         
         if not packaging:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
+        summary_before = summary_row('packaging_list', packaging)
         
         # Update fields
         packaging.packingListNo = data.get('packingListNo', packaging.packingListNo)
@@ -859,118 +1285,74 @@ def update_packaging_list(id):
         packaging.total_net_weight = total_net_weight
         packaging.total_gross_weight = total_gross_weight
         packaging.updated_at = datetime.now()
+        packaging.print_model = build_print_model(packaging)
+        _index_for_search('packaging_list', packaging)
+        _sync_lines('packaging_list', packaging)
+        _update_summary('packaging_list', packaging, summary_before)
         
         db.session.commit()
+        print_cache.invalidate('packaging_list', packaging.id)
+        pdf_cache.invalidate('packaging_list', packaging.id)
         return jsonify({'success': True, 'message': 'Packaging list updated successfully', 'id': packaging.id}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
 
+def _build_proforma_invoice(data):
+    """Transform a create payload into an unsaved ProformaInvoice (shared by create and bulk import)"""
+    currency = (data.get('currency') or 'INR').strip().upper()
+
+    # Amounts are entered in INR and stored converted at the current rate,
+    # see proforma_invoice/logic.py and currency_rates.py
+    rate = rate_book.current(currency)
+    priced = price_invoice(data, rate.divisor)
+
+    invoice = ProformaInvoice(
+        invoice_date=data.get('invoiceDate'),
+        invoice_no=data.get('invoiceNo'),
+        po_wo_number=data.get('poWoNumber'),
+        our_ref_no=data.get('yourRefNo'),
+        your_reference_no=data.get('yourReferenceNo'),
+        supplier_address=data.get('supplierAddress'),
+        bill_to_address=data.get('billToAddress'),
+
+        currency=currency,
+
+        total_amount=priced['total'],
+        advance_amount=priced['advance'],
+        receivable_amount=priced['receivable'],
+        received_amount=priced['received'],
+        balance_amount=priced['balance'],
+
+        country_of_origin=data.get('countryOfOrigin'),
+        port_of_embarkation=data.get('portOfEmbarkation'),
+        port_of_discharge=data.get('portOfDischarge'),
+        line_items=priced['line_items'],
+        currency_rate_id=rate.id
+    )
+    return invoice
+
+
 @app.route('/api/proforma-invoice/create', methods=['POST'])
 def create_proforma_invoice():
     try:
         data = request.get_json()
-
-        def _sf(v):
-            try:
-                if v is None:
-                    return 0.0
-                if isinstance(v, (int, float)):
-                    return float(v)
-                s = str(v)
-                cleaned = ''.join(ch for ch in s if (ch.isdigit() or ch in '.-'))
-                return float(cleaned) if cleaned else 0.0
-            except Exception:
-                return 0.0
-
-        currency = (data.get('currency') or 'INR').strip().upper()
-
-        # Conversion divisor (from INR to selected currency)
-        divisor = 1.0
-        if currency == 'USD':
-            divisor = 90.0
-        elif currency in ('DINAR', 'DNR', 'KWD'):
-            divisor = 286.0
-
-        # Values entered (assumed INR reference)
-        total_inr = _sf(data.get('totalAmount'))
-        advance_inr = _sf(data.get('advanceAmount'))
-        received_inr = _sf(data.get('receivedAmount'))
-
-        # Convert line items BEFORE storing (assumed INR reference)
-        line_items_final = []
-        raw_items = data.get('lineItems') or []
-        if isinstance(raw_items, list):
-            for it in raw_items:
-                if not isinstance(it, dict):
-                    continue
-                qty = _sf(it.get('quantity'))
-                unit_inr = _sf(it.get('unitRate'))
-                total_line_inr = _sf(it.get('total'))
-
-                unit_final = round(unit_inr / divisor, 2)
-                if total_line_inr:
-                    total_final_line = round(total_line_inr / divisor, 2)
-                else:
-                    total_final_line = round(qty * unit_final, 2)
-
-                line_items_final.append({
-                    'lineNo': it.get('lineNo'),
-                    'partNumber': it.get('partNumber') or '',
-                    'description': it.get('description') or '',
-                    'quantity': str(it.get('quantity') or ''),
-                    'unitRate': f"{unit_final:.2f}",
-                    'total': f"{total_final_line:.2f}",
-                })
-
-        # Convert BEFORE storing
-        total_final = round(total_inr / divisor, 2)
-        advance_final = round(advance_inr / divisor, 2)
-        received_final = round(received_inr / divisor, 2)
-
-        receivable_final = round(total_final - advance_final, 2)
-        balance_final = round(receivable_final - received_final, 2)
-
-
-
-        invoice = ProformaInvoice(
-            invoice_date=data.get('invoiceDate'),
-            invoice_no=data.get('invoiceNo'),
-            po_wo_number=data.get('poWoNumber'),
-            our_ref_no=data.get('yourRefNo'),
-            your_reference_no=data.get('yourReferenceNo'),
-            supplier_address=data.get('supplierAddress'),
-            bill_to_address=data.get('billToAddress'),
-
-            currency=currency,
-
-            total_amount=total_final,
-            advance_amount=advance_final,
-            receivable_amount=receivable_final,
-            received_amount=received_final,
-            balance_amount=balance_final,
-
-            country_of_origin=data.get('countryOfOrigin'),
-            port_of_embarkation=data.get('portOfEmbarkation'),
-            port_of_discharge=data.get('portOfDischarge'),
-            line_items=line_items_final
-        )
+        invoice = _build_proforma_invoice(data)
 
         # show the invoice in a json format
-        # total_amount=total_final,
-        #     advance_amount=advance_final,
-        #     receivable_amount=receivable_final,
-        #     received_amount=received_final,
-        #     balance_amount=balance_final,
         print({
-            'total_amount': total_final,
-            'advance_amount': advance_final,
-            'receivable_amount': receivable_final,
-            'received_amount': received_final,
-            'balance_amount': balance_final
+            'total_amount': invoice.total_amount,
+            'advance_amount': invoice.advance_amount,
+            'receivable_amount': invoice.receivable_amount,
+            'received_amount': invoice.received_amount,
+            'balance_amount': invoice.balance_amount
         })
 
         db.session.add(invoice)
+        db.session.flush()
+        _index_for_search('proforma_invoice', invoice)
+        _sync_lines('proforma_invoice', invoice)
+        _update_summary('proforma_invoice', invoice)
         db.session.commit()
 
         return jsonify({
@@ -993,61 +1375,11 @@ def update_proforma_invoice(id):
         
         if not invoice:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
+        summary_before = summary_row('proforma_invoice', invoice)
         
-        def _sf(v):
-            try:
-                if v is None:
-                    return 0.0
-                if isinstance(v, (int, float)):
-                    return float(v)
-                s = str(v)
-                cleaned = ''.join(ch for ch in s if (ch.isdigit() or ch in '.-'))
-                return float(cleaned) if cleaned else 0.0
-            except Exception:
-                return 0.0
-
         currency = (data.get('currency') or invoice.currency or 'INR').strip().upper()
-        divisor = 1.0
-        if currency == 'USD':
-            divisor = 90.0
-        elif currency in ('DINAR', 'DNR', 'KWD'):
-            divisor = 286.0
-
-        total_inr = _sf(data.get('totalAmount'))
-        advance_inr = _sf(data.get('advanceAmount'))
-        received_inr = _sf(data.get('receivedAmount'))
-
-        total_final = round(total_inr / divisor, 2)
-        advance_final = round(advance_inr / divisor, 2)
-        received_final = round(received_inr / divisor, 2)
-
-        receivable_final = round(total_final - advance_final, 2)
-        balance_final = round(receivable_final - received_final, 2)
-
-        line_items_final = []
-        raw_items = data.get('lineItems') or []
-        if isinstance(raw_items, list):
-            for it in raw_items:
-                if not isinstance(it, dict):
-                    continue
-                qty = _sf(it.get('quantity'))
-                unit_inr = _sf(it.get('unitRate'))
-                total_line_inr = _sf(it.get('total'))
-
-                unit_final = round(unit_inr / divisor, 2)
-                if total_line_inr:
-                    total_final_line = round(total_line_inr / divisor, 2)
-                else:
-                    total_final_line = round(qty * unit_final, 2)
-
-                line_items_final.append({
-                    'lineNo': it.get('lineNo'),
-                    'partNumber': it.get('partNumber') or '',
-                    'description': it.get('description') or '',
-                    'quantity': str(it.get('quantity') or ''),
-                    'unitRate': f"{unit_final:.2f}",
-                    'total': f"{total_final_line:.2f}",
-                })
+        rate = rate_book.current(currency)
+        priced = price_invoice(data, rate.divisor)
 
         # Update fields
         invoice.invoice_date = data.get('invoiceDate', invoice.invoice_date)
@@ -1059,66 +1391,90 @@ def update_proforma_invoice(id):
         invoice.bill_to_address = data.get('billToAddress', invoice.bill_to_address)
 
         invoice.currency = currency
-        invoice.total_amount = total_final
-        invoice.advance_amount = advance_final
-        invoice.receivable_amount = receivable_final
-        invoice.received_amount = received_final
-        invoice.balance_amount = balance_final
+        invoice.total_amount = priced['total']
+        invoice.advance_amount = priced['advance']
+        invoice.receivable_amount = priced['receivable']
+        invoice.received_amount = priced['received']
+        invoice.balance_amount = priced['balance']
 
         invoice.country_of_origin = data.get('countryOfOrigin', invoice.country_of_origin)
         invoice.port_of_embarkation = data.get('portOfEmbarkation', invoice.port_of_embarkation)
         invoice.port_of_discharge = data.get('portOfDischarge', invoice.port_of_discharge)
-        invoice.line_items = line_items_final
+        invoice.line_items = priced['line_items']
+        invoice.currency_rate_id = rate.id
         invoice.updated_at = datetime.now()
+        _index_for_search('proforma_invoice', invoice)
+        _sync_lines('proforma_invoice', invoice)
+        _update_summary('proforma_invoice', invoice, summary_before)
         
         db.session.commit()
+        print_cache.invalidate('proforma_invoice', invoice.id)
+        pdf_cache.invalidate('proforma_invoice', invoice.id)
         return jsonify({'success': True, 'message': 'Proforma invoice updated successfully', 'id': invoice.id}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
 
+def _zc_amount_in_words(data, total, currency, current=None):
+    # Words follow the invoice total unless the user typed their own text
+    if data.get('amountInWordsManual'):
+        return data.get('amountInWords', current)
+    try:
+        return amount_in_words(total, currency)
+    except ValueError:
+        return data.get('amountInWords', current)
+
+def _build_zc_exporter(data):
+    """Transform a create payload into an unsaved ZCExporter (shared by create and bulk import)"""
+    # Create new ZC exporter entry
+    exporter = ZCExporter(
+        invoice_number=data.get('invoiceNumber'),
+        invoice_date=data.get('invoiceDate'),
+        buyer_order_number=data.get('buyerOrderNumber'),
+        buyer_order_date=data.get('buyerOrderDate'),
+        exporter_reference=data.get('exporterReference'),
+        iec_number=data.get('iecNumber'),
+        tax_registration_number=data.get('taxRegistrationNumber'),
+        lut_arn_number=data.get('lutArnNumber'),
+        delivery_payment_terms=data.get('deliveryPaymentTerms'),
+        port_of_loading=data.get('portOfLoading'),
+        port_of_discharge=data.get('portOfDischarge'),
+        pre_carriage_by=data.get('preCarriageBy'),
+        place_of_receipt=data.get('placeOfReceipt'),
+        port_of_destination=data.get('portOfDestination'),
+        destination=data.get('destination'),
+        currency=data.get('currency'),
+        vessel_flight=data.get('vesselFlight'),
+        country_of_origin=data.get('countryOfOrigin'),
+        ad_code=data.get('adCode'),
+        other_reference=data.get('otherReference'),
+        hs_code=data.get('hsCode'),
+        final_destination=data.get('finalDestination'),
+        contact_person_name=data.get('contactPersonName'),
+        contact_email=data.get('contactEmail'),
+        consignee_address=data.get('consigneeAddress'),
+        delivery_address=data.get('deliveryAddress'),
+        amount_in_words=_zc_amount_in_words(data, data.get('totalInvoiceValue'), data.get('currency')),
+        total_export_value=data.get('totalExportValue'),
+        total_gst_value=data.get('totalGstValue'),
+        total_invoice_value=data.get('totalInvoiceValue'),
+        number_of_boxes=data.get('numberOfBoxes'),
+        items=data.get('items')
+    )
+    return exporter
+
+
 @app.route('/api/zc-exporter/create', methods=['POST'])
 def create_zc_exporter():
     try:
         data = request.get_json()
-        
-        # Create new ZC exporter entry
-        exporter = ZCExporter(
-            invoice_number=data.get('invoiceNumber'),
-            invoice_date=data.get('invoiceDate'),
-            buyer_order_number=data.get('buyerOrderNumber'),
-            buyer_order_date=data.get('buyerOrderDate'),
-            exporter_reference=data.get('exporterReference'),
-            iec_number=data.get('iecNumber'),
-            tax_registration_number=data.get('taxRegistrationNumber'),
-            lut_arn_number=data.get('lutArnNumber'),
-            delivery_payment_terms=data.get('deliveryPaymentTerms'),
-            port_of_loading=data.get('portOfLoading'),
-            port_of_discharge=data.get('portOfDischarge'),
-            pre_carriage_by=data.get('preCarriageBy'),
-            place_of_receipt=data.get('placeOfReceipt'),
-            port_of_destination=data.get('portOfDestination'),
-            destination=data.get('destination'),
-            currency=data.get('currency'),
-            vessel_flight=data.get('vesselFlight'),
-            country_of_origin=data.get('countryOfOrigin'),
-            ad_code=data.get('adCode'),
-            other_reference=data.get('otherReference'),
-            hs_code=data.get('hsCode'),
-            final_destination=data.get('finalDestination'),
-            contact_person_name=data.get('contactPersonName'),
-            contact_email=data.get('contactEmail'),
-            consignee_address=data.get('consigneeAddress'),
-            delivery_address=data.get('deliveryAddress'),
-            amount_in_words=data.get('amountInWords'),
-            total_export_value=data.get('totalExportValue'),
-            total_gst_value=data.get('totalGstValue'),
-            total_invoice_value=data.get('totalInvoiceValue'),
-            number_of_boxes=data.get('numberOfBoxes'),
-            items=data.get('items')
-        )
+        exporter = _build_zc_exporter(data)
         
         db.session.add(exporter)
+        db.session.flush()
+        _index_for_search('zc_exporter', exporter)
+        _sync_lines('zc_exporter', exporter)
+        _update_summary('zc_exporter', exporter)
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'ZC exporter created successfully', 'id': exporter.id}), 201
@@ -1134,6 +1490,7 @@ def update_zc_exporter(id):
         
         if not exporter:
             return jsonify({'success': False, 'message': 'Record not found'}), 404
+        summary_before = summary_row('zc_exporter', exporter)
         
         # Update fields
         exporter.invoice_number = data.get('invoiceNumber', exporter.invoice_number)
@@ -1162,40 +1519,775 @@ def update_zc_exporter(id):
         exporter.contact_email = data.get('contactEmail', exporter.contact_email)
         exporter.consignee_address = data.get('consigneeAddress', exporter.consignee_address)
         exporter.delivery_address = data.get('deliveryAddress', exporter.delivery_address)
-        exporter.amount_in_words = data.get('amountInWords', exporter.amount_in_words)
         exporter.total_export_value = data.get('totalExportValue', exporter.total_export_value)
         exporter.total_gst_value = data.get('totalGstValue', exporter.total_gst_value)
         exporter.total_invoice_value = data.get('totalInvoiceValue', exporter.total_invoice_value)
         exporter.number_of_boxes = data.get('numberOfBoxes', exporter.number_of_boxes)
         exporter.items = data.get('items', exporter.items)
+        exporter.amount_in_words = _zc_amount_in_words(
+            data, exporter.total_invoice_value, exporter.currency, exporter.amount_in_words)
         exporter.updated_at = datetime.now()
+        _index_for_search('zc_exporter', exporter)
+        _sync_lines('zc_exporter', exporter)
+        _update_summary('zc_exporter', exporter, summary_before)
         
         db.session.commit()
+        print_cache.invalidate('zc_exporter', exporter.id)
+        pdf_cache.invalidate('zc_exporter', exporter.id)
         return jsonify({'success': True, 'message': 'ZC exporter updated successfully', 'id': exporter.id}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
 
+# Partial update: PATCH /api/<doc_type>/<id> with JSON-Patch style operations
+# (add, remove, replace, test) on header fields ("/invoiceNo") and line items
+# ("/lineItems/3/quantity", "/lineItems/-"), see document_patch.py. Only the
+# touched lines are priced, totals move by their differences and only the
+# affected line rows are rewritten. Amounts are entered in INR as in the forms.
+# Currency changes of a proforma invoice reprice every line and go through PUT.
+PATCH_HEADER_FIELDS = {
+    'packaging-list': {
+        'packingListNo': 'packingListNo', 'date': 'date', 'consigneeAddress': 'consigneeAddress',
+        'deliveryAddress': 'deliveryAddress', 'exporterAddress': 'exporterAddress', 'poNumber': 'poNumber',
+        'loadingPort': 'loadingPort', 'dischargePort': 'dischargePort', 'hsCode': 'hsCode',
+        'taxNumber': 'taxNumber', 'currency': 'currency',
+    },
+    'proforma-invoice': {
+        'invoiceDate': 'invoice_date', 'invoiceNo': 'invoice_no', 'poWoNumber': 'po_wo_number',
+        'yourRefNo': 'our_ref_no', 'yourReferenceNo': 'your_reference_no',
+        'supplierAddress': 'supplier_address', 'billToAddress': 'bill_to_address',
+        'countryOfOrigin': 'country_of_origin', 'portOfEmbarkation': 'port_of_embarkation',
+        'portOfDischarge': 'port_of_discharge',
+    },
+    'zc-exporter': {
+        'invoiceNumber': 'invoice_number', 'invoiceDate': 'invoice_date',
+        'buyerOrderNumber': 'buyer_order_number', 'buyerOrderDate': 'buyer_order_date',
+        'exporterReference': 'exporter_reference', 'iecNumber': 'iec_number',
+        'taxRegistrationNumber': 'tax_registration_number', 'lutArnNumber': 'lut_arn_number',
+        'deliveryPaymentTerms': 'delivery_payment_terms', 'portOfLoading': 'port_of_loading',
+        'portOfDischarge': 'port_of_discharge', 'preCarriageBy': 'pre_carriage_by',
+        'placeOfReceipt': 'place_of_receipt', 'portOfDestination': 'port_of_destination',
+        'destination': 'destination', 'currency': 'currency', 'vesselFlight': 'vessel_flight',
+        'countryOfOrigin': 'country_of_origin', 'adCode': 'ad_code', 'otherReference': 'other_reference',
+        'hsCode': 'hs_code', 'finalDestination': 'final_destination',
+        'contactPersonName': 'contact_person_name', 'contactEmail': 'contact_email',
+        'consigneeAddress': 'consignee_address', 'deliveryAddress': 'delivery_address',
+        'amountInWords': 'amount_in_words',
+    },
+}
+
+# Columns and line fields feeding the search index (search_index.document_fields)
+PATCH_SEARCH_COLUMNS = {
+    'packingListNo', 'poNumber', 'consigneeAddress', 'deliveryAddress', 'exporterAddress',
+    'invoice_no', 'po_wo_number', 'bill_to_address', 'supplier_address',
+    'invoice_number', 'buyer_order_number', 'consignee_address', 'delivery_address',
+}
+PATCH_SEARCH_LINE_FIELDS = {'*', 'partNumber', 'description'}
+
+
+def _patch_searchable(changed, result=None):
+    # Whether the patch touched text the search index holds
+    if PATCH_SEARCH_COLUMNS & set(changed):
+        return True
+    return result is not None and (bool(result.removed) or any(
+        PATCH_SEARCH_LINE_FIELDS & fields for _, _, _, fields in result.touched))
+
+
+def _patch_header(record, fields, header):
+    # Sets the patched header columns; returns the names of those that changed
+    changed = []
+    for name, value in header.items():
+        column = fields[name]
+        if column == 'date':
+            value = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        if getattr(record, column) != value:
+            setattr(record, column, value)
+            changed.append(column)
+    return changed
+
+
+def _patch_packaging_list(record, ops):
+    fields = PATCH_HEADER_FIELDS['packaging-list']
+    result = apply_patch(ops, lambda name: getattr(record, fields[name]), fields, None, (), ())
+    changed = _patch_header(record, fields, result.header)
+    if changed:
+        record.print_model = refresh_print_header(record.print_model, record)
+        changed.append('print_model')
+    # Box rows carry the HS code
+    return changed, (None if 'hsCode' in changed else set()), _patch_searchable(changed)
+
+
+def _patch_proforma_invoice(record, ops):
+    fields = PATCH_HEADER_FIELDS['proforma-invoice']
+    amounts = {'advanceAmount': 'advance_amount', 'receivedAmount': 'received_amount'}
+    result = apply_patch(
+        ops,
+        lambda name: getattr(record, fields.get(name) or amounts[name]),
+        list(fields) + list(amounts),
+        'lineItems', ('lineNo', 'partNumber', 'description', 'quantity', 'unitRate', 'total'),
+        record.line_items if isinstance(record.line_items, list) else [],
+    )
+    changed = _patch_header(record, fields, {k: v for k, v in result.header.items() if k in fields})
+    if not (result.lines_changed or set(amounts) & set(result.header)):
+        return changed, set(), _patch_searchable(changed)
+
+    rate = _invoice_rate(record)
+    priced = price_patch(
+        {'total': record.total_amount, 'advance': record.advance_amount, 'received': record.received_amount},
+        result.touched, result.removed, rate.divisor,
+        advance=result.header.get('advanceAmount'), received=result.header.get('receivedAmount'),
+    )
+    for column, key in (('total_amount', 'total'), ('advance_amount', 'advance'),
+                        ('receivable_amount', 'receivable'), ('received_amount', 'received'),
+                        ('balance_amount', 'balance')):
+        if getattr(record, column) != priced[key]:
+            setattr(record, column, priced[key])
+            changed.append(column)
+    if result.lines_changed:
+        lines = result.lines
+        for position, line in priced['lines'].items():
+            lines[position] = line
+        record.line_items = lines
+        record.currency_rate_id = rate.id
+        changed.append('line_items')
+    positions = None if result.structural else set(priced['lines'])
+    return changed, positions, _patch_searchable(changed, result)
+
+
+def _patch_zc_exporter(record, ops):
+    fields = PATCH_HEADER_FIELDS['zc-exporter']
+    result = apply_patch(
+        ops, lambda name: getattr(record, fields[name]), fields,
+        'items', ('from', 'to', 'description', 'unit', 'quantity', 'rate', 'igstPercent'),
+        record.items if isinstance(record.items, list) else [],
+    )
+    changed = _patch_header(record, fields, result.header)
+    positions = set()
+    if result.lines_changed:
+        priced = price_zc_patch(
+            {'export': record.total_export_value, 'gst': record.total_gst_value},
+            result.touched, result.removed,
+        )
+        items = result.lines
+        for position, item in priced['items'].items():
+            items[position] = item
+        record.items = items
+        changed.append('items')
+        for column, key in (('total_export_value', 'export'), ('total_gst_value', 'gst'),
+                            ('total_invoice_value', 'invoice')):
+            if getattr(record, column) != priced[key]:
+                setattr(record, column, priced[key])
+                changed.append(column)
+        # Number of boxes follows the last row's "to", as in the form
+        last_to = str(items[-1].get('to') or '').strip() if items and isinstance(items[-1], dict) else ''
+        if last_to.isdigit() and record.number_of_boxes != int(last_to):
+            record.number_of_boxes = int(last_to)
+            changed.append('number_of_boxes')
+        positions = None if result.structural else set(priced['items'])
+    if 'amount_in_words' not in changed and {'total_invoice_value', 'currency'} & set(changed):
+        words = _zc_amount_in_words({}, record.total_invoice_value, record.currency, record.amount_in_words)
+        if words != record.amount_in_words:
+            record.amount_in_words = words
+            changed.append('amount_in_words')
+    if 'hs_code' in changed:
+        positions = None
+    return changed, positions, _patch_searchable(changed, result)
+
+
+PATCH_HANDLERS = {
+    'packaging-list': ('packaging_list', PackagingList, _patch_packaging_list),
+    'proforma-invoice': ('proforma_invoice', ProformaInvoice, _patch_proforma_invoice),
+    'zc-exporter': ('zc_exporter', ZCExporter, _patch_zc_exporter),
+}
+
+
+@app.route('/api/<doc_type>/<int:id>', methods=['PATCH'])
+def patch_document(doc_type, id):
+    handler = PATCH_HANDLERS.get(doc_type)
+    if handler is None:
+        return jsonify({'success': False, 'message': f'Unknown document type: {doc_type}'}), 404
+    kind, model, apply_ops = handler
+    try:
+        ops = parse_operations(request.get_json(silent=True))
+        record = model.query.get(id)
+        if not record:
+            return jsonify({'success': False, 'message': 'Record not found'}), 404
+        summary_before = summary_row(kind, record)
+
+        changed, positions, searchable = apply_ops(record, ops)
+        if changed:
+            if 'updated_at' in model.__table__.columns:
+                record.updated_at = datetime.now()
+            _sync_lines(kind, record, positions)
+            _update_summary(kind, record, summary_before)
+            if searchable:
+                _index_for_search(kind, record)
+            db.session.commit()
+            print_cache.invalidate(kind, record.id)
+            pdf_cache.invalidate(kind, record.id)
+        return jsonify({'success': True, 'id': record.id, 'changed': changed}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+# Bulk import: NDJSON body, one create payload per line, run through the same
+# builders as the single-create routes. Each line gets a savepoint so a bad
+# row is skipped without aborting the batch; rows commit every BULK_BATCH_SIZE.
+# The sqlite3 driver only emits BEGIN before INSERT/UPDATE/DELETE, so without
+# an explicit BEGIN each line's SAVEPOINT would open a transaction of its own
+# and its RELEASE would commit it.
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '200'))
+
+BULK_IMPORTERS = {
+    'packaging-list': ('packaging_list', lambda data: _build_packaging_list(data)[0]),
+    'proforma-invoice': ('proforma_invoice', _build_proforma_invoice),
+    'zc-exporter': ('zc_exporter', _build_zc_exporter),
+}
+
+
+@app.route('/api/<doc_type>/bulk', methods=['POST'])
+def bulk_import(doc_type):
+    importer = BULK_IMPORTERS.get(doc_type)
+    if importer is None:
+        return jsonify({'success': False, 'message': f'Unknown document type: {doc_type}'}), 404
+    kind, build = importer
+    batch_size = max(1, request.args.get('batch_size', BULK_BATCH_SIZE, type=int))
+
+    results = []
+    pending = 0
+    committed = 0       # results up to here belong to committed batches
+    in_batch = False
+    try:
+        for line_no, raw in enumerate(request.stream, 1):
+            line = raw.strip()
+            if not line:
+                continue
+            if not in_batch:
+                # Takes the write lock for the whole batch up front
+                db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+                in_batch = True
+            try:
+                with db.session.begin_nested():
+                    data = json_loads(line)
+                    if not isinstance(data, dict):
+                        raise ValueError('Each line must be a JSON object')
+                    record = build(data)
+                    db.session.add(record)
+                    db.session.flush()
+                    _index_for_search(kind, record)
+                    _sync_lines(kind, record)
+                    _update_summary(kind, record)
+                results.append({'line': line_no, 'success': True, 'id': record.id})
+                pending += 1
+            except Exception as e:
+                results.append({'line': line_no, 'success': False, 'message': str(e)})
+
+            if pending >= batch_size:
+                db.session.commit()
+                committed = len(results)
+                pending = 0
+                in_batch = False
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # The open batch was rolled back with its lines
+        for i, result in enumerate(results[committed:], committed):
+            if result['success']:
+                results[i] = {'line': result['line'], 'success': False, 'message': str(e)}
+        return jsonify({'success': False, 'message': str(e), 'results': results}), 400
+
+    failed = sum(1 for r in results if not r['success'])
+    return jsonify({
+        'success': failed == 0,
+        'total': len(results),
+        'created': len(results) - failed,
+        'failed': failed,
+        'results': results,
+    }), 200
+
+# Export: /api/<doc_type>/export?format=csv|ndjson|xlsx with the list API
+# filters. Only the exported table columns are selected (plain rows, nothing
+# accumulates in the session) and fetched EXPORT_FETCH_SIZE at a time while
+# the response streams, one row per line item.
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '500'))
+
+EXPORT_MODELS = {
+    'packaging-list': ('packaging_list', PackagingList, {
+        'number': PackagingList.packingListNo, 'po': PackagingList.poNumber,
+        'currency': PackagingList.currency, 'status': PackagingList.status,
+    }),
+    'proforma-invoice': ('proforma_invoice', ProformaInvoice, {
+        'number': ProformaInvoice.invoice_no, 'po': ProformaInvoice.po_wo_number,
+        'currency': ProformaInvoice.currency, 'status': ProformaInvoice.status,
+    }),
+    'zc-exporter': ('zc_exporter', ZCExporter, {
+        'number': ZCExporter.invoice_number, 'po': ZCExporter.buyer_order_number,
+        'currency': ZCExporter.currency, 'status': ZCExporter.status,
+    }),
+}
+
+
+@app.route('/api/<doc_type>/export', methods=['GET'])
+def export_documents(doc_type):
+    target = EXPORT_MODELS.get(doc_type)
+    if target is None:
+        return jsonify({'success': False, 'message': f'Unknown document type: {doc_type}'}), 404
+    kind, model, fields = target
+    fmt = (request.args.get('format') or 'csv').strip().lower()
+    try:
+        spec = EXPORT_SPECS[kind]
+        table = model.__table__
+        stmt = (
+            db.select(*[table.c[name] for name in spec['columns'] + (spec['source'],)])
+            .where(*_list_filters(model, fields))
+            .order_by(table.c.id)
+            .execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+
+        def records():
+            yield from db.session.execute(stmt).mappings()
+
+        chunks = export_chunks(fmt, kind, records())
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    content_type, ext = EXPORT_FORMATS[fmt]
+    filename = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+    return Response(
+        stream_with_context(chunks),
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+# Aggregates over the line tables: /api/<doc_type>/aggregates?by=<dimension>
+# with the list API filters, computed by SQL GROUP BY. Money is always grouped
+# by currency as well. Packing weights are per box, hence x box_count.
+LINE_AGGREGATES = {
+    'packaging-list': {
+        'dimensions': {
+            'hs_code': [('hsCode', PackagingListBox.hs_code)],
+            'item_number': [('itemNumber', PackagingListBox.item_number)],
+            'month': [('month', db.func.strftime('%Y-%m', PackagingList.created_at))],
+        },
+        'measures': [
+            ('rows', db.func.count(PackagingListBox.id)),
+            ('documents', db.func.count(db.distinct(PackagingListBox.packaging_list_id))),
+            ('boxes', db.func.sum(PackagingListBox.box_count)),
+            ('qty', db.func.sum(PackagingListBox.qty)),
+            ('netWeight', db.func.sum(PackagingListBox.net_weight * PackagingListBox.box_count)),
+            ('grossWeight', db.func.sum(PackagingListBox.gross_weight * PackagingListBox.box_count)),
+        ],
+    },
+    'proforma-invoice': {
+        'dimensions': {
+            'part_number': [('partNumber', ProformaInvoiceLine.part_number), ('currency', ProformaInvoice.currency)],
+            'currency': [('currency', ProformaInvoice.currency)],
+            'month': [('month', db.func.strftime('%Y-%m', ProformaInvoice.created_at)), ('currency', ProformaInvoice.currency)],
+        },
+        'measures': [
+            ('rows', db.func.count(ProformaInvoiceLine.id)),
+            ('documents', db.func.count(db.distinct(ProformaInvoiceLine.invoice_id))),
+            ('quantity', db.func.sum(ProformaInvoiceLine.quantity)),
+            ('total', db.func.sum(ProformaInvoiceLine.total)),
+        ],
+    },
+    'zc-exporter': {
+        'dimensions': {
+            'hs_code': [('hsCode', ZCExporterLine.hs_code), ('currency', ZCExporter.currency)],
+            'unit': [('unit', ZCExporterLine.unit), ('currency', ZCExporter.currency)],
+            'month': [('month', db.func.strftime('%Y-%m', ZCExporter.created_at)), ('currency', ZCExporter.currency)],
+        },
+        'measures': [
+            ('rows', db.func.count(ZCExporterLine.id)),
+            ('documents', db.func.count(db.distinct(ZCExporterLine.exporter_id))),
+            ('quantity', db.func.sum(ZCExporterLine.quantity)),
+            ('amount', db.func.sum(ZCExporterLine.amount)),
+            ('taxableValue', db.func.sum(ZCExporterLine.taxable_value)),
+            ('igstAmount', db.func.sum(ZCExporterLine.igst_amount)),
+        ],
+    },
+}
+
+
+@app.route('/api/<doc_type>/aggregates', methods=['GET'])
+def line_aggregates(doc_type):
+    spec = LINE_AGGREGATES.get(doc_type)
+    if spec is None:
+        return jsonify({'success': False, 'message': f'Unknown document type: {doc_type}'}), 404
+    try:
+        kind, model, fields = EXPORT_MODELS[doc_type]
+        _, line_model, fk = LINE_TABLES[kind]
+        by = (request.args.get('by') or next(iter(spec['dimensions']))).strip()
+        if by not in spec['dimensions']:
+            raise ValueError(f"Unknown dimension '{by}' (expected one of: {', '.join(spec['dimensions'])})")
+        groups = [col.label(name) for name, col in spec['dimensions'][by]]
+        stmt = (
+            db.select(*groups, *[expr.label(name) for name, expr in spec['measures']])
+            .select_from(line_model)
+            .join(model, line_model.__table__.c[fk] == model.id)
+            .where(*_list_filters(model, fields))
+            .group_by(*groups)
+            .order_by(*groups)
+        )
+        rows = [dict(row) for row in db.session.execute(stmt).mappings()]
+        return jsonify({'by': by, 'groups': rows}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+# Analytics: /api/analytics?group=month,type,currency[&type=zc_exporter,...]
+# [&from=YYYY-MM-DD][&to=YYYY-MM-DD] reads only the summary table.
+# Groups: day, month, year, type, currency, port.
+ANALYTICS_GROUPS = {
+    'day': DocumentSummary.day,
+    'month': db.func.substr(DocumentSummary.day, 1, 7),
+    'year': db.func.substr(DocumentSummary.day, 1, 4),
+    'type': DocumentSummary.kind,
+    'currency': DocumentSummary.currency,
+    'port': DocumentSummary.port,
+}
+ANALYTICS_MEASURES = {
+    'documents': 'documents', 'export_value': 'exportValue', 'gst_value': 'gstValue',
+    'invoice_value': 'invoiceValue', 'net_weight': 'netWeight', 'gross_weight': 'grossWeight',
+}
+
+
+@app.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    try:
+        names = [g.strip() for g in (request.args.get('group') or 'month,type,currency').split(',') if g.strip()]
+        unknown = [g for g in names if g not in ANALYTICS_GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown group '{unknown[0]}' (expected any of: {', '.join(ANALYTICS_GROUPS)})")
+        groups = [ANALYTICS_GROUPS[g].label(g) for g in names]
+        conds = []
+        kinds = [k.strip() for k in (request.args.get('type') or '').split(',') if k.strip()]
+        if kinds:
+            conds.append(DocumentSummary.kind.in_(kinds))
+        day_from = _date_arg('from')
+        if day_from:
+            conds.append(DocumentSummary.day >= day_from.date())
+        day_to = _date_arg('to')
+        if day_to:
+            conds.append(DocumentSummary.day <= day_to.date())
+
+        stmt = (
+            db.select(*groups, *[db.func.sum(DocumentSummary.__table__.c[col]).label(label)
+                                 for col, label in ANALYTICS_MEASURES.items()])
+            .where(*conds)
+            .group_by(*groups)
+            .order_by(*groups)
+        )
+        rows = []
+        for row in db.session.execute(stmt).mappings():
+            out = dict(row)
+            if 'day' in out and out['day'] is not None:
+                out['day'] = out['day'].isoformat()
+            for label in ANALYTICS_MEASURES.values():
+                out[label] = round(out[label] or 0, 3)
+            if out['documents']:
+                rows.append(out)
+        return jsonify({'group': names, 'groups': rows}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+# Amount in words: {"amount": "1770.50", "currency": "EUR"} -> {"words": ...};
+# {"amounts": [...]} converts a whole column in one call (null for invalid entries).
+@app.route('/api/amount-in-words', methods=['POST'])
+def convert_amount_in_words():
+    try:
+        data = request.get_json() or {}
+        currency = data.get('currency')
+        if isinstance(data.get('amounts'), list):
+            return jsonify({'success': True, 'words': amounts_in_words(data['amounts'], currency)}), 200
+        return jsonify({'success': True, 'words': amount_in_words(data.get('amount'), currency)}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/search', methods=['GET'])
+def search_documents():
+    try:
+        if not search_index.available:
+            return jsonify({'success': False, 'message': 'Full-text search is not available'}), 503
+        q = (request.args.get('q') or '').strip()
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        kinds = [k for k in (request.args.get('type') or '').split(',') if k.strip()] or None
+        hits = search_index.search(db.session, q, limit=limit, kinds=kinds)
+        urls = {'packaging_list': '/packaging_list', 'proforma_invoice': '/proforma_invoice', 'zc_exporter': '/zc_exporter'}
+        for hit in hits:
+            hit['editUrl'] = f"{urls[hit['type']]}/edit?id={hit['id']}"
+            hit['printUrl'] = f"{urls[hit['type']]}/print/{hit['id']}"
+        return jsonify({'query': q, 'results': hits}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+# Currency rates: GET lists the rate table (?currency=) with the rates in
+# effect now; POST {"currency": "USD", "rate": "88.5", "effectiveFrom":
+# "2025-04-01"} adds a rate. Earlier rates are kept so stored invoices still
+# resolve the rate they were priced with.
+@app.route('/api/currency-rates', methods=['GET'])
+def get_currency_rates():
+    try:
+        query = CurrencyRate.query
+        currency = (request.args.get('currency') or '').strip()
+        if currency:
+            query = query.filter(CurrencyRate.currency == rate_code(currency))
+        rows = query.order_by(CurrencyRate.currency, CurrencyRate.effective_from.desc(), CurrencyRate.id.desc()).all()
+        return jsonify({
+            'rates': [{
+                'id': row.id,
+                'currency': row.currency,
+                'rate': row.divisor,
+                'effectiveFrom': row.effective_from.strftime('%Y-%m-%d %H:%M:%S') if row.effective_from else '',
+                'current': rate_book.current(row.currency).id == row.id,
+            } for row in rows],
+            'cache': rate_book.stats(),
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/currency-rates', methods=['POST'])
+def create_currency_rate():
+    try:
+        data = request.get_json() or {}
+        currency = rate_code(data.get('currency'))
+        if not currency or currency == 'INR':
+            raise ValueError('A foreign currency code is required')
+        divisor = parse_divisor(data.get('rate'))
+        raw_from = (data.get('effectiveFrom') or '').strip()
+        effective_from = datetime.fromisoformat(raw_from) if raw_from else datetime.now()
+
+        row = CurrencyRate(currency=currency, divisor=str(divisor), effective_from=effective_from)
+        db.session.add(row)
+        db.session.commit()
+        rate_book.invalidate()
+        # Stored invoices keep the rate they were priced with, but drop the
+        # rendered copies anyway so no page outlives a rate change
+        print_cache.invalidate('proforma_invoice')
+        pdf_cache.invalidate('proforma_invoice')
+        return jsonify({'success': True, 'message': 'Rate added', 'id': row.id}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+# Revaluation: reprices the proforma invoices of a currency at one rate
+# ({"currency": "USD", "rateId": 7}; the current rate when rateId is omitted).
+# Invoices are read in id order REVALUE_BATCH_SIZE at a time and each chunk
+# commits on its own, so the write lock is only held briefly.
+REVALUE_BATCH_SIZE = int(os.environ.get('REVALUE_BATCH_SIZE', '200'))
+
+
+@app.route('/api/currency-rates/revalue', methods=['POST'])
+def revalue_proforma_invoices():
+    try:
+        data = request.get_json() or {}
+        currency = rate_code(data.get('currency'))
+        if data.get('rateId') is not None:
+            target = rate_book.get(int(data['rateId']))
+            if target is None or target.currency != currency:
+                return jsonify({'success': False, 'message': 'Rate not found for this currency'}), 404
+        else:
+            target = rate_book.current(currency)
+            if target.id is None:
+                return jsonify({'success': False, 'message': f'No rate for currency {currency}'}), 404
+        batch_size = max(1, int(data.get('batchSize') or REVALUE_BATCH_SIZE))
+
+        # Stored currency spellings that map to this rate code ('DINAR', 'DNR', 'KWD')
+        spellings = [currency] + [alias for alias, code in CURRENCY_ALIASES.items() if code == currency]
+        revalued = batches = 0
+        last_id = 0
+        while True:
+            chunk = (ProformaInvoice.query
+                     .filter(ProformaInvoice.id > last_id,
+                             db.func.upper(db.func.trim(ProformaInvoice.currency)).in_(spellings),
+                             db.or_(ProformaInvoice.currency_rate_id.is_(None),
+                                    ProformaInvoice.currency_rate_id != target.id))
+                     .order_by(ProformaInvoice.id)
+                     .limit(batch_size)
+                     .all())
+            if not chunk:
+                break
+            for invoice in chunk:
+                summary_before = summary_row('proforma_invoice', invoice)
+                priced = revalue_invoice({
+                    'lineItems': invoice.line_items,
+                    'totalAmount': invoice.total_amount,
+                    'advanceAmount': invoice.advance_amount,
+                    'receivedAmount': invoice.received_amount,
+                }, _invoice_rate(invoice).divisor, target.divisor)
+                invoice.total_amount = priced['total']
+                invoice.advance_amount = priced['advance']
+                invoice.receivable_amount = priced['receivable']
+                invoice.received_amount = priced['received']
+                invoice.balance_amount = priced['balance']
+                invoice.line_items = priced['line_items']
+                invoice.currency_rate_id = target.id
+                invoice.updated_at = datetime.now()
+                _sync_lines('proforma_invoice', invoice)
+                _update_summary('proforma_invoice', invoice, summary_before)
+            last_id = chunk[-1].id
+            db.session.commit()
+            for invoice in chunk:
+                print_cache.invalidate('proforma_invoice', invoice.id)
+                pdf_cache.invalidate('proforma_invoice', invoice.id)
+            db.session.expunge_all()
+            revalued += len(chunk)
+            batches += 1
+
+        return jsonify({
+            'success': True,
+            'currency': currency,
+            'rateId': target.id,
+            'rate': str(target.divisor),
+            'revalued': revalued,
+            'batches': batches,
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/print-cache', methods=['GET'])
+def get_print_cache_stats():
+    return jsonify(print_cache.stats()), 200
+
+@app.route('/api/static-cache', methods=['GET'])
+def get_static_cache_stats():
+    return jsonify({'pages': pages.stats(), 'static': static_files.stats()}), 200
+
+# List APIs: keyset pagination, newest first by default.
+# ?limit=N[&after=<nextCursor>] returns {'items': [...], 'nextCursor': ...|None};
+# without limit/after the plain list of every matching record is returned.
+# Filters: number, po (prefix match), currency, status (exact),
+# created_from/created_to (YYYY-MM-DD, inclusive). Sort: sort=[-]field.
+LIST_PAGE_DEFAULT = 50
+LIST_PAGE_MAX = 500
+
+
+def _prefix_match(col, value):
+    # Range form of "LIKE 'value%'" so the column index can be used
+    return db.and_(col >= value, col < value + '\U0010ffff')
+
+
+def _date_arg(name):
+    raw = (request.args.get(name) or '').strip()
+    return datetime.strptime(raw, '%Y-%m-%d') if raw else None
+
+
+def _list_filters(model, fields):
+    conds = []
+    for name in ('number', 'po'):
+        value = (request.args.get(name) or '').strip()
+        if value and name in fields:
+            conds.append(_prefix_match(fields[name], value))
+    for name in ('currency', 'status'):
+        value = (request.args.get(name) or '').strip()
+        if value and name in fields:
+            conds.append(fields[name] == (value.upper() if name == 'currency' else value))
+    created_from = _date_arg('created_from')
+    if created_from:
+        conds.append(model.created_at >= created_from)
+    created_to = _date_arg('created_to')
+    if created_to:
+        conds.append(model.created_at < created_to + timedelta(days=1))
+    return conds
+
+
+def _encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(token, sort_col):
+    value, row_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    if value is not None and isinstance(sort_col.type, db.DateTime):
+        value = datetime.fromisoformat(value)
+    return value, int(row_id)
+
+
+def _after_cursor(model, sort_col, descending, value, row_id):
+    # Rows strictly after (value, row_id) in ORDER BY sort_col, id; SQLite puts
+    # NULLs first when ascending and last when descending.
+    if descending:
+        if value is None:
+            return db.and_(sort_col.is_(None), model.id < row_id)
+        return db.or_(sort_col < value, db.and_(sort_col == value, model.id < row_id), sort_col.is_(None))
+    if value is None:
+        return db.or_(db.and_(sort_col.is_(None), model.id > row_id), sort_col.isnot(None))
+    return db.or_(sort_col > value, db.and_(sort_col == value, model.id > row_id))
+
+
+def _keyset_page(model, columns, fields):
+    sort = (request.args.get('sort') or '-id').strip()
+    descending = sort.startswith('-')
+    key = sort.lstrip('-+')
+    sortable = dict(fields, created_at=model.created_at)
+    if key != 'id' and key not in sortable:
+        raise ValueError(f'Unsupported sort field: {key}')
+    sort_col = None if key == 'id' else sortable[key]
+
+    # Only the summary columns are loaded; the JSON blobs stay in the database
+    loaded = list(columns) + ([sort_col] if sort_col is not None else [])
+    query = model.query.options(load_only(*loaded)).filter(*_list_filters(model, fields))
+
+    order = [model.id.desc() if descending else model.id.asc()]
+    if sort_col is not None:
+        order.insert(0, sort_col.desc() if descending else sort_col.asc())
+    query = query.order_by(*order)
+
+    after = (request.args.get('after') or request.args.get('after_id') or '').strip()
+    limit = request.args.get('limit', type=int)
+    if not after and limit is None:
+        return query.all(), None, False
+
+    if after:
+        if sort_col is None:
+            query = query.filter(model.id < int(after) if descending else model.id > int(after))
+        else:
+            query = query.filter(_after_cursor(model, sort_col, descending, *_decode_cursor(after, sort_col)))
+    limit = max(1, min(limit or LIST_PAGE_DEFAULT, LIST_PAGE_MAX))
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = last.id if sort_col is None else _encode_cursor(getattr(last, sort_col.key), last.id)
+    return rows[:limit], next_cursor, True
+
+
+def _list_response(rows, next_cursor, paginated):
+    if not paginated:
+        return jsonify(rows), 200
+    return jsonify({'items': rows, 'nextCursor': next_cursor}), 200
+
 # API Routes to fetch data
 @app.route('/api/packaging-list', methods=['GET'])
+@conditional(lambda: _list_etag('packaging_list'))
 def get_packaging_lists():
     try:
-        # Return records ordered strictly by id desc (latest created first)
-        items = PackagingList.query.order_by(PackagingList.id.desc()).all()
-        return jsonify([{
+        # Records ordered strictly by id desc (latest created first)
+        items, next_cursor, paginated = _keyset_page(PackagingList, [
+            PackagingList.packingListNo, PackagingList.poNumber, PackagingList.consigneeAddress,
+            PackagingList.status, PackagingList.created_at, PackagingList.updated_at,
+        ], {
+            'number': PackagingList.packingListNo, 'po': PackagingList.poNumber,
+            'currency': PackagingList.currency, 'status': PackagingList.status,
+        })
+        return _list_response([{
             'id': item.id,
             'packingListNo': item.packingListNo or '',
             'poNumber': item.poNumber or '',
             'consigneeAddress': item.consigneeAddress or '',
             'status': item.status or 'Completed',
             'createdAt': item.created_at.strftime('%Y-%m-%d') if item.created_at else '',
-            # PackagingList currently does not have updated_at; keep key for UI compatibility
-            'updatedAt': item.created_at.strftime('%Y-%m-%d %H:%M:%S') if item.created_at else ''
-        } for item in items]), 200
+            # Records from before updated_at existed show their creation time
+            'updatedAt': (item.updated_at or item.created_at).strftime('%Y-%m-%d %H:%M:%S') if (item.updated_at or item.created_at) else ''
+        } for item in items], next_cursor, paginated)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/packaging-list/<int:id>', methods=['GET'])
+@conditional(lambda id: _detail_etag('packaging_list', PackagingList, id))
 def get_packaging_list(id):
     try:
         item = PackagingList.query.get(id)
@@ -1221,11 +2313,19 @@ def get_packaging_list(id):
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/proforma-invoice', methods=['GET'])
+@conditional(lambda: _list_etag('proforma_invoice'))
 def get_proforma_invoices():
     try:
-        # Return records ordered strictly by id desc (latest created first)
-        items = ProformaInvoice.query.order_by(ProformaInvoice.id.desc()).all()
-        return jsonify([{
+        # Records ordered strictly by id desc (latest created first)
+        items, next_cursor, paginated = _keyset_page(ProformaInvoice, [
+            ProformaInvoice.invoice_no, ProformaInvoice.po_wo_number, ProformaInvoice.bill_to_address,
+            ProformaInvoice.total_amount, ProformaInvoice.currency, ProformaInvoice.status,
+            ProformaInvoice.created_at, ProformaInvoice.updated_at,
+        ], {
+            'number': ProformaInvoice.invoice_no, 'po': ProformaInvoice.po_wo_number,
+            'currency': ProformaInvoice.currency, 'status': ProformaInvoice.status,
+        })
+        return _list_response([{
             'id': item.id,
             'invoiceNo': item.invoice_no or '',
             'poWoNumber': item.po_wo_number or '',
@@ -1235,11 +2335,12 @@ def get_proforma_invoices():
             'status': item.status or 'Completed',
             'createdAt': item.created_at.strftime('%Y-%m-%d') if item.created_at else '',
             'updatedAt': item.updated_at.strftime('%Y-%m-%d %H:%M:%S') if item.updated_at else ''
-        } for item in items]), 200
+        } for item in items], next_cursor, paginated)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/proforma-invoice/<int:id>', methods=['GET'])
+@conditional(lambda id: _detail_etag('proforma_invoice', ProformaInvoice, id))
 def get_proforma_invoice(id):
     try:
         item = ProformaInvoice.query.get(id)
@@ -1264,6 +2365,7 @@ def get_proforma_invoice(id):
             'portOfEmbarkation': item.port_of_embarkation,
             'portOfDischarge': item.port_of_discharge,
             'lineItems': item.line_items,
+            'currencyRateId': item.currency_rate_id,
             'status': item.status,
             'createdAt': item.created_at.strftime('%Y-%m-%d') if item.created_at else ''
         }), 200
@@ -1271,11 +2373,19 @@ def get_proforma_invoice(id):
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/zc-exporter', methods=['GET'])
+@conditional(lambda: _list_etag('zc_exporter'))
 def get_zc_exporters():
     try:
-        # Return records ordered strictly by id desc (latest created first)
-        items = ZCExporter.query.order_by(ZCExporter.id.desc()).all()
-        return jsonify([{
+        # Records ordered strictly by id desc (latest created first)
+        items, next_cursor, paginated = _keyset_page(ZCExporter, [
+            ZCExporter.invoice_number, ZCExporter.invoice_date, ZCExporter.exporter_reference,
+            ZCExporter.consignee_address, ZCExporter.total_invoice_value, ZCExporter.status,
+            ZCExporter.created_at, ZCExporter.updated_at,
+        ], {
+            'number': ZCExporter.invoice_number, 'po': ZCExporter.buyer_order_number,
+            'currency': ZCExporter.currency, 'status': ZCExporter.status,
+        })
+        return _list_response([{
             'id': item.id,
             'invoiceNumber': item.invoice_number or '',
             'invoiceDate': item.invoice_date or '',
@@ -1285,11 +2395,12 @@ def get_zc_exporters():
             'status': item.status,
             'createdAt': item.created_at.strftime('%Y-%m-%d') if item.created_at else '',
             'updatedAt': item.updated_at.strftime('%Y-%m-%d %H:%M:%S') if item.updated_at else ''
-        } for item in items]), 200
+        } for item in items], next_cursor, paginated)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
 @app.route('/api/zc-exporter/<int:id>', methods=['GET'])
+@conditional(lambda id: _detail_etag('zc_exporter', ZCExporter, id))
 def get_zc_exporter(id):
     try:
         item = ZCExporter.query.get(id)
@@ -1338,12 +2449,11 @@ def get_zc_exporter(id):
 if __name__ == '__main__':
     # Create database tables
     with app.app_context():
-        db.create_all()
-        _ensure_packaging_list_schema()
-        _ensure_proforma_invoice_schema()
+        init_database()
     
   
 
     
     # Run the Flask app
+    pages.watch = static_files.watch = assets.watch = True
     app.run(debug=True, port=5000)
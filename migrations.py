@@ -0,0 +1,136 @@
+"""
+Schema migrations keyed on SQLite's PRAGMA user_version
+Migrations are ordered steps; each step's version is written to the
+database's user_version, so a current database costs one PRAGMA read at
+startup. Steps must be idempotent (databases from before this runner start
+at 0 and run every step against tables that may already be up to date).
+
+Schema steps run in an exclusive transaction together with the read and
+the bump of user_version, so when several workers start together one runs
+the step and the others wait, then find it done. Data steps (online=True)
+run outside that lock with backfill(): rows are processed in id order, a
+chunk per committed transaction, so the write lock is only held for one
+chunk at a time and the app keeps serving while a long backfill runs. They
+pick their rows with a filter on what is still missing, so a run that was
+interrupted, or one racing another worker, just carries on where the data
+stands; only the version bump after the step takes the exclusive lock.
+"""
+
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+Migration = namedtuple('Migration', 'version name apply online', defaults=(False,))
+
+
+def schema_version(engine):
+    with engine.connect() as conn:
+        return conn.execute(text('PRAGMA user_version')).scalar() or 0
+
+
+def _begin_exclusive(conn, timeout):
+    # BEGIN EXCLUSIVE, retried while another connection holds the database
+    # (the driver's own busy timeout is usually shorter than a schema step)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn.exec_driver_sql('BEGIN EXCLUSIVE')
+            return
+        except OperationalError as e:
+            conn.rollback()
+            if 'locked' not in str(e) or time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
+
+
+def _run_locked(engine, migration, apply, lock_timeout):
+    # Runs ``apply(session)`` and bumps user_version in one exclusive
+    # transaction, unless another process got the database there first;
+    # returns whether it ran
+    with engine.connect() as conn:
+        _begin_exclusive(conn, lock_timeout)
+        if (conn.execute(text('PRAGMA user_version')).scalar() or 0) >= migration.version:
+            conn.rollback()
+            return False
+        if apply is not None:
+            with Session(bind=conn, join_transaction_mode='create_savepoint') as session:
+                apply(session)
+                session.commit()
+        conn.execute(text(f'PRAGMA user_version = {int(migration.version)}'))
+        conn.commit()
+    return True
+
+
+def migrate(engine, migrations, lock_timeout=300.0):
+    """
+    Apply the migrations newer than the database's user_version
+
+    Args:
+        engine: SQLAlchemy engine (SQLite)
+        migrations (list): Migration tuples, versions strictly increasing.
+            ``apply(session)`` gets a session joined to the exclusive
+            transaction, or for online steps a session of its own whose
+            commits are real (use backfill())
+        lock_timeout (float): Seconds to wait for another process's schema step
+
+    Returns:
+        tuple: (version before, version after); both the current version
+        when another process did all the work
+
+    Raises:
+        ValueError: Versions out of order
+    """
+    versions = [m.version for m in migrations]
+    if any(b <= a for a, b in zip(versions, versions[1:])) or (versions and versions[0] < 1):
+        raise ValueError(f'Migration versions must be increasing from 1: {versions}')
+    before = schema_version(engine)
+    if not migrations or before >= versions[-1]:
+        return before, before
+
+    applied = False
+    for migration in migrations:
+        if migration.version <= before:
+            continue
+        if migration.online:
+            if schema_version(engine) >= migration.version:
+                continue
+            with Session(bind=engine) as session:
+                migration.apply(session)
+                session.commit()
+            applied = _run_locked(engine, migration, None, lock_timeout) or applied
+        else:
+            applied = _run_locked(engine, migration, migration.apply, lock_timeout) or applied
+    after = versions[-1]
+    return (before if applied else after), after
+
+
+def backfill(session, model, apply, where=(), batch_size=500):
+    """
+    Run ``apply(records)`` over the rows of ``model`` matching ``where``,
+    ``batch_size`` rows per commit
+
+    Rows are read in id order after the last id of the previous chunk, so
+    the filter may depend on what ``apply`` changes. The session is
+    committed and cleared after every chunk.
+
+    Returns:
+        int: Number of rows processed
+    """
+    last_id = 0
+    done = 0
+    while True:
+        chunk = (session.query(model)
+                 .filter(model.id > last_id, *where)
+                 .order_by(model.id)
+                 .limit(batch_size)
+                 .all())
+        if not chunk:
+            return done
+        apply(chunk)
+        last_id = chunk[-1].id
+        session.commit()
+        session.expunge_all()
+        done += len(chunk)
@@ -0,0 +1,312 @@
+"""
+Range-set engine for packing list box and item numbers
+Keeps box/item references such as "1-20000, 20005, A7" as sorted integer
+intervals instead of expanding them into one string per number
+"""
+
+from bisect import bisect_right
+
+
+class RangeSet:
+    """
+    Immutable set of box/item numbers
+
+    Numeric references are held as sorted, non-overlapping, non-adjacent
+    inclusive intervals; anything that is not a number or a number range
+    (e.g. "A7", "12B") is kept verbatim in ``labels``.
+    """
+
+    __slots__ = ('intervals', 'labels')
+
+    def __init__(self, intervals=(), labels=()):
+        self.intervals = _merge(intervals)
+        self.labels = frozenset(labels)
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Parse a comma separated reference string
+
+        Examples:
+        - "1-5, 7"   -> intervals [(1, 5), (7, 7)]
+        - "9-3"      -> intervals [(3, 9)]
+        - "A1, 2"    -> intervals [(2, 2)], labels {"A1"}
+
+        Args:
+            value: String (or number) as typed into the boxNumber/itemNumbers fields
+
+        Returns:
+            RangeSet
+        """
+        raw = str(value or '').strip()
+        if not raw:
+            return cls()
+        intervals = []
+        labels = []
+        for token in raw.split(','):
+            t = token.strip()
+            if not t:
+                continue
+            if t.isdigit():
+                n = int(t)
+                intervals.append((n, n))
+                continue
+            if '-' in t:
+                parts = [p.strip() for p in t.split('-', 1)]
+                if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                    a = int(parts[0])
+                    b = int(parts[1])
+                    intervals.append((min(a, b), max(a, b)))
+                    continue
+            labels.append(t)
+        return cls(intervals, labels)
+
+    def __len__(self):
+        return sum(hi - lo + 1 for lo, hi in self.intervals) + len(self.labels)
+
+    def __bool__(self):
+        return bool(self.intervals or self.labels)
+
+    def __eq__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.intervals == other.intervals and self.labels == other.labels
+
+    def __hash__(self):
+        return hash((tuple(self.intervals), self.labels))
+
+    def __repr__(self):
+        return f'RangeSet({self.to_text()!r})'
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def union(self, other):
+        return RangeSet(self.intervals + other.intervals, self.labels | other.labels)
+
+    @classmethod
+    def union_all(cls, sets):
+        sets = list(sets)
+        return cls(
+            [iv for r in sets for iv in r.intervals],
+            [label for r in sets for label in r.labels],
+        )
+
+    def intersection(self, other):
+        out = []
+        a = self.intervals
+        b = other.intervals
+        i = j = 0
+        while i < len(a) and j < len(b):
+            lo = max(a[i][0], b[j][0])
+            hi = min(a[i][1], b[j][1])
+            if lo <= hi:
+                out.append((lo, hi))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return RangeSet(out, self.labels & other.labels)
+
+    def contains(self, n):
+        idx = bisect_right(self.intervals, (n, float('inf'))) - 1
+        return idx >= 0 and self.intervals[idx][1] >= n
+
+    def tokens(self):
+        """Yield one display token per interval ("5" or "1-20") and then each label"""
+        for lo, hi in self.intervals:
+            yield format_interval(lo, hi)
+        for label in sorted(self.labels):
+            yield label
+
+    def to_text(self):
+        return ', '.join(self.tokens())
+
+
+def _merge(intervals):
+    out = []
+    for lo, hi in sorted(intervals):
+        if out and lo <= out[-1][1] + 1:
+            if hi > out[-1][1]:
+                out[-1] = (out[-1][0], hi)
+        else:
+            out.append((lo, hi))
+    return out
+
+
+def format_interval(lo, hi):
+    return str(lo) if lo == hi else f'{lo}-{hi}'
+
+
+def sort_key(value):
+    """
+    Total ordering for box/item references
+
+    Numbers (and ranges, by their first number) sort numerically and before
+    any non-numeric label, so mixed references never compare int with str.
+    """
+    s = str(value if value is not None else '').strip()
+    head = s.split('-', 1)[0].strip()
+    if head.isdigit():
+        return (0, int(head), s)
+    return (1, 0, s)
+
+
+class BoxMap:
+    """
+    Maps box numbers to a value, with later assignments overriding earlier ones
+
+    Equivalent to ``lookup[box] = value`` for every box of every range, but
+    stored as painted intervals so a "1-20000" row costs one entry.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._spans = []  # (lo, hi, value), sorted by lo, non-overlapping
+        self._labels = {}
+
+    def assign(self, ranges, value):
+        for lo, hi in ranges.intervals:
+            self._paint(lo, hi, value)
+        for label in ranges.labels:
+            self._labels[label] = value
+
+    def _paint(self, lo, hi, value):
+        start = bisect_right(self._starts, lo) - 1
+        if start < 0 or self._spans[start][1] < lo:
+            start += 1
+        end = bisect_right(self._starts, hi)
+
+        replacement = []
+        if start < end:
+            first = self._spans[start]
+            last = self._spans[end - 1]
+            if first[0] < lo:
+                replacement.append((first[0], lo - 1, first[2]))
+            replacement.append((lo, hi, value))
+            if last[1] > hi:
+                replacement.append((hi + 1, last[1], last[2]))
+        else:
+            replacement.append((lo, hi, value))
+
+        self._spans[start:end] = replacement
+        self._starts[start:end] = [s[0] for s in replacement]
+
+    def split(self, ranges, default=None):
+        """
+        Split ``ranges`` into pieces that share one assigned value
+
+        Args:
+            ranges (RangeSet): Boxes to look up
+            default: Value for boxes that were never assigned
+
+        Returns:
+            list: ``(RangeSet, value)`` pairs in box order, labels last
+        """
+        out = []
+        for lo, hi in ranges.intervals:
+            pos = lo
+            idx = max(bisect_right(self._starts, lo) - 1, 0)
+            while pos <= hi:
+                if idx < len(self._spans) and self._spans[idx][1] < pos:
+                    idx += 1
+                    continue
+                if idx >= len(self._spans) or self._spans[idx][0] > pos:
+                    gap_end = hi if idx >= len(self._spans) else min(hi, self._spans[idx][0] - 1)
+                    out.append((RangeSet([(pos, gap_end)]), default))
+                    pos = gap_end + 1
+                    continue
+                span_lo, span_hi, value = self._spans[idx]
+                piece_end = min(hi, span_hi)
+                out.append((RangeSet([(pos, piece_end)]), value))
+                pos = piece_end + 1
+                idx += 1
+        for label in sorted(ranges.labels):
+            out.append((RangeSet(labels=[label]), self._labels.get(label, default)))
+        return out
+
+
+def group_items(pairs):
+    """
+    Join Module B rows into item groups without expanding any range
+
+    Every item number inside one group is referenced by exactly the same
+    Module B rows, so it maps to exactly the same boxes.
+
+    Args:
+        pairs (list): ``(items RangeSet, boxes RangeSet)`` per Module B row
+
+    Returns:
+        list: Dicts with:
+            - 'items': RangeSet of item numbers in the group
+            - 'boxes': RangeSet of boxes every item in the group is packed in
+            - 'shared': True when any of those boxes also holds another item
+    """
+    points = set()
+    for items, _ in pairs:
+        for lo, hi in items.intervals:
+            points.add(lo)
+            points.add(hi + 1)
+    points = sorted(points)
+
+    groups = []
+    for lo, nxt in zip(points, points[1:]):
+        boxes = None
+        for items, row_boxes in pairs:
+            if items.contains(lo):
+                boxes = row_boxes if boxes is None else boxes | row_boxes
+        if boxes:
+            groups.append({'items': RangeSet([(lo, nxt - 1)]), 'boxes': boxes, 'weight': nxt - lo})
+
+    labels = set()
+    for items, _ in pairs:
+        labels |= items.labels
+    for label in sorted(labels):
+        boxes = None
+        for items, row_boxes in pairs:
+            if label in items.labels:
+                boxes = row_boxes if boxes is None else boxes | row_boxes
+        if boxes:
+            groups.append({'items': RangeSet(labels=[label]), 'boxes': boxes, 'weight': 1})
+
+    shared = _shared_boxes(groups)
+    for g in groups:
+        g['shared'] = bool(g['boxes'] & shared)
+        del g['weight']
+    return groups
+
+
+def _shared_boxes(groups):
+    # Sweep line over box intervals, weighted by the number of items in each group
+    deltas = {}
+    label_counts = {}
+    for g in groups:
+        for lo, hi in g['boxes'].intervals:
+            deltas[lo] = deltas.get(lo, 0) + g['weight']
+            deltas[hi + 1] = deltas.get(hi + 1, 0) - g['weight']
+        for label in g['boxes'].labels:
+            label_counts[label] = label_counts.get(label, 0) + g['weight']
+
+    shared = []
+    count = 0
+    open_at = None
+    for point in sorted(deltas):
+        count += deltas[point]
+        if count >= 2 and open_at is None:
+            open_at = point
+        elif count < 2 and open_at is not None:
+            shared.append((open_at, point - 1))
+            open_at = None
+    return RangeSet(shared, [label for label, n in label_counts.items() if n >= 2])
+
+
+def iter_items(ranges):
+    """Yield each item number of ``ranges`` as a string, numbers first"""
+    for lo, hi in ranges.intervals:
+        for n in range(lo, hi + 1):
+            yield str(n)
+    for label in sorted(ranges.labels):
+        yield label
@@ -0,0 +1,207 @@
+"""
+Logic module for Packaging List print processing
+Builds the print model (flattened box rows, totals, item grouping and
+description rowspans) once at write time so the print route only renders it
+"""
+
+import json
+
+from packaging_list.box_ranges import RangeSet, sort_key as box_sort_key
+
+# Bump whenever the shape of the print model changes; stored models with a
+# different version are treated as stale and rebuilt on the next print.
+PRINT_MODEL_VERSION = 1
+
+
+def prepare_print_data(record):
+    """
+    Prepare complete print data from database record
+
+    Transforms the stored Module B item hierarchies into template-ready rows
+    grouped by item number, with totals and description rowspans
+
+    Args:
+        record (PackagingList): Database record object
+
+    Returns:
+        dict: Complete data dictionary ready for template rendering
+    """
+    def _as_dict(v):
+        if v is None:
+            return {}
+        if isinstance(v, dict):
+            return v
+        if isinstance(v, str):
+            try:
+                return json.loads(v)
+            except Exception:
+                return {}
+        return {}
+
+    # Prepare data for template
+    items_data = []
+    moduleB_data = _as_dict(getattr(record, 'moduleB_data', None))
+
+    # Expected shape: { itemHierarchies: [ { itemNumber, associatedBoxes:[{boxNo, description, qty, dimensions, weights}, ...] } ] }
+    if isinstance(moduleB_data.get('itemHierarchies'), list):
+        for h in moduleB_data.get('itemHierarchies'):
+            if not isinstance(h, dict):
+                continue
+            item_no = str(h.get('itemNumber', '')).strip()
+            for b in h.get('associatedBoxes') or []:
+                if not isinstance(b, dict):
+                    continue
+                dims = b.get('dimensions') if isinstance(b.get('dimensions'), dict) else {}
+                wts = b.get('weights') if isinstance(b.get('weights'), dict) else {}
+                items_data.append({
+                    'itemNos': item_no,
+                    'boxNos': str(b.get('boxNo', '')).strip(),
+                    'boxCount': b.get('boxCount') or 1,
+                    'description': str(b.get('description', '')).strip(),
+                    'qty': b.get('qty', ''),
+                    'l': dims.get('l', ''),
+                    'w': dims.get('w', ''),
+                    'h': dims.get('h', ''),
+                    'netWt': wts.get('net', ''),
+                    'grossWt': wts.get('gross', ''),
+                })
+    else:
+        legacy_items = getattr(record, 'items', None)
+        if isinstance(legacy_items, list):
+            items_data = legacy_items
+
+    # Calculate totals
+    total_net_weight = 0
+    total_gross_weight = 0
+    total_boxes = 0
+
+    def _safe_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    # A row may stand for a whole box range ("1-200"), weighted per box
+    box_refs = []
+    for item in items_data:
+        net = item.get('netWt') or item.get('netWeight') or item.get('net_weight', 0)
+        gross = item.get('grossWt') or item.get('grossWeight') or item.get('gross_weight', 0)
+        box_count = _safe_float(item.get('boxCount') or 1)
+        total_net_weight += _safe_float(net) * box_count
+        total_gross_weight += _safe_float(gross) * box_count
+
+        box_refs.append(RangeSet.parse(item.get('boxNos')))
+
+    total_boxes = len(RangeSet.union_all(box_refs))
+
+    sorted_items = sorted(
+        items_data,
+        key=lambda x: (
+            box_sort_key(x.get('itemNos', '')),
+            box_sort_key(x.get('boxNos', '')),
+            str(x.get('description', '')).strip(),
+        ),
+    )
+
+    grouped_items = []
+    current = None
+    for item in sorted_items:
+        item_nos = str(item.get('itemNos', '')).strip()
+        desc = str(item.get('description', '')).strip()
+
+        row = {
+            'boxNos': str(item.get('boxNos', '')).strip(),
+            'description': desc,
+            'qty': item.get('qty', ''),
+            'l': item.get('l', ''),
+            'w': item.get('w', ''),
+            'h': item.get('h', ''),
+            'netWt': item.get('netWt') or item.get('netWeight') or item.get('net_weight', ''),
+            'grossWt': item.get('grossWt') or item.get('grossWeight') or item.get('gross_weight', ''),
+        }
+
+        if current and current.get('itemNos') == item_nos:
+            current['rows'].append(row)
+            current['rowspan'] = len(current['rows'])
+        else:
+            current = {
+                'itemNos': item_nos,
+                'rows': [row],
+                'rowspan': 1,
+            }
+            grouped_items.append(current)
+
+    for g in grouped_items:
+        descriptions = [str(r.get('description', '')).strip() for r in g.get('rows', [])]
+        first_desc = descriptions[0] if descriptions else ''
+        g['description_merged'] = bool(descriptions) and all(d == first_desc for d in descriptions)
+        g['description'] = first_desc if g['description_merged'] else ''
+        g['description_rowspan'] = g['rowspan'] if g['description_merged'] else 1
+
+    data = {
+        **print_header(record),
+        'total_boxes': total_boxes,
+        'items': grouped_items,
+        'total_net_weight': f"{total_net_weight:.2f}",
+        'total_gross_weight': f"{total_gross_weight:.2f}"
+    }
+
+    return data
+
+
+def print_header(record):
+    """Header fields of the print data (everything that does not depend on the boxes)"""
+    return {
+        'consigneeAddress': record.consigneeAddress or '',
+        'taxNumber': record.taxNumber or '',
+        'deliveryAddress': record.deliveryAddress or '',
+        'date': record.date.strftime('%Y-%m-%d') if record.date else '',
+        'po_no': record.poNumber or '',
+        'packing_list_no': record.packingListNo or '',
+        'loding_port': record.loadingPort or '',
+        'discharge_port': record.dischargePort or '',
+        'hs_code': record.hsCode or '',
+    }
+
+
+def refresh_print_header(stored, record):
+    """
+    Print model with only the header fields refreshed (after a header-only
+    change); a missing or stale model is rebuilt in full
+    """
+    data = load_print_model(stored)
+    if data is None:
+        return build_print_model(record)
+    return {'version': PRINT_MODEL_VERSION, 'data': dict(data, **print_header(record))}
+
+
+def build_print_model(record):
+    """
+    Build the versioned print model stored next to the record
+
+    Args:
+        record (PackagingList): Database record object
+
+    Returns:
+        dict: {'version': PRINT_MODEL_VERSION, 'data': <print data>}
+    """
+    return {
+        'version': PRINT_MODEL_VERSION,
+        'data': prepare_print_data(record),
+    }
+
+
+def load_print_model(stored):
+    """
+    Return the stored print data, or None when it is missing or stale
+
+    Args:
+        stored: Value of PackagingList.print_model
+
+    Returns:
+        dict or None
+    """
+    if not isinstance(stored, dict) or stored.get('version') != PRINT_MODEL_VERSION:
+        return None
+    data = stored.get('data')
+    return data if isinstance(data, dict) else None
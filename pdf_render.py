@@ -0,0 +1,454 @@
+"""
+Server-side PDF rendering of the print models
+Lays out the same data the start.html print templates receive (packing list,
+proforma invoice, ZC invoice) with fpdf2, a pure-Python PDF library, in a
+process pool so several documents render in parallel without a browser
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+try:
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+    from fpdf.fonts import FontFace
+
+    HEADINGS_STYLE = FontFace(emphasis='BOLD', fill_color=(235, 235, 235))
+    TOTAL_STYLE = FontFace(emphasis='BOLD', fill_color=(245, 245, 245))
+except ImportError:  # PDF rendering is optional
+    FPDF = None
+
+# Fixed company blocks, as printed by the HTML templates
+EXPORTER_LINES = (
+    'Zaka Controls & Devices',
+    'IX 67/A, NH-66, Kodungallur,',
+    'KERALA- 680668',
+    'INDIA',
+    '',
+    'GST No. 32ERGPS8045J1ZD',
+)
+SUPPLIER_LINES = (
+    'Zaka Controls & Devices',
+    'NH - 66, Mathilakam - Kodungallur,',
+    'Kerala - Thrissur, India, Pin-680685',
+)
+ZC_EXPORTER_LINES = (
+    'Zaka Controls & Devices',
+    'IX/A/44 NH-66 Kodingalur',
+    'KERALA - 680668',
+    'GST No. 32ERGPS8045J1ZD',
+)
+ZC_DELIVERY_LINES = (
+    'Innovative Systems',
+    'Shed No: 130A',
+    'Dubai Maritime City',
+    'Tax Registration Number: 100038645800003',
+)
+ZC_SUPPLY_NOTE = ('"SUPPLY MEANT FOR EXPORT UNDER BOND OR LETTER OF UNDERTAKING '
+                  'WITHOUT PAYMENT OF INTEGRATED TAX (IGST)"')
+ZC_DECLARATION = ('Declaration: We declare that this invoice shows the actual price of the goods '
+                  'described and that all particulars are true and correct')
+SIGNATORIES = (('Prepared By', 'Praveen Kumar'), ('Verified By', 'Mujeeb Arakkal'),
+               ('Authorized By', 'Sarth C Nambir'))
+
+# The built-in PDF fonts are Latin-1 only
+_PUNCTUATION = str.maketrans({
+    '\u2013': '-', '\u2014': '-', '\u2018': "'", '\u2019': "'",
+    '\u201c': '"', '\u201d': '"', '\u2022': '*', '\u2026': '...', '\u00a0': ' ',
+})
+
+
+def _t(value):
+    if value is None:
+        return ''
+    text = str(value).replace('\r\n', '\n').translate(_PUNCTUATION)
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def _lines(*parts):
+    return '\n'.join(_t(p) for p in parts)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _new_pdf(orientation, title):
+    pdf = FPDF(orientation=orientation, unit='mm', format='A4')
+    pdf.set_margins(10, 10, 10)
+    pdf.set_auto_page_break(True, margin=12)
+    pdf.set_title(_t(title))
+    pdf.set_creator('Report Generation')
+    pdf.add_page()
+    pdf.set_font('Helvetica', size=9)
+    return pdf
+
+
+def _image(pdf, assets_dir, name, height):
+    path = os.path.join(assets_dir or '', name)
+    if assets_dir and os.path.isfile(path):
+        pdf.image(path, x=pdf.l_margin, h=height, keep_aspect_ratio=True, w=pdf.epw)
+        pdf.ln(1)
+
+
+def _title(pdf, text, size=14):
+    pdf.set_font('Helvetica', 'B', size)
+    pdf.cell(0, 9, _t(text), border=1, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font('Helvetica', size=9)
+
+
+def _packing_list(pdf, data, assets_dir):
+    _image(pdf, assets_dir, 'logo.jpg', 18)
+    _title(pdf, 'Packing List')
+
+    consignee = _lines(
+        'Consignee', data.get('consigneeAddress'),
+        f"Tax Registration Number: {data.get('taxNumber') or ''}", '',
+        'Delivery Address', data.get('deliveryAddress'),
+    )
+    meta = _lines(
+        f"Date: {data.get('date') or ''}",
+        f"PO: {data.get('po_no') or ''}",
+        f"Packing List No: {data.get('packing_list_no') or ''}",
+    )
+    with pdf.table(col_widths=(40, 30, 30), first_row_as_headings=False, line_height=4.5) as table:
+        row = table.row()
+        row.cell(consignee)
+        row.cell(_lines('Exporter:', *EXPORTER_LINES))
+        row.cell(meta)
+    with pdf.table(first_row_as_headings=False, line_height=5) as table:
+        row = table.row()
+        row.cell(_t(f"Loading Port: {data.get('loding_port') or ''}"))
+        row.cell(_t(f"Discharge Port: {data.get('discharge_port') or ''}"))
+        row.cell(_t(f"HS Code: {data.get('hs_code') or ''}"))
+        row.cell(_t(f"No of Boxes: {data.get('total_boxes') or 0}"))
+
+    pdf.ln(2)
+    with pdf.table(
+        col_widths=(14, 14, 38, 8, 26, 12, 12),
+        text_align=('CENTER', 'CENTER', 'LEFT', 'CENTER', 'CENTER', 'CENTER', 'CENTER'),
+        headings_style=HEADINGS_STYLE, line_height=4.5, repeat_headings=1,
+    ) as table:
+        table.row(['PO/Item No.', 'Box No.', 'Material & Packing Description', 'Qty',
+                   'Dimension', 'Net Weight (Kg)', 'Gross Weight (Kg)'])
+        for group in data.get('items') or []:
+            rows = group.get('rows') or []
+            merged = group.get('description_merged')
+            for i, r in enumerate(rows):
+                row = table.row()
+                if i == 0:
+                    row.cell(_t(group.get('itemNos')), rowspan=len(rows))
+                row.cell(_t(r.get('boxNos')))
+                if not merged:
+                    row.cell(_t(r.get('description')))
+                elif i == 0:
+                    row.cell(_t(group.get('description')), rowspan=len(rows))
+                row.cell(_t(r.get('qty')))
+                row.cell(f"{_t(r.get('l'))} (L) x {_t(r.get('w'))} (W) x {_t(r.get('h'))} (H) cm")
+                row.cell(_t(r.get('netWt')))
+                row.cell(_t(r.get('grossWt')))
+        row = table.row(style=TOTAL_STYLE)
+        row.cell('Total', colspan=5, align='LEFT')
+        row.cell(_t(data.get('total_net_weight')), align='RIGHT')
+        row.cell(_t(data.get('total_gross_weight')), align='RIGHT')
+
+
+def _proforma_invoice(pdf, data, assets_dir):
+    _image(pdf, assets_dir, 'logo.jpg', 24)
+    _title(pdf, 'Proforma Invoice')
+
+    with pdf.table(headings_style=HEADINGS_STYLE, line_height=5) as table:
+        table.row(['Date:', 'Invoice No:', 'PO / WO No:', 'Your Ref No:', 'Our Ref:'])
+        table.row([_t(data.get(k)) for k in
+                   ('date', 'invoice_no', 'po_wo_number', 'your_reference_no', 'our_reference_no')])
+    with pdf.table(first_row_as_headings=False, line_height=4.5) as table:
+        table.row([_lines('Supplier:', *SUPPLIER_LINES)])
+        table.row([_lines('Bill To:', data.get('bill_to_address'))])
+
+    pdf.ln(2)
+    currency = _t(data.get('currency'))
+    with pdf.table(
+        col_widths=(10, 90, 20, 30, 30),
+        text_align=('CENTER', 'LEFT', 'CENTER', 'RIGHT', 'RIGHT'),
+        headings_style=HEADINGS_STYLE, line_height=5, repeat_headings=1,
+    ) as table:
+        table.row(['No', 'Part No / Item Description', 'Qty', 'Unit Rate', 'Total'])
+        for index, item in enumerate(data.get('items') or [], 1):
+            if not isinstance(item, dict):
+                continue
+            table.row([
+                _t(item.get('line_no') or index),
+                _t(item.get('description')),
+                _t(item.get('quantity')),
+                _t(item.get('unitRate')),
+                _t(item.get('total')),
+            ])
+        for label, key in ((f'Total Amount in {currency}', 'total_amount'),
+                           ('Advance Amount', 'advance_amount'),
+                           (_t(data.get('received_details')), 'received_amount'),
+                           ('Balance receivable', 'balance_amount')):
+            row = table.row()
+            row.cell(label, colspan=4, align='LEFT')
+            row.cell(_t(data.get(key)))
+
+    pdf.ln(2)
+    with pdf.table(first_row_as_headings=False, line_height=5) as table:
+        table.row([_lines(
+            'Additional Details',
+            f"Country of Origin: {data.get('country_of_origin') or ''}",
+            f"Port of Embarkation: {data.get('port_of_embarkation') or ''}",
+            f"Port of Discharge: {data.get('port_of_discharge') or ''}",
+        )])
+    with pdf.table(first_row_as_headings=False, line_height=5, text_align='CENTER') as table:
+        table.row([_lines(role, name) for role, name in SIGNATORIES]
+                  + [_lines('Date', data.get('date_created'))])
+    _image(pdf, assets_dir, 'footer.jpg', 6)
+
+
+def _zc_invoice(pdf, data, assets_dir):
+    _image(pdf, assets_dir, 'logo.jpg', 20)
+    _title(pdf, 'INVOICE')
+    pdf.set_font('Helvetica', 'B', 7)
+    pdf.multi_cell(0, 4, ZC_SUPPLY_NOTE, border=1, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font('Helvetica', size=8)
+
+    consignee = _lines(
+        'Exporter:', *ZC_EXPORTER_LINES, '',
+        'Consignee:', data.get('consigneeAddress'),
+        data.get('contactPersonName'), data.get('contactEmail'),
+    )
+    details = _lines(
+        f"Invoice No.: {data.get('invoiceNumber') or ''}",
+        f"Date: {data.get('invoiceDate') or ''}",
+        f"Exporter's Ref: {data.get('exporterReference') or ''}",
+        f"IEC: {data.get('iecNumber') or ''}",
+        f"Buyer's Order No.: {data.get('buyerOrderNumber') or ''}",
+        f"Buyer's Order Date: {data.get('buyerOrderDate') or ''}",
+        f"Other Reference(s): {data.get('otherReference') or ''}",
+        '', 'Delivery', *ZC_DELIVERY_LINES, '',
+        f"Country of Origin of Goods: {data.get('countryOfOrigin') or ''}",
+        f"Country of Final Destination: {data.get('finalDestination') or ''}",
+        f"Country of destination: {data.get('portOfDestination') or ''}",
+        f"Terms of Delivery: {data.get('deliveryPaymentTerms') or ''}",
+        f"LUT ARN NO: {data.get('lutArnNumber') or ''}",
+    )
+    with pdf.table(first_row_as_headings=False, line_height=4) as table:
+        table.row([consignee, details])
+    with pdf.table(headings_style=HEADINGS_STYLE, line_height=4) as table:
+        table.row(['Pre-carriage by', 'Place of Receipt of Pre-Carrier', 'Vessel/Flight No.', 'Port of Loading'])
+        table.row([_t(data.get(k)) for k in ('preCarriageBy', 'placeOfReceipt', 'vesselFlight', 'portOfLoading')])
+    with pdf.table(first_row_as_headings=False, line_height=4) as table:
+        table.row([_t(f"Port of Discharge: {data.get('portOfDischarge') or ''}"),
+                   _t(f"Final Destination: {data.get('finalDestination') or ''}")])
+
+    pdf.ln(1)
+    currency = _t(data.get('currency'))
+    pdf.set_font('Helvetica', size=7)
+    rows = [r for r in data.get('tableRows') or [] if isinstance(r, dict)]
+    with pdf.table(
+        col_widths=(14, 14, 40, 10, 12, 16, 18, 18, 10, 16),
+        text_align=('CENTER', 'CENTER', 'LEFT', 'CENTER', 'CENTER', 'RIGHT', 'RIGHT', 'RIGHT', 'CENTER', 'RIGHT'),
+        headings_style=HEADINGS_STYLE, line_height=4, repeat_headings=1,
+    ) as table:
+        table.row(['Shipping Mark', 'No & Kind of Pkgs', 'Description of Goods', 'Unit', 'Qty (NOS)',
+                   f'Rate ({currency})', f'Amount ({currency})', f'Taxable Value ({currency})',
+                   'IGST (%)', 'IGST Amount'])
+        for index, r in enumerate(rows):
+            table.row([
+                'AS ADDRESS' if index == 0 else '',
+                _t(f"{r.get('from') or ''} - {r.get('to') or ''}"),
+                _t(r.get('description')),
+                _t(r.get('unit')),
+                _t(r.get('quantity')),
+                _t(r.get('rate')),
+                _t(r.get('amount')),
+                _t(r.get('taxableValue') or '0.00'),
+                _t(r.get('igstPercent') or '0.00'),
+                _t(r.get('igstAmount') or '0.00'),
+            ])
+        row = table.row(style=TOTAL_STYLE)
+        row.cell(f'TOTAL ({currency})', colspan=6, align='LEFT')
+        row.cell(_t(f"{data.get('totalExportValue') or ''} {currency}"))
+        row.cell(f"{sum(_float(r.get('taxableValue')) for r in rows):.2f}")
+        row.cell('')
+        row.cell(f"{sum(_float(r.get('igstAmount')) for r in rows):.2f}")
+    pdf.set_font('Helvetica', size=8)
+
+    summary = _lines(
+        f"Amount Chargable (in words): {data.get('amountInWords') or ''}",
+        f"AD Code: {data.get('adCode') or ''}",
+        f"Total Packages: {data.get('numberOfBoxes') or 0}",
+    )
+    totals = _lines(
+        f"Total Export Value ({currency}): {data.get('totalExportValue') or ''}",
+        f"Total GST Value: {data.get('totalGstValue') or ''}",
+        f"Total Invoice Value ({currency}): {data.get('totalInvoiceValue') or ''}",
+    )
+    with pdf.table(first_row_as_headings=False, line_height=4.5) as table:
+        table.row([summary, totals])
+        table.row([ZC_DECLARATION, 'Signature & Date\n\n\n'])
+    _image(pdf, assets_dir, 'footer.jpg', 6)
+
+
+LAYOUTS = {
+    'packaging_list': ('L', 'Packing List', _packing_list),
+    'proforma_invoice': ('P', 'Proforma Invoice', _proforma_invoice),
+    'zc_exporter': ('P', 'Invoice', _zc_invoice),
+}
+
+
+def render_pdf(kind, data, assets_dir=None):
+    """
+    Render one print model to PDF bytes (runs in a worker process)
+
+    Args:
+        kind (str): 'packaging_list', 'proforma_invoice' or 'zc_exporter'
+        data (dict): The data the kind's start.html template is rendered with
+        assets_dir (str): Directory holding logo.jpg / footer.jpg, optional
+
+    Returns:
+        bytes: The PDF file
+    """
+    if FPDF is None:
+        raise RuntimeError('PDF rendering requires fpdf2 (pip install fpdf2)')
+    orientation, title, layout = LAYOUTS[kind]
+    pdf = _new_pdf(orientation, title)
+    layout(pdf, data, assets_dir)
+    return bytes(pdf.output())
+
+
+class PdfRenderer:
+    """
+    Process pool, version-keyed cache and batch jobs for PDF rendering
+
+    Args:
+        cache (RenderCache): Finished PDFs keyed by (kind, record id, version)
+        assets_dir (str): Passed to render_pdf for the logo and footer images
+        max_workers (int): Worker processes (None: one per CPU)
+        max_jobs (int): Batch jobs remembered; the oldest finished ones are dropped
+        current_version (callable): (kind, record_id) -> the record's version
+            now; a PDF whose record changed while it rendered is not cached
+    """
+
+    def __init__(self, cache, assets_dir=None, max_workers=None, max_jobs=50, current_version=None):
+        self.cache = cache
+        self.assets_dir = assets_dir
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.current_version = current_version
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return FPDF is not None
+
+    def _pool(self):
+        # Started on first use so importing the app never forks workers
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, kind, record_id, version, prepare):
+        """
+        Render in the pool unless a PDF of this version is cached
+
+        Args:
+            prepare (callable): Returns the print data; only called on a cache miss
+
+        Returns:
+            Future: Resolves to the PDF bytes
+        """
+        cached = self.cache.get(kind, record_id, version)
+        if cached is not None:
+            done = Future()
+            done.set_result(cached)
+            return done
+        future = self._pool().submit(render_pdf, kind, prepare(), self.assets_dir)
+
+        def _store(f):
+            if f.cancelled() or f.exception() is not None or not self._is_current(kind, record_id, version):
+                return
+            self.cache.put(kind, record_id, version, f.result())
+
+        future.add_done_callback(_store)
+        return future
+
+    def _is_current(self, kind, record_id, version):
+        if self.current_version is None:
+            return True
+        try:
+            return self.current_version(kind, record_id) == version
+        except Exception:
+            return False
+
+    def render(self, kind, record_id, version, prepare, timeout=None):
+        return self.submit(kind, record_id, version, prepare).result(timeout=timeout)
+
+    def start_job(self, kind, docs):
+        """
+        Queue a batch: ``docs`` is a list of (record_id, version, prepare)
+
+        Returns:
+            str: Job id for job() and job_files()
+        """
+        futures = OrderedDict((record_id, self.submit(kind, record_id, version, prepare))
+                              for record_id, version, prepare in docs)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {'type': kind, 'futures': futures}
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                if not all(f.done() for f in self._jobs[oldest]['futures'].values()):
+                    break
+                del self._jobs[oldest]
+        return job_id
+
+    def job(self, job_id):
+        """Status of a batch job, or None when unknown"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        records = []
+        for record_id, f in entry['futures'].items():
+            if not f.done():
+                records.append({'id': record_id, 'status': 'pending'})
+            elif f.exception() is not None:
+                records.append({'id': record_id, 'status': 'failed', 'message': str(f.exception())})
+            else:
+                records.append({'id': record_id, 'status': 'done', 'size': len(f.result())})
+        pending = sum(1 for r in records if r['status'] == 'pending')
+        failed = sum(1 for r in records if r['status'] == 'failed')
+        return {
+            'jobId': job_id,
+            'type': entry['type'],
+            'status': 'running' if pending else ('failed' if failed == len(records) else 'done'),
+            'total': len(records),
+            'done': len(records) - pending - failed,
+            'failed': failed,
+            'records': records,
+        }
+
+    def job_files(self, job_id):
+        """(record_id, pdf bytes) of every successfully rendered record of a finished job"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return []
+        return [(record_id, f.result()) for record_id, f in entry['futures'].items()
+                if f.done() and f.exception() is None]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,53 @@
+"""
+Batch printing: many rendered print pages as one HTML document
+The print templates are complete documents; the batch keeps the <head>
+(styles) of the first page once and concatenates every <body>, each in its
+own block followed by a page break
+"""
+
+import re
+
+_HEAD_RE = re.compile(r'<head[^>]*>(.*?)</head>', re.IGNORECASE | re.DOTALL)
+_BODY_RE = re.compile(r'<body[^>]*>(.*?)</body>', re.IGNORECASE | re.DOTALL)
+
+BATCH_STYLE = '''<style>
+.batch-doc { break-after: page; page-break-after: always; }
+.batch-doc:last-child { break-after: auto; page-break-after: auto; }
+@media print { html, body { height: auto !important; } }
+</style>
+'''
+
+
+def split_document(html):
+    """
+    Split a rendered page into its head and body markup
+
+    Returns:
+        tuple: (head inner HTML, body inner HTML); a fragment without a
+        <body> is returned whole as the body
+    """
+    head = _HEAD_RE.search(html)
+    body = _BODY_RE.search(html)
+    return (head.group(1) if head else ''), (body.group(1) if body else html)
+
+
+def batch_document(pages):
+    """
+    Chunks of one HTML document holding every page in ``pages``
+
+    Args:
+        pages (iterable): Rendered pages of the same template, in print order
+
+    Yields:
+        str: The document head with the first page, then one chunk per page
+    """
+    started = False
+    for html in pages:
+        head, body = split_document(html)
+        if not started:
+            yield '<!DOCTYPE html>\n<html lang="en">\n<head>' + head + BATCH_STYLE + '</head>\n<body>\n'
+            started = True
+        yield '<div class="batch-doc">' + body + '</div>\n'
+    if not started:
+        yield '<!DOCTYPE html>\n<html lang="en">\n<head><meta charset="UTF-8"></head>\n<body>\n'
+    yield '</body>\n</html>\n'
@@ -0,0 +1,246 @@
+"""
+Logic module for Proforma Invoice pricing
+Converts line items and amounts entered in INR to the invoice currency.
+Each column is parsed in one pass with a precompiled pattern and priced with
+Decimal arithmetic, so the invoice total is exactly the sum of the rows.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP, localcontext
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0')
+
+# Everything but digits, '.', '-' and the column separator ("₹ 1,250.00" -> "1250.00")
+_NON_NUMERIC = re.compile(r'[^\d.\-\n]')
+
+
+def _text(value):
+    if value is None or isinstance(value, bool):
+        return ''
+    if isinstance(value, float):
+        return f'{value:f}'
+    return str(value).replace('\n', '')
+
+
+def parse_amount(value):
+    """
+    Lenient amount parser: strips symbols and separators; unparseable -> 0
+
+    Args:
+        value: Number, numeric string or None
+
+    Returns:
+        Decimal
+    """
+    cleaned = _NON_NUMERIC.sub('', _text(value))
+    if not cleaned:
+        return ZERO
+    try:
+        parsed = Decimal(cleaned)
+    except InvalidOperation:
+        return ZERO
+    return parsed if parsed.is_finite() else ZERO
+
+
+def parse_column(values):
+    """
+    parse_amount for a whole column: the values are cleaned with a single
+    pass of the pattern over the joined column, then converted together
+    """
+    texts = [v if v.__class__ is str else _text(v) for v in values]
+    joined = '\n'.join(texts)
+    if joined.count('\n') != len(texts) - 1:
+        # A value contains a newline itself; fall back to one value at a time
+        return [parse_amount(v) for v in texts]
+    cleaned = [c or '0' for c in _NON_NUMERIC.sub('', joined).split('\n')]
+    try:
+        return list(map(Decimal, cleaned))
+    except InvalidOperation:
+        # Leftovers such as '1.2.3' or '--5'
+        return [parse_amount(c) for c in cleaned]
+
+
+def format_amount(value):
+    # Amounts are quantized to cents already, so str() gives two decimals
+    return str(value.quantize(CENT, ROUND_HALF_UP))
+
+
+def price_line_items(raw_items, divisor):
+    """
+    Convert line items from INR to the invoice currency
+
+    Unit rates are converted and rounded to cents; a line keeps its entered
+    total (converted) when one was given, otherwise it is quantity x the
+    converted unit rate. Rounding is half up.
+
+    Args:
+        raw_items (list): Line item dicts as posted by the form
+        divisor (Decimal): INR -> currency divisor
+
+    Returns:
+        tuple: (stored line item dicts, list of Decimal line totals)
+    """
+    items = [it for it in raw_items or [] if isinstance(it, dict)]
+    if not items:
+        return [], []
+
+    with localcontext() as ctx:
+        ctx.prec = 34
+        divisor = Decimal(divisor)
+        quantities = parse_column(it.get('quantity') for it in items)
+        unit_rates = [(r / divisor).quantize(CENT, ROUND_HALF_UP)
+                      for r in parse_column(it.get('unitRate') for it in items)]
+        entered_totals = parse_column(it.get('total') for it in items)
+        line_totals = [
+            (t / divisor if t else q * u).quantize(CENT, ROUND_HALF_UP)
+            for q, u, t in zip(quantities, unit_rates, entered_totals)
+        ]
+
+    stored = [{
+        'lineNo': it.get('lineNo'),
+        'partNumber': it.get('partNumber') or '',
+        'description': it.get('description') or '',
+        'quantity': str(it.get('quantity') or ''),
+        'unitRate': format_amount(unit),
+        'total': format_amount(total),
+    } for it, unit, total in zip(items, unit_rates, line_totals)]
+    return stored, line_totals
+
+
+def price_invoice(data, divisor):
+    """
+    Price a proforma invoice payload
+
+    The total is the exact sum of the converted line totals; only an invoice
+    without line items falls back to the posted totalAmount.
+
+    Args:
+        data (dict): Create/update payload (lineItems, totalAmount, advanceAmount, receivedAmount)
+        divisor (Decimal): INR -> invoice currency divisor (see currency_rates.py)
+
+    Returns:
+        dict: line_items plus total, advance, received, receivable and balance
+        amounts formatted to two decimals
+    """
+    divisor = Decimal(divisor)
+    raw_items = data.get('lineItems') if isinstance(data.get('lineItems'), list) else []
+    line_items, line_totals = price_line_items(raw_items, divisor)
+
+    def _convert(value):
+        return (parse_amount(value) / divisor).quantize(CENT, ROUND_HALF_UP)
+
+    total = sum(line_totals, ZERO) if line_items else _convert(data.get('totalAmount'))
+    advance = _convert(data.get('advanceAmount'))
+    received = _convert(data.get('receivedAmount'))
+    receivable = total - advance
+    balance = receivable - received
+
+    return {
+        'line_items': line_items,
+        'total': format_amount(total),
+        'advance': format_amount(advance),
+        'received': format_amount(received),
+        'receivable': format_amount(receivable),
+        'balance': format_amount(balance),
+    }
+
+
+def revalue_invoice(data, old_divisor, new_divisor):
+    """
+    Reprice a stored invoice at another rate
+
+    The stored (converted) amounts are taken back to INR with the rate they
+    were priced at, then priced again with ``new_divisor``.
+
+    Args:
+        data (dict): lineItems, totalAmount, advanceAmount and receivedAmount as stored
+        old_divisor (Decimal): Rate the invoice was priced with
+        new_divisor (Decimal): Rate to price it with
+
+    Returns:
+        dict: Same shape as price_invoice()
+    """
+    old_divisor = Decimal(old_divisor)
+    raw_items = data.get('lineItems') if isinstance(data.get('lineItems'), list) else []
+    items = [it for it in raw_items if isinstance(it, dict)]
+    with localcontext() as ctx:
+        ctx.prec = 34
+        unit_rates = parse_column(it.get('unitRate') for it in items)
+        totals = parse_column(it.get('total') for it in items)
+        inr = {
+            key: str(parse_amount(data.get(key)) * old_divisor)
+            for key in ('totalAmount', 'advanceAmount', 'receivedAmount')
+        }
+    inr['lineItems'] = [
+        dict(it, unitRate=str(unit * old_divisor), total=str(total * old_divisor))
+        for it, unit, total in zip(items, unit_rates, totals)
+    ]
+    return price_invoice(inr, new_divisor)
+
+
+# Line fields that change a line's price
+PRICE_FIELDS = frozenset(('quantity', 'unitRate', 'total'))
+
+
+def price_patch(stored, touched, removed, divisor, advance=None, received=None):
+    """
+    Incremental pricing for a patch (see document_patch.py)
+
+    Only touched lines are priced: new or replaced lines from their INR
+    values; lines with a changed quantity/unitRate/total from the stored
+    unit rate taken back to INR, the line total being recomputed unless it
+    was patched itself. The invoice total moves by the difference of the
+    touched and removed line totals.
+
+    Args:
+        stored (dict): Stored 'total', 'advance' and 'received' amounts
+        touched (list): PatchResult.touched
+        removed (list): PatchResult.removed
+        divisor (Decimal): Rate the invoice is priced with
+        advance: New advance amount in INR, None when unchanged
+        received: New received amount in INR, None when unchanged
+
+    Returns:
+        dict: 'lines' ({position: stored line}) plus the price_invoice() amounts
+    """
+    divisor = Decimal(divisor)
+    positions = []
+    inr_lines = []
+    lines = {}
+    for position, line, original, fields in touched:
+        if '*' in fields:
+            inr = line
+        elif fields & PRICE_FIELDS:
+            inr = dict(line)
+            if 'unitRate' not in fields:
+                inr['unitRate'] = str(parse_amount(line.get('unitRate')) * divisor)
+            if 'total' not in fields:
+                inr['total'] = ''
+        else:
+            lines[position] = line
+            continue
+        positions.append(position)
+        inr_lines.append(inr)
+    priced, _ = price_line_items(inr_lines, divisor)
+    lines.update(zip(positions, priced))
+
+    total = parse_amount(stored.get('total'))
+    total -= sum((parse_amount(o.get('total')) for _, _, o, _ in touched if isinstance(o, dict)), ZERO)
+    total -= sum((parse_amount(o.get('total')) for o in removed if isinstance(o, dict)), ZERO)
+    total += sum((parse_amount(line.get('total')) for line in lines.values()), ZERO)
+
+    def _convert(value):
+        return (parse_amount(value) / divisor).quantize(CENT, ROUND_HALF_UP)
+
+    advance = parse_amount(stored.get('advance')) if advance is None else _convert(advance)
+    received = parse_amount(stored.get('received')) if received is None else _convert(received)
+    receivable = total - advance
+    return {
+        'lines': lines,
+        'total': format_amount(total),
+        'advance': format_amount(advance),
+        'received': format_amount(received),
+        'receivable': format_amount(receivable),
+        'balance': format_amount(receivable - received),
+    }
@@ -0,0 +1,74 @@
+"""
+In-process cache of rendered print pages
+Entries are keyed by (document kind, record id) and tagged with the record
+version (updated_at/created_at), so an edited record is never served stale
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    Size-bounded LRU of rendered HTML with hit/miss counters
+
+    Args:
+        max_entries (int): Maximum number of pages kept; 0 disables caching
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kind, record_id, version):
+        key = (kind, record_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind, record_id, version, html):
+        if self.max_entries <= 0:
+            return
+        key = (kind, record_id)
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind, record_id=None):
+        """Drop one record's page, or every page of ``kind`` when record_id is None"""
+        with self._lock:
+            if record_id is not None:
+                self._entries.pop((kind, record_id), None)
+                return
+            for key in [k for k in self._entries if k[0] == kind]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,170 @@
+"""
+Full-text search over packing lists, proforma invoices and ZC invoices
+One SQLite FTS5 table per document type, keyed by the record id (rowid)
+and kept in sync by the create/update routes
+"""
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# Document kind -> FTS5 table
+FTS_TABLES = {
+    'packaging_list': 'packaging_list_fts',
+    'proforma_invoice': 'proforma_invoice_fts',
+    'zc_exporter': 'zc_exporter_fts',
+}
+
+FTS_COLUMNS = ('number', 'po', 'address', 'items')
+
+
+def _join(*parts):
+    return '\n'.join(str(p).strip() for p in parts if p not in (None, '') and str(p).strip())
+
+
+def document_fields(kind, record):
+    """
+    Extract the searchable text of a record
+
+    Args:
+        kind (str): 'packaging_list', 'proforma_invoice' or 'zc_exporter'
+        record: PackagingList, ProformaInvoice or ZCExporter instance
+
+    Returns:
+        dict: number, po, address and items text for the FTS table
+    """
+    if kind == 'packaging_list':
+        words = []
+        module_b = record.moduleB_data if isinstance(record.moduleB_data, dict) else {}
+        for h in module_b.get('itemHierarchies') or []:
+            if not isinstance(h, dict):
+                continue
+            words.append(h.get('itemNumber'))
+            for b in h.get('associatedBoxes') or []:
+                if isinstance(b, dict):
+                    words.append(b.get('description'))
+        return {
+            'number': record.packingListNo,
+            'po': record.poNumber,
+            'address': _join(record.consigneeAddress, record.deliveryAddress, record.exporterAddress),
+            'items': _join(*dict.fromkeys(w for w in words if w not in (None, '', 'N/A'))),
+        }
+
+    if kind == 'proforma_invoice':
+        words = []
+        for it in record.line_items or []:
+            if isinstance(it, dict):
+                words.extend([it.get('partNumber'), it.get('description')])
+        return {
+            'number': record.invoice_no,
+            'po': record.po_wo_number,
+            'address': _join(record.bill_to_address, record.supplier_address),
+            'items': _join(*words),
+        }
+
+    if kind == 'zc_exporter':
+        words = []
+        for it in record.items or []:
+            if isinstance(it, dict):
+                words.extend([it.get('partNumber'), it.get('description')])
+        return {
+            'number': record.invoice_number,
+            'po': record.buyer_order_number,
+            'address': _join(record.consignee_address, record.delivery_address),
+            'items': _join(*words),
+        }
+
+    raise ValueError(f'Unknown document type: {kind}')
+
+
+def build_match_query(q):
+    """
+    Turn free text into an FTS5 MATCH expression
+
+    Every whitespace separated term must match (implicit AND) as a prefix;
+    terms are quoted so FTS5 operators and punctuation in part numbers are
+    taken literally.
+    """
+    terms = [t for t in str(q or '').split() if t.strip('"')]
+    return ' '.join('"' + t.replace('"', '""') + '"*' for t in terms)
+
+
+class SearchIndex:
+    """
+    FTS5 index for every document type
+
+    ``available`` stays False until ensure() has created (or found) the
+    tables; indexing is a no-op until then, so a database without FTS5
+    support keeps working without search.
+    """
+
+    def __init__(self):
+        self.available = False
+
+    def ensure(self, conn):
+        """
+        Create missing FTS tables
+
+        Returns:
+            list: Document kinds whose table was just created and needs a backfill
+        """
+        created = []
+        try:
+            existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            for kind, table in FTS_TABLES.items():
+                if table in existing:
+                    continue
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {table} USING fts5("
+                    f"{', '.join(FTS_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2')"
+                ))
+                created.append(kind)
+        except OperationalError:
+            self.available = False
+            return []
+        self.available = True
+        return created
+
+    def index(self, conn, kind, record_id, fields):
+        self.index_many(conn, kind, [(record_id, fields)])
+
+    def index_many(self, conn, kind, docs):
+        """Replace the FTS rows of ``docs``: a list of (record_id, fields) pairs"""
+        if not self.available or not docs:
+            return
+        table = FTS_TABLES[kind]
+        conn.execute(text(f'DELETE FROM {table} WHERE rowid = :id'), [{'id': record_id} for record_id, _ in docs])
+        conn.execute(
+            text(f"INSERT INTO {table} (rowid, {', '.join(FTS_COLUMNS)}) "
+                 f"VALUES (:id, {', '.join(':' + c for c in FTS_COLUMNS)})"),
+            [dict({c: fields.get(c) or '' for c in FTS_COLUMNS}, id=record_id) for record_id, fields in docs],
+        )
+
+    def search(self, conn, q, limit=20, kinds=None):
+        """
+        Ranked hits across document types, best first
+
+        Returns:
+            list: Dicts with type, id, number, snippet and rank (bm25, lower is better)
+        """
+        match = build_match_query(q)
+        if not self.available or not match:
+            return []
+        hits = []
+        for kind, table in FTS_TABLES.items():
+            if kinds and kind not in kinds:
+                continue
+            rows = conn.execute(
+                text(f"SELECT rowid, number, snippet({table}, -1, '[', ']', '…', 10), bm25({table}) AS rank "
+                     f"FROM {table} WHERE {table} MATCH :match ORDER BY rank LIMIT :limit"),
+                {'match': match, 'limit': limit},
+            )
+            for record_id, number, snippet, rank in rows:
+                hits.append({
+                    'type': kind,
+                    'id': record_id,
+                    'number': number or '',
+                    'snippet': snippet or '',
+                    'rank': rank,
+                })
+        hits.sort(key=lambda h: h['rank'])
+        return hits[:limit]
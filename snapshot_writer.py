@@ -0,0 +1,119 @@
+"""
+Background writer for debug JSON snapshots
+Print and create routes hand their data to a bounded queue; a single daemon
+thread writes one file per record (atomic rename) and keeps only the newest
+files of each kind. Disabled unless SNAPSHOTS is set in the environment.
+"""
+
+import json
+import os
+import queue
+import tempfile
+import threading
+
+
+class SnapshotWriter:
+    """
+    Opt-in, off-request-thread JSON snapshot writer
+
+    Args:
+        root (str): Base directory; snapshots go to <root>/<folder>/
+        enabled (bool): When False, submit() is a no-op
+        max_queue (int): Pending snapshots kept before new ones are dropped
+        keep (int): Newest snapshot files kept per folder and kind (0 keeps all)
+    """
+
+    def __init__(self, root, enabled=False, max_queue=100, keep=20):
+        self.root = root
+        self.enabled = enabled
+        self.keep = keep
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, folder, kind, record_id, data, indent=2):
+        """
+        Queue ``data`` for writing to <root>/<folder>/snapshot_<kind>_<record_id>.json
+
+        Never blocks and never touches the filesystem; when the queue is
+        full the snapshot is dropped and counted.
+
+        Returns:
+            bool: True when the snapshot was queued
+        """
+        if not self.enabled:
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((folder, kind, record_id, data, indent))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Block until every queued snapshot has been written (tests, shutdown)"""
+        if self._thread is None:
+            return
+        with self._queue.all_tasks_done:
+            if timeout is None:
+                while self._queue.unfinished_tasks:
+                    self._queue.all_tasks_done.wait()
+            else:
+                self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            folder, kind, record_id, data, indent = self._queue.get()
+            try:
+                self._write(folder, kind, record_id, data, indent)
+                self.written += 1
+            except Exception:
+                # Snapshots are a debugging aid; a failed write must not kill the writer
+                pass
+            finally:
+                self._queue.task_done()
+
+    def _write(self, folder, kind, record_id, data, indent):
+        prefix = f'snapshot_{kind}_'
+        name = f'{prefix}{record_id}.json'
+        target_dir = os.path.join(self.root, folder)
+        os.makedirs(target_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + name, suffix='.tmp', dir=target_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=indent, default=str)
+            os.replace(tmp_path, os.path.join(target_dir, name))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._rotate(target_dir, prefix)
+
+    def _rotate(self, target_dir, prefix):
+        if self.keep <= 0:
+            return
+        snapshots = []
+        for entry in os.scandir(target_dir):
+            # Only this writer's files; fixtures such as packaging_list/data.json are left alone
+            if entry.is_file() and entry.name.startswith(prefix) and entry.name.endswith('.json'):
+                snapshots.append((entry.stat().st_mtime, entry.path))
+        snapshots.sort(reverse=True)
+        for _, path in snapshots[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
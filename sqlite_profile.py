@@ -0,0 +1,106 @@
+"""
+SQLite storage profiles
+Applies journal mode and tuning pragmas to every new connection and
+provides the matching engine/pool options for Flask-SQLAlchemy
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Pragmas are applied in this order; journal_mode first so the others apply to WAL
+PROFILES = {
+    # Readers never block the writer (and vice versa); fsync only at checkpoints
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,          # ms to wait for a lock before "database is locked"
+        'mmap_size': 268435456,        # 256 MiB memory-mapped reads
+        'cache_size': -65536,          # 64 MiB page cache (negative = KiB)
+        'temp_store': 'MEMORY',
+    },
+    # SQLite defaults (rollback journal), kept for comparison and opt-out
+    'legacy': {},
+}
+
+# Environment overrides for individual pragmas, e.g. SQLITE_BUSY_TIMEOUT=10000
+PRAGMA_ENV = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE',
+}
+
+
+def profile_from_env(environ):
+    """
+    Resolve the pragma set from SQLITE_PROFILE (default 'production') and overrides
+
+    Args:
+        environ (Mapping): Usually os.environ
+
+    Returns:
+        dict: pragma name -> value
+    """
+    name = (environ.get('SQLITE_PROFILE') or 'production').strip().lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{name}' (expected one of: {', '.join(PROFILES)})")
+    pragmas = dict(PROFILES[name])
+    for pragma, var in PRAGMA_ENV.items():
+        value = (environ.get(var) or '').strip()
+        if value:
+            pragmas[pragma] = value
+    return pragmas
+
+
+def is_file_database(url):
+    """Whether ``url`` is a SQLite database on disk (not :memory: or another backend)"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    database = url.database or ''
+    return database not in ('', ':memory:') and 'mode=memory' not in database and url.query.get('mode') != 'memory'
+
+
+def pool_options_from_env(environ, pragmas, url):
+    """
+    Engine options with explicit pool sizing (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT)
+
+    The sqlite3 driver timeout matches busy_timeout so both layers wait the same time.
+    Only file-backed SQLite gets these; in-memory SQLite (a static pool) and
+    other backends keep SQLAlchemy's defaults.
+    """
+    if not is_file_database(url):
+        return {}
+    busy_ms = int(pragmas.get('busy_timeout') or 5000)
+    return {
+        'pool_size': int(environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': False,
+        'connect_args': {'timeout': busy_ms / 1000.0, 'check_same_thread': False},
+    }
+
+
+def apply_profile(engine, pragmas):
+    """
+    Run ``pragmas`` on every new DBAPI connection of a SQLite ``engine``
+
+    Args:
+        engine: SQLAlchemy engine
+        pragmas (dict): pragma name -> value, see PROFILES
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    statements = [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,160 @@
+"""
+In-memory cache of the static form pages and assets
+add.html/view.html/edit.html, the ZC scripts and static/ are read once (on
+first hit), then served from memory with a content-hash ETag and, for text
+files, a precompressed body. Files only change with a release, so nothing
+is stat'ed again unless watch mode is on (STATIC_WATCH=1, or the debug
+server), which re-reads a file when its mtime or size changes. The .gz/.br
+files written by build_assets.py are used instead of compressing again.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from collections import namedtuple
+
+from flask import Response
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from http_compression import available_encodings, compress_body
+
+# Fingerprinted file names carry a content hash: bootstrap.min.3c8f27e600.css
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+TEXT_TYPES = frozenset(('text/html', 'text/css', 'text/javascript', 'application/javascript',
+                        'application/json', 'image/svg+xml'))
+
+# Variants written by build_assets.py, preferred first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+Entry = namedtuple('Entry', 'body etag mimetype encoded mtime_ns size')
+
+
+class StaticCache:
+    """
+    Files under ``root`` kept in memory
+
+    Args:
+        root (str): Base directory; request paths are joined to it safely
+        watch (bool): Re-read files that changed on disk (development)
+        max_file_size (int): Larger files are not cached, only served
+        min_compress_size (int): Smallest text file that gets encoded variants
+        transform (callable): Applied to HTML bodies when they are loaded
+    """
+
+    def __init__(self, root, watch=False, max_file_size=4 * 1024 * 1024, min_compress_size=1024, transform=None):
+        self.root = root
+        self.watch = watch
+        self.transform = transform
+        self.max_file_size = max_file_size
+        self.min_compress_size = min_compress_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _load(self, path, st):
+        with open(path, 'rb') as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        transformed = self.transform is not None and mimetype == 'text/html'
+        if transformed:
+            body = self.transform(body)
+        encoded = {}
+        for encoding, suffix in () if transformed else PRECOMPRESSED:
+            try:
+                with open(path + suffix, 'rb') as f:
+                    encoded[encoding] = f.read()
+            except OSError:
+                pass
+        if not encoded and mimetype in TEXT_TYPES and len(body) >= self.min_compress_size:
+            for encoding in available_encodings():
+                encoded[encoding] = compress_body(body, encoding, gzip_level=9, brotli_quality=11)
+        etag = hashlib.sha256(body).hexdigest()[:20]
+        self.loads += 1
+        return Entry(body, etag, mimetype, encoded, st.st_mtime_ns, st.st_size)
+
+    def get(self, *parts):
+        """
+        Cached entry for a path under root, given as parts ('ZC', filename);
+        each part is checked on its own, so a part cannot climb out of the
+        one before it
+
+        Raises:
+            NotFound: Outside root, missing or not a file
+        """
+        path = safe_join(self.root, *parts)
+        if path is None:
+            raise NotFound()
+        entry = self._entries.get(path)
+        if entry is not None and not self.watch:
+            self.hits += 1
+            return entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise NotFound()
+        if not stat.S_ISREG(st.st_mode):
+            raise NotFound()
+        if entry is not None and (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size):
+            self.hits += 1
+            return entry
+        entry = self._load(path, st)
+        if st.st_size <= self.max_file_size:
+            with self._lock:
+                self._entries[path] = entry
+        return entry
+
+    def response(self, request, *parts, immutable=None):
+        """
+        Serve a file from memory
+
+        Args:
+            request: Current request (If-None-Match, Accept-Encoding)
+            parts (str): Path under root, see get()
+            immutable (bool): Long-lived Cache-Control; None decides from the
+                file name (fingerprinted) or a ?v= matching the content hash
+
+        Raises:
+            NotFound: See get()
+        """
+        entry = self.get(*parts)
+        if immutable is None:
+            immutable = (FINGERPRINT_RE.search(os.path.basename(parts[-1])) is not None
+                         or request.args.get('v') == entry.etag)
+
+        if request.if_none_match.contains_weak(entry.etag):
+            response = Response(status=304)
+        else:
+            encoding = request.accept_encodings.best_match(list(entry.encoded)) if entry.encoded else None
+            response = Response(entry.encoded[encoding] if encoding else entry.body, mimetype=entry.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        if entry.encoded:
+            response.vary.add('Accept-Encoding')
+        # Weak: the same tag covers the plain and encoded bodies
+        response.set_etag(entry.etag, weak=True)
+        response.headers['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'entries': len(entries),
+            'bytes': sum(len(e.body) + sum(map(len, e.encoded.values())) for e in entries),
+            'hits': self.hits,
+            'loads': self.loads,
+            'watch': self.watch,
+        }
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# Make the top-level modules importable
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+
+@pytest.fixture(scope='session')
+def main_module(tmp_path_factory):
+    """The app module, on a scratch database brought up to date with init_database()"""
+    db_path = tmp_path_factory.mktemp('db') / 'web_forms.db'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + str(db_path).replace('\\', '/')
+    import main
+    with main.app.app_context():
+        main.init_database()
+    yield main
+    main.pdf_renderer.shutdown()
+    with main.app.app_context():
+        main.db.engine.dispose()
+
+
+@pytest.fixture
+def app(main_module):
+    with main_module.app.app_context():
+        yield main_module.app
+
+
+@pytest.fixture
+def client(main_module):
+    return main_module.app.test_client()
+
+
+@pytest.fixture
+def packing_list_payload():
+    def _payload(number='PL-1', boxes='1-20', net=2.0, gross=2.5):
+        return {
+            'packingListNo': number, 'poNumber': 'PO-1', 'currency': 'USD', 'dischargePort': 'Jebel Ali',
+            'moduleAType': 'A1', 'moduleBType': 'B1',
+            'moduleA': [{'boxNumbers': boxes, 'description': 'Butterfly valve DN50', 'qty': 4,
+                         'l': '40', 'w': '30', 'h': '20', 'netWt': net, 'grossWt': gross}],
+            'moduleB': [{'itemNumbers': '1', 'boxNumber': boxes}],
+        }
+    return _payload
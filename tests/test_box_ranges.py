@@ -0,0 +1,147 @@
+"""
+RangeSet, BoxMap and group_items against the string expansion that
+create_packaging_list used before box ranges were kept as intervals
+"""
+
+import random
+
+import pytest
+
+from packaging_list.box_ranges import BoxMap, RangeSet, group_items, iter_items, sort_key
+
+
+def _expand(value):
+    # The former _parse_tokens: "1-3, A7" -> ['1', '2', '3', 'A7']
+    raw = str(value or '').strip()
+    if not raw:
+        return []
+    out = []
+    for token in raw.split(','):
+        t = token.strip()
+        if not t:
+            continue
+        if '-' in t:
+            parts = [p.strip() for p in t.split('-', 1)]
+            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                a, b = int(parts[0]), int(parts[1])
+                out.extend(str(n) for n in range(min(a, b), max(a, b) + 1))
+                continue
+        out.append(t)
+    return out
+
+
+def _random_refs(rng, count=4, high=60):
+    tokens = []
+    for _ in range(rng.randint(1, count)):
+        roll = rng.random()
+        if roll < 0.45:
+            a, b = rng.randint(1, high), rng.randint(1, high)
+            tokens.append(f'{a}-{b}')
+        elif roll < 0.9:
+            tokens.append(str(rng.randint(1, high)))
+        else:
+            tokens.append(rng.choice(['A7', '12B', 'X-1']))
+    return ', '.join(tokens)
+
+
+def _members(ranges):
+    return set(iter_items(ranges))
+
+
+@pytest.mark.parametrize('value, text, size', [
+    ('', '', 0),
+    ('5', '5', 1),
+    ('1-5, 7', '1-5, 7', 6),
+    ('9-3', '3-9', 7),
+    ('1-3, 4-6, 5', '1-6', 6),
+    ('A1, 2, 2', '2, A1', 2),
+    (' 1 - 20000 ', '1-20000', 20000),
+])
+def test_parse(value, text, size):
+    ranges = RangeSet.parse(value)
+    assert ranges.to_text() == text
+    assert len(ranges) == size
+
+
+def test_parse_matches_expansion():
+    rng = random.Random(1)
+    for _ in range(500):
+        value = _random_refs(rng)
+        ranges = RangeSet.parse(value)
+        assert _members(ranges) == set(_expand(value))
+        assert len(ranges) == len(set(_expand(value)))
+
+
+def test_set_operations_match_expansion():
+    rng = random.Random(2)
+    for _ in range(300):
+        a, b = _random_refs(rng), _random_refs(rng)
+        ra, rb = RangeSet.parse(a), RangeSet.parse(b)
+        sa, sb = set(_expand(a)), set(_expand(b))
+        assert _members(ra | rb) == sa | sb
+        assert _members(ra & rb) == sa & sb
+        for n in range(0, 62):
+            assert ra.contains(n) == (str(n) in sa)
+
+
+def test_box_map_is_last_write_wins():
+    rng = random.Random(3)
+    for _ in range(200):
+        box_map = BoxMap()
+        lookup = {}
+        for value in range(rng.randint(1, 6)):
+            refs = _random_refs(rng)
+            box_map.assign(RangeSet.parse(refs), value)
+            for box in _expand(refs):
+                lookup[box] = value
+
+        query = RangeSet.parse(_random_refs(rng))
+        pieces = box_map.split(query, default='none')
+        seen = []
+        for piece, value in pieces:
+            for box in iter_items(piece):
+                assert value == lookup.get(box, 'none')
+                seen.append(box)
+        assert sorted(seen, key=sort_key) == sorted(_members(query), key=sort_key)
+
+
+def test_box_map_keeps_ranges_whole():
+    box_map = BoxMap()
+    box_map.assign(RangeSet.parse('1-20000'), 'a')
+    box_map.assign(RangeSet.parse('100-199'), 'b')
+    pieces = box_map.split(RangeSet.parse('1-20000'))
+    assert [(p.to_text(), v) for p, v in pieces] == [('1-99', 'a'), ('100-199', 'b'), ('200-20000', 'a')]
+
+
+def test_group_items_matches_expanded_join():
+    rng = random.Random(4)
+    for _ in range(200):
+        rows = [(_random_refs(rng, 2, 20), _random_refs(rng, 3, 30)) for _ in range(rng.randint(1, 4))]
+
+        # Expanded join: item -> boxes, box -> items
+        item_to_boxes = {}
+        for items, boxes in rows:
+            for box in _expand(boxes):
+                for item in _expand(items):
+                    item_to_boxes.setdefault(item, set()).add(box)
+        box_to_items = {}
+        for item, boxes in item_to_boxes.items():
+            for box in boxes:
+                box_to_items.setdefault(box, set()).add(item)
+
+        groups = group_items([(RangeSet.parse(i), RangeSet.parse(b)) for i, b in rows])
+        grouped = {}
+        for group in groups:
+            for item in iter_items(group['items']):
+                assert item not in grouped
+                grouped[item] = group
+        assert set(grouped) == set(item_to_boxes)
+        for item, group in grouped.items():
+            assert _members(group['boxes']) == item_to_boxes[item]
+            shared = any(len(box_to_items[box]) > 1 for box in item_to_boxes[item])
+            assert group['shared'] == shared
+
+
+def test_sort_key_orders_numbers_before_labels():
+    values = ['10', 'A7', '2-5', '1', '12B']
+    assert sorted(values, key=sort_key) == ['1', '2-5', '10', '12B', 'A7']
@@ -0,0 +1,147 @@
+"""
+NDJSON bulk import: one transaction per batch, one savepoint per line
+"""
+
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+
+def _ndjson(*rows):
+    return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows) + '\n'
+
+
+@pytest.fixture
+def statements(main_module, app):
+    # Every SQL statement the sqlite3 driver sends, on fresh connections
+    engine = main_module.db.engine
+    seen = []
+
+    def _trace(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(seen.append)
+
+    engine.dispose()
+    event.listen(engine, 'connect', _trace)
+    yield seen
+    event.remove(engine, 'connect', _trace)
+    engine.dispose()
+
+
+def _transactions(statements):
+    # Statements of each committed BEGIN ... COMMIT, and those run outside
+    # any transaction
+    out = {'committed': [], 'outside': []}
+    current = None
+    for sql in statements:
+        word = sql.strip().split()[0].upper()
+        if word == 'BEGIN':
+            current = []
+        elif word in ('COMMIT', 'ROLLBACK') and sql.strip().upper() in ('COMMIT', 'ROLLBACK'):
+            if word == 'COMMIT' and current is not None:
+                out['committed'].append(current)
+            current = None
+        elif current is None:
+            out['outside'].append(sql)
+        else:
+            current.append(sql)
+    return out
+
+
+def test_batch_commits_once(client, packing_list_payload, statements):
+    rows = [packing_list_payload(f'BULK-{i}') for i in range(5)]
+    r = client.post('/api/packaging-list/bulk?batch_size=2', data=_ndjson(*rows),
+                    content_type='application/x-ndjson')
+    body = r.get_json()
+    assert r.status_code == 200 and body['created'] == 5, body
+
+    tx = _transactions(statements)
+    # 2 + 2 + 1 rows
+    assert len(tx['committed']) == 3
+    assert not [sql for sql in tx['outside'] if sql.upper().startswith(('SAVEPOINT', 'RELEASE', 'INSERT'))]
+    per_batch = [sum(1 for sql in batch if sql.upper().startswith('RELEASE')) for batch in tx['committed']]
+    assert per_batch == [2, 2, 1]
+
+
+def test_bad_line_is_rolled_back(main_module, app, client, packing_list_payload, monkeypatch):
+    db = main_module.db
+    update_summary = main_module._update_summary
+
+    def _failing_summary(kind, record, before=None):
+        # Fails after the record, its box rows and its FTS row were written
+        if record.packingListNo == 'BULK-BAD':
+            raise RuntimeError('summary failed')
+        return update_summary(kind, record, before)
+
+    monkeypatch.setattr(main_module, '_update_summary', _failing_summary)
+    documents_before = db.session.query(db.func.sum(main_module.DocumentSummary.documents)).filter(
+        main_module.DocumentSummary.kind == 'packaging_list').scalar() or 0
+
+    r = client.post('/api/packaging-list/bulk', content_type='application/x-ndjson', data=_ndjson(
+        packing_list_payload('BULK-OK-1'),
+        '{not json',
+        packing_list_payload('BULK-BAD'),
+        [1, 2],
+        packing_list_payload('BULK-OK-2'),
+    ))
+    body = r.get_json()
+    assert r.status_code == 200
+    assert [row['success'] for row in body['results']] == [True, False, False, False, True]
+    assert body['results'][2]['message'] == 'summary failed'
+    assert body['results'][3]['message'] == 'Each line must be a JSON object'
+
+    PackagingList = main_module.PackagingList
+    numbers = {n for (n,) in db.session.query(PackagingList.packingListNo).filter(
+        PackagingList.packingListNo.like('BULK-%'))}
+    assert {'BULK-OK-1', 'BULK-OK-2'} <= numbers
+    assert 'BULK-BAD' not in numbers
+
+    # Nothing of the failed line survives (its id is free again and was
+    # taken by the next line, so check the rows by content)
+    ok_ids = [row['id'] for row in body['results'] if row['success']]
+    boxes = [db.session.query(main_module.PackagingListBox).filter(
+        main_module.PackagingListBox.packaging_list_id == record_id).count() for record_id in ok_ids]
+    assert boxes == [1, 1]
+    fts = db.session.execute(text(
+        "SELECT rowid, number FROM packaging_list_fts WHERE number LIKE 'BULK-OK-%' OR number = 'BULK-BAD'")).all()
+    assert sorted(fts) == sorted(zip(ok_ids, ['BULK-OK-1', 'BULK-OK-2']))
+
+    documents_after = db.session.query(db.func.sum(main_module.DocumentSummary.documents)).filter(
+        main_module.DocumentSummary.kind == 'packaging_list').scalar()
+    assert documents_after == documents_before + 2
+
+
+def test_unknown_type(client):
+    r = client.post('/api/invoices/bulk', data='{}\n')
+    assert r.status_code == 404
+
+
+def test_failed_commit_marks_its_batch_failed(main_module, app, client, packing_list_payload, monkeypatch):
+    db = main_module.db
+    commit = db.session.commit
+    calls = []
+
+    def _commit():
+        # The first batch commits, the second fails
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError('disk I/O error')
+        commit()
+
+    monkeypatch.setattr(db.session, 'commit', _commit)
+    rows = [packing_list_payload(f'BULK-C-{i}') for i in range(4)]
+    r = client.post('/api/packaging-list/bulk?batch_size=2', data=_ndjson(*rows),
+                    content_type='application/x-ndjson')
+    monkeypatch.undo()
+
+    body = r.get_json()
+    assert r.status_code == 400 and body['message'] == 'disk I/O error'
+    assert [row['success'] for row in body['results']] == [True, True, False, False]
+    assert body['results'][2] == {'line': 3, 'success': False, 'message': 'disk I/O error'}
+
+    PackagingList = main_module.PackagingList
+    saved = {n for (n,) in db.session.query(PackagingList.packingListNo).filter(
+        PackagingList.packingListNo.like('BULK-C-%'))}
+    assert saved == {'BULK-C-0', 'BULK-C-1'}
+    assert {row['id'] for row in body['results'][:2]} == {
+        i for (i,) in db.session.query(PackagingList.id).filter(PackagingList.packingListNo.in_(saved))}
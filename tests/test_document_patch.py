@@ -0,0 +1,112 @@
+"""
+JSON-Patch error paths: malformed bodies, bad paths and indexes, failed
+tests; a rejected patch changes nothing
+"""
+
+import pytest
+
+from document_patch import PatchError, apply_patch, parse_operations, parse_pointer
+
+LINES = [{'lineNo': 1, 'quantity': '2'}, {'lineNo': 2, 'quantity': '5'}]
+
+
+def _apply(body, header=None):
+    header = header or {'invoiceNo': 'PI-1'}
+    return apply_patch(parse_operations(body), header.get, header, 'lineItems',
+                       ('lineNo', 'quantity', 'unitRate'), LINES)
+
+
+@pytest.mark.parametrize('body, message', [
+    (None, 'Expected a non-empty list of operations'),
+    ([], 'Expected a non-empty list of operations'),
+    ({'operations': []}, 'Expected a non-empty list of operations'),
+    ({'op': 'replace', 'path': '/invoiceNo', 'value': 'x'}, 'Expected a non-empty list of operations'),
+    (['replace'], "Operation 0: 'op' must be one of add, remove, replace, test"),
+    ([{'op': 'move', 'path': '/invoiceNo'}], "Operation 0: 'op' must be one of"),
+    ([{'op': 'remove', 'path': '/a'}, {'op': 'replace', 'path': '/invoiceNo'}], "Operation 1: 'replace' needs a value"),
+    ([{'op': 'remove', 'path': 'invoiceNo'}], "Invalid path: 'invoiceNo'"),
+    ([{'op': 'remove'}], 'Invalid path: None'),
+])
+def test_malformed_body(body, message):
+    with pytest.raises(PatchError, match=message.replace('(', r'\(')):
+        parse_operations(body)
+
+
+def test_pointer_unescapes():
+    assert parse_pointer('/a~1b/~00') == ['a/b', '~0']
+
+
+@pytest.mark.parametrize('ops, message', [
+    ([{'op': 'replace', 'path': '/unknown', 'value': 1}], 'Unknown path: /unknown'),
+    ([{'op': 'replace', 'path': '/lineItems/0/quantity/x', 'value': 1}], 'Unknown path'),
+    ([{'op': 'replace', 'path': '/lineItems/2/quantity', 'value': 1}], 'Line index out of range: 2'),
+    ([{'op': 'remove', 'path': '/lineItems/-'}], "Invalid line index: '-'"),
+    ([{'op': 'remove', 'path': '/lineItems/01'}], "Invalid line index: '01'"),
+    ([{'op': 'add', 'path': '/lineItems/3', 'value': {}}], 'Line index out of range: 3'),
+    ([{'op': 'add', 'path': '/lineItems/-', 'value': 'x'}], 'A line item must be an object'),
+    ([{'op': 'replace', 'path': '/lineItems/0', 'value': []}], 'A line item must be an object'),
+    ([{'op': 'replace', 'path': '/lineItems/0/colour', 'value': 'red'}], 'Unknown line field: colour'),
+    ([{'op': 'test', 'path': '/invoiceNo', 'value': 'PI-2'}], 'Test failed for /invoiceNo'),
+    ([{'op': 'test', 'path': '/lineItems/1', 'value': {}}], 'Test failed for /lineItems/1'),
+    ([{'op': 'test', 'path': '/lineItems/0/quantity', 'value': '3'}], 'Test failed for /lineItems/0/quantity'),
+])
+def test_rejected_operation(ops, message):
+    with pytest.raises(PatchError, match=message):
+        _apply(ops)
+
+
+def test_test_sees_earlier_operations():
+    result = _apply([
+        {'op': 'replace', 'path': '/invoiceNo', 'value': 'PI-2'},
+        {'op': 'test', 'path': '/invoiceNo', 'value': 'PI-2'},
+        {'op': 'replace', 'path': '/lineItems/0/quantity', 'value': '3'},
+        {'op': 'test', 'path': '/lineItems/0/quantity', 'value': '3'},
+    ])
+    assert result.header == {'invoiceNo': 'PI-2'}
+    assert LINES[0]['quantity'] == '2'      # stored lines are left alone
+
+
+@pytest.fixture
+def invoice_id(client):
+    r = client.post('/api/proforma-invoice/create', json={
+        'invoiceNo': 'PI-PATCH', 'currency': 'INR',
+        'lineItems': [{'lineNo': 1, 'quantity': 2, 'unitRate': '10'}],
+    })
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()['id']
+
+
+def test_failed_patch_changes_nothing(main_module, app, client, invoice_id):
+    before = client.get(f'/api/proforma-invoice/{invoice_id}').get_json()
+    r = client.patch(f'/api/proforma-invoice/{invoice_id}', json=[
+        {'op': 'replace', 'path': '/invoiceNo', 'value': 'PI-CHANGED'},
+        {'op': 'replace', 'path': '/lineItems/0/quantity', 'value': 7},
+        {'op': 'test', 'path': '/lineItems/0/lineNo', 'value': 99},
+    ])
+    assert r.status_code == 400
+    assert r.get_json() == {'success': False, 'message': 'Test failed for /lineItems/0/lineNo'}
+
+    main_module.db.session.expire_all()
+    assert client.get(f'/api/proforma-invoice/{invoice_id}').get_json() == before
+
+
+@pytest.mark.parametrize('body, message', [
+    ('not json', 'Expected a non-empty list of operations'),
+    ([{'op': 'replace', 'path': '/lineItems/5/quantity', 'value': 1}], 'Line index out of range: 5'),
+    ([{'op': 'replace', 'path': '/totalAmount', 'value': '1'}], 'Unknown path: /totalAmount'),
+])
+def test_bad_patch_is_a_400(client, invoice_id, body, message):
+    if isinstance(body, str):
+        r = client.patch(f'/api/proforma-invoice/{invoice_id}', data=body, content_type='application/json')
+    else:
+        r = client.patch(f'/api/proforma-invoice/{invoice_id}', json=body)
+    assert r.status_code == 400
+    assert r.get_json()['message'] == message
+
+
+def test_unknown_type_and_record(client):
+    ops = [{'op': 'replace', 'path': '/invoiceNo', 'value': 'x'}]
+    r = client.patch('/api/invoice/1', json=ops)
+    assert r.status_code == 404 and r.get_json()['message'] == 'Unknown document type: invoice'
+    r = client.patch('/api/proforma-invoice/999999', json=ops)
+    assert r.status_code == 404 and r.get_json()['message'] == 'Record not found'
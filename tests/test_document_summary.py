@@ -0,0 +1,46 @@
+"""
+Packing list weights agree across analytics (summary table), line
+aggregates (box rows) and the print: per-box weight x box count
+"""
+
+from document_summary import summary_row
+
+
+def test_box_range_weights_agree(main_module, app, client, packing_list_payload):
+    payload = dict(packing_list_payload('PL-WEIGHT', boxes='1-20000', net=2.0, gross=2.5),
+                   dischargePort='Weight Test Port')
+    r = client.post('/api/packaging-list/create', json=payload)
+    assert r.status_code == 201, r.get_json()
+    record_id = r.get_json()['id']
+
+    r = client.get('/api/analytics?group=port&type=packaging_list')
+    analytics = next(row for row in r.get_json()['groups'] if row['port'] == 'WEIGHT TEST PORT')
+    assert (analytics['netWeight'], analytics['grossWeight']) == (40000.0, 50000.0)
+
+    db = main_module.db
+    Box = main_module.PackagingListBox
+    boxes = db.session.query(db.func.sum(Box.net_weight * Box.box_count),
+                             db.func.sum(Box.gross_weight * Box.box_count)).filter(
+        Box.packaging_list_id == record_id).one()
+    assert tuple(boxes) == (40000.0, 50000.0)
+
+    record = db.session.get(main_module.PackagingList, record_id)
+    data = record.print_model['data']
+    assert (data['total_net_weight'], data['total_gross_weight']) == ('40000.00', '50000.00')
+
+    row = summary_row('packaging_list', record)
+    assert (row['net_weight'], row['gross_weight']) == (40000.0, 50000.0)
+
+
+def test_migration_builds_the_same_totals(main_module, app, client, packing_list_payload):
+    # Step 5 over the documents matches the totals kept up by the writes
+    client.post('/api/packaging-list/create', json=packing_list_payload('PL-REBUILD', boxes='5-9'))
+    db = main_module.db
+    Summary = main_module.DocumentSummary
+    measures = [db.func.sum(getattr(Summary, m)) for m in ('documents', 'net_weight', 'gross_weight')]
+    before = db.session.query(*measures).one()
+
+    db.session.query(Summary).delete()
+    db.session.commit()
+    main_module._ensure_summaries(db.session)
+    assert db.session.query(*measures).one() == before
@@ -0,0 +1,176 @@
+"""
+migrate() on an existing database, search availability on every start, and
+one migration run when several processes start together
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from migrations import Migration, migrate, schema_version
+
+LEGACY_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'web_forms.db')
+
+
+def _count(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).scalar()
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    # A copy of the database shipped from before the migration runner
+    if not os.path.exists(LEGACY_DB):
+        pytest.skip('no legacy database')
+    path = tmp_path / 'legacy.db'
+    shutil.copyfile(LEGACY_DB, path)
+    engine = create_engine(f'sqlite:///{path}')
+    yield engine
+    engine.dispose()
+
+
+def test_existing_database_is_brought_up_to_date(main_module, app, legacy_engine):
+    latest = main_module.MIGRATIONS[-1].version
+    assert schema_version(legacy_engine) == 0
+
+    assert migrate(legacy_engine, main_module.MIGRATIONS) == (0, latest)
+    assert schema_version(legacy_engine) == latest
+    rates = _count(legacy_engine, 'SELECT count(*) FROM currency_rate')
+    documents = _count(legacy_engine, 'SELECT sum(documents) FROM document_summary')
+    assert rates == 2
+    assert documents == sum(_count(legacy_engine, f'SELECT count(*) FROM {table}')
+                            for table in ('packaging_list', 'proforma_invoice', 'zc_exporter'))
+    assert _count(legacy_engine, 'SELECT count(*) FROM proforma_invoice WHERE currency_rate_id IS NULL') == 0
+    assert (_count(legacy_engine, 'SELECT count(*) FROM packaging_list_fts')
+            == _count(legacy_engine, 'SELECT count(*) FROM packaging_list'))
+
+    # A second start changes nothing
+    assert migrate(legacy_engine, main_module.MIGRATIONS) == (latest, latest)
+    assert _count(legacy_engine, 'SELECT count(*) FROM currency_rate') == rates
+    assert _count(legacy_engine, 'SELECT sum(documents) FROM document_summary') == documents
+
+
+def test_failed_schema_step_is_rolled_back(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'failed.db'}")
+
+    def _fail(session):
+        session.execute(text('CREATE TABLE u (id INTEGER)'))
+        raise RuntimeError('step failed')
+
+    steps = [
+        Migration(1, 'table', lambda session: session.execute(text('CREATE TABLE t (id INTEGER)'))),
+        Migration(2, 'fails', _fail),
+    ]
+    with pytest.raises(RuntimeError):
+        migrate(engine, steps)
+    # Step 1 stays done; step 2 left nothing behind and runs again next time
+    assert schema_version(engine) == 1
+    assert _count(engine, "SELECT count(*) FROM sqlite_master WHERE name IN ('t', 'u')") == 1
+    engine.dispose()
+
+
+@pytest.fixture
+def numbers_engine(tmp_path):
+    path = tmp_path / 'online.db'
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE n (id INTEGER PRIMARY KEY, done INTEGER DEFAULT 0)'))
+        conn.execute(text('INSERT INTO n (id) VALUES ' + ', '.join(f'({i})' for i in range(1, 11))))
+    yield engine, path
+    engine.dispose()
+
+
+def _mark_done(session, chunk_hook=None):
+    # An online step over table n, 3 rows per chunk
+    for start in range(0, 10, 3):
+        if chunk_hook:
+            chunk_hook(start)
+        session.execute(text('UPDATE n SET done = 1 WHERE done = 0 AND id IN '
+                             '(SELECT id FROM n WHERE done = 0 ORDER BY id LIMIT 3)'))
+        session.commit()
+
+
+def test_online_step_commits_each_chunk(numbers_engine):
+    engine, path = numbers_engine
+    writes = []
+
+    def _write_between_chunks(start):
+        # Another process writes without waiting: no lock is held between chunks
+        other = sqlite3.connect(path, timeout=0)
+        other.execute('INSERT INTO n (id, done) VALUES (?, 2)', (100 + start,))
+        other.commit()
+        other.close()
+        writes.append(start)
+
+    steps = [Migration(1, 'mark', lambda session: _mark_done(session, _write_between_chunks), online=True)]
+    assert migrate(engine, steps) == (0, 1)
+    assert writes == [0, 3, 6, 9]
+    assert _count(engine, 'SELECT count(*) FROM n WHERE done = 1') == 10
+
+
+def test_interrupted_online_step_resumes(numbers_engine):
+    engine, _ = numbers_engine
+
+    def _stop(start):
+        if start == 6:
+            raise RuntimeError('worker stopped')
+
+    with pytest.raises(RuntimeError):
+        migrate(engine, [Migration(1, 'mark', lambda session: _mark_done(session, _stop), online=True)])
+    assert schema_version(engine) == 0
+    assert _count(engine, 'SELECT count(*) FROM n WHERE done = 1') == 6     # two chunks committed
+
+    assert migrate(engine, [Migration(1, 'mark', _mark_done, online=True)]) == (0, 1)
+    assert _count(engine, 'SELECT count(*) FROM n WHERE done = 1') == 10
+
+
+def test_migration_keeps_record_timestamps(main_module, app, legacy_engine):
+    def _stamps():
+        with legacy_engine.connect() as conn:
+            return {table: conn.execute(text(f'SELECT id, created_at, updated_at FROM {table} ORDER BY id')).all()
+                    for table in ('packaging_list', 'proforma_invoice', 'zc_exporter')}
+
+    before = _stamps()
+    migrate(legacy_engine, main_module.MIGRATIONS)
+    # Pinning rates and building print models leave the records' own timestamps alone
+    assert _count(legacy_engine, 'SELECT count(*) FROM packaging_list WHERE print_model IS NULL') == 0
+    assert _stamps() == before
+
+
+def test_search_is_available_on_every_start(main_module, app, client):
+    latest = main_module.MIGRATIONS[-1].version
+    main_module.search_index.available = False   # a fresh process on a current database
+
+    assert main_module.init_database() == (latest, latest)
+    assert main_module.search_index.available
+    assert client.get('/api/search?q=valve').status_code == 200
+
+
+def test_concurrent_start_waits_for_the_running_migration(main_module, tmp_path):
+    path = tmp_path / 'shared.db'
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute('PRAGMA journal_mode = WAL')
+    holder.execute('BEGIN EXCLUSIVE')            # another worker is migrating
+
+    engine = create_engine(f'sqlite:///{path}')
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault('versions', migrate(engine, main_module.MIGRATIONS)))
+    worker.start()
+    time.sleep(0.5)
+    assert worker.is_alive()
+
+    latest = main_module.MIGRATIONS[-1].version
+    holder.execute(f'PRAGMA user_version = {latest}')
+    holder.execute('COMMIT')
+    worker.join(10)
+
+    # The waiting run found the database current and ran no step itself
+    assert result['versions'] == (latest, latest)
+    assert _count(engine, "SELECT count(*) FROM sqlite_master WHERE name = 'currency_rate'") == 0
+    holder.close()
+    engine.dispose()
@@ -0,0 +1,90 @@
+"""
+Print and PDF caches are keyed on the record version stored in the
+database, so a write seen by one worker is never served stale by another
+"""
+
+from concurrent.futures import Future
+
+import pytest
+
+from pdf_render import PdfRenderer
+from render_cache import RenderCache
+
+
+def _create(client, payload):
+    r = client.post('/api/packaging-list/create', json=payload)
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()['id']
+
+
+@pytest.fixture
+def no_local_invalidation(main_module, monkeypatch):
+    # Another worker's cache: it never sees this process invalidate anything
+    monkeypatch.setattr(main_module.print_cache, 'invalidate', lambda *args, **kwargs: None)
+    monkeypatch.setattr(main_module.pdf_cache, 'invalidate', lambda *args, **kwargs: None)
+
+
+def test_packing_list_print_follows_patch(client, packing_list_payload, no_local_invalidation):
+    record_id = _create(client, packing_list_payload('PL-OLD'))
+    assert b'PL-OLD' in client.get(f'/packaging_list/print/{record_id}').data
+
+    r = client.patch(f'/api/packaging-list/{record_id}',
+                     json=[{'op': 'replace', 'path': '/packingListNo', 'value': 'PL-NEW'}])
+    assert r.status_code == 200, r.get_json()
+
+    html = client.get(f'/packaging_list/print/{record_id}').data
+    assert b'PL-NEW' in html and b'PL-OLD' not in html
+
+
+def test_packing_list_version_changes_on_write(main_module, app, client, packing_list_payload):
+    record_id = _create(client, packing_list_payload('PL-V'))
+    before = main_module._record_version(main_module.PackagingList, record_id)
+    client.patch(f'/api/packaging-list/{record_id}', json=[{'op': 'replace', 'path': '/poNumber', 'value': 'X'}])
+    main_module.db.session.expire_all()
+    assert main_module._record_version(main_module.PackagingList, record_id) != before
+
+
+def test_pdf_finished_after_a_write_is_not_cached():
+    cache = RenderCache()
+    versions = {'current': 'v1'}
+    renderer = PdfRenderer(cache, current_version=lambda kind, record_id: versions['current'])
+    pending = Future()
+    renderer._pool = lambda: type('Pool', (), {'submit': lambda self, *args: pending})()
+
+    future = renderer.submit('packaging_list', 1, 'v1', lambda: {})
+    versions['current'] = 'v2'          # the record is edited while the PDF renders
+    pending.set_result(b'%PDF-old')
+
+    assert future.result() == b'%PDF-old'
+    assert cache.get('packaging_list', 1, 'v1') is None
+
+
+def test_pdf_of_the_current_version_is_cached():
+    cache = RenderCache()
+    renderer = PdfRenderer(cache, current_version=lambda kind, record_id: 'v1')
+    pending = Future()
+    renderer._pool = lambda: type('Pool', (), {'submit': lambda self, *args: pending})()
+
+    renderer.submit('packaging_list', 1, 'v1', lambda: {})
+    pending.set_result(b'%PDF')
+    assert cache.get('packaging_list', 1, 'v1') == b'%PDF'
+
+
+def test_print_without_a_print_model_writes_nothing(main_module, app, client, packing_list_payload):
+    record_id = _create(client, packing_list_payload('PL-NO-MODEL'))
+    db = main_module.db
+    db.session.execute(main_module.PackagingList.__table__.update()
+                       .where(main_module.PackagingList.id == record_id)
+                       .values(print_model=None, updated_at=main_module.PackagingList.updated_at))
+    db.session.commit()
+    version = main_module._record_version(main_module.PackagingList, record_id)
+    table_version = main_module._table_version('packaging_list')
+
+    assert b'PL-NO-MODEL' in client.get(f'/packaging_list/print/{record_id}').data
+    hits = main_module.print_cache.hits
+    assert b'PL-NO-MODEL' in client.get(f'/packaging_list/print/{record_id}').data
+    assert main_module.print_cache.hits == hits + 1
+
+    db.session.expire_all()
+    assert main_module._record_version(main_module.PackagingList, record_id) == version
+    assert main_module._table_version('packaging_list') == table_version
@@ -0,0 +1,123 @@
+"""
+Proforma invoice pricing: exact totals, and invoices saved before the rate
+table keep the default rate they were priced with
+"""
+
+import random
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from currency_rates import DEFAULT_RATES
+from proforma_invoice.logic import price_invoice, revalue_invoice
+
+
+@pytest.mark.parametrize('divisor', ['90', '286', '83.4567', '3', '7.7'])
+def test_line_totals_sum_to_the_total(divisor):
+    rng = random.Random(divisor)
+    for _ in range(200):
+        items = [{'quantity': rng.randint(1, 40), 'unitRate': f'{rng.uniform(0.01, 5000):.2f}',
+                  'total': rng.choice(['', f'{rng.uniform(1, 90000):.2f}'])}
+                 for _ in range(rng.randint(1, 12))]
+        priced = price_invoice({'lineItems': items, 'advanceAmount': '1,000.00'}, Decimal(divisor))
+        assert sum(Decimal(line['total']) for line in priced['line_items']) == Decimal(priced['total'])
+        assert Decimal(priced['receivable']) == Decimal(priced['total']) - Decimal(priced['advance'])
+
+        again = revalue_invoice({'lineItems': priced['line_items'], 'totalAmount': priced['total']},
+                                Decimal(divisor), Decimal('100'))
+        assert sum(Decimal(line['total']) for line in again['line_items']) == Decimal(again['total'])
+
+
+@pytest.fixture
+def legacy_invoice(main_module, app, client):
+    """A USD invoice saved before the rate table (no currency_rate_id), with
+    a newer USD rate added afterwards; the rate is removed again at the end"""
+    db = main_module.db
+    r = client.post('/api/proforma-invoice/create', json={
+        'invoiceNo': 'PI-LEGACY', 'currency': 'USD',
+        'lineItems': [{'lineNo': 1, 'quantity': 3, 'unitRate': '900', 'total': ''}],
+    })
+    assert r.status_code == 201, r.get_json()
+    invoice_id = r.get_json()['id']
+    db.session.execute(text('UPDATE proforma_invoice SET currency_rate_id = NULL WHERE id = :id'),
+                       {'id': invoice_id})
+    db.session.commit()
+
+    r = client.post('/api/currency-rates', json={'currency': 'USD', 'rate': '100',
+                                                 'effectiveFrom': '2020-01-01T00:00:00'})
+    assert r.status_code == 201, r.get_json()
+    rate_id = r.get_json()['id']
+    yield invoice_id, rate_id
+
+    db.session.rollback()
+    db.session.execute(text('DELETE FROM proforma_invoice WHERE id = :id'), {'id': invoice_id})
+    db.session.execute(text('DELETE FROM currency_rate WHERE id = :id'), {'id': rate_id})
+    db.session.commit()
+    main_module.rate_book.invalidate()
+
+
+def _invoice(main_module, invoice_id):
+    main_module.db.session.expire_all()
+    return main_module.db.session.get(main_module.ProformaInvoice, invoice_id)
+
+
+def test_legacy_invoice_prints_at_the_default_rate(main_module, legacy_invoice):
+    invoice_id, _ = legacy_invoice
+    invoice = _invoice(main_module, invoice_id)
+    assert invoice.currency_rate_id is None
+    assert main_module._invoice_rate(invoice).divisor == DEFAULT_RATES['USD']
+
+    invoice.advance_amount = '9.00'
+    data = main_module._proforma_invoice_print_data(invoice)
+    assert data['advance_amount_display'] == f"{9 / float(DEFAULT_RATES['USD']):.2f}"
+    main_module.db.session.rollback()
+
+
+def test_legacy_invoice_is_patched_at_the_default_rate(main_module, client, legacy_invoice):
+    invoice_id, _ = legacy_invoice
+    r = client.patch(f'/api/proforma-invoice/{invoice_id}', json=[
+        {'op': 'add', 'path': '/lineItems/-', 'value': {'lineNo': 2, 'quantity': 1, 'unitRate': '1800'}},
+    ])
+    assert r.status_code == 200, r.get_json()
+
+    invoice = _invoice(main_module, invoice_id)
+    # 3 x 900 / 90 + 1800 / 90, not the newer rate of 100
+    assert [line['total'] for line in invoice.line_items] == ['30.00', '20.00']
+    assert invoice.total_amount == '50.00'
+
+
+def test_revalue_takes_legacy_invoices_from_the_default_rate(main_module, client, legacy_invoice):
+    invoice_id, rate_id = legacy_invoice
+    r = client.post('/api/currency-rates/revalue', json={'currency': 'USD', 'rateId': rate_id})
+    assert r.status_code == 200, r.get_json()
+
+    invoice = _invoice(main_module, invoice_id)
+    assert invoice.currency_rate_id == rate_id
+    assert invoice.line_items[0]['total'] == '27.00'      # 2700 INR at 100
+    assert invoice.total_amount == '27.00'
+
+
+def test_migration_pins_legacy_invoices_to_the_seeded_rate(main_module, legacy_invoice):
+    invoice_id, rate_id = legacy_invoice
+    updated_at = _invoice(main_module, invoice_id).updated_at
+    main_module._pin_legacy_invoice_rates(main_module.db.session)
+
+    invoice = _invoice(main_module, invoice_id)
+    assert invoice.currency_rate_id not in (None, rate_id)
+    assert invoice.updated_at == updated_at
+    rate = main_module.rate_book.get(invoice.currency_rate_id)
+    assert (rate.currency, rate.divisor) == ('USD', DEFAULT_RATES['USD'])
+
+
+def test_new_rate_drops_rendered_invoices(main_module, client, legacy_invoice):
+    invoice_id, _ = legacy_invoice
+    client.get(f'/proforma_invoice/print/{invoice_id}')
+    assert any(key[0] == 'proforma_invoice' for key in main_module.print_cache._entries)
+
+    r = client.post('/api/currency-rates', json={'currency': 'KWD', 'rate': '290',
+                                                 'effectiveFrom': '2999-01-01T00:00:00'})
+    assert r.status_code == 201
+    assert not any(key[0] == 'proforma_invoice' for key in main_module.print_cache._entries)
+    main_module.db.session.execute(text('DELETE FROM currency_rate WHERE id = :id'), {'id': r.get_json()['id']})
+    main_module.db.session.commit()
@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, text
+
+from sqlite_profile import PROFILES, is_file_database, pool_options_from_env
+
+
+def test_file_database_gets_pool_options(tmp_path):
+    url = 'sqlite:///' + str(tmp_path / 'app.db').replace('\\', '/')
+    options = pool_options_from_env({'DB_POOL_SIZE': '3'}, PROFILES['production'], url)
+    assert options['pool_size'] == 3
+    assert options['connect_args'] == {'timeout': 5.0, 'check_same_thread': False}
+    engine = create_engine(url, **options)
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT 1')).scalar() == 1
+    engine.dispose()
+
+
+def test_in_memory_database_keeps_defaults():
+    for url in ('sqlite://', 'sqlite:///:memory:', 'sqlite:///file:db?mode=memory&uri=true'):
+        assert not is_file_database(url)
+        options = pool_options_from_env({}, PROFILES['production'], url)
+        assert options == {}
+        engine = create_engine(url, **options)
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT 1')).scalar() == 1
+        engine.dispose()
+
+
+def test_other_backends_keep_defaults():
+    assert pool_options_from_env({}, PROFILES['production'], 'postgresql://user@localhost/forms') == {}
@@ -1,51 +1,112 @@
+import argparse
+import hashlib
 import os
-import urllib.request
-import urllib.error
 import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
+CDN_BASE_URL = "https://cdn.jsdelivr.net"
 
+# (url, destination, pinned SHA-256 of the file)
 ASSETS = [
     (
-        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+        CDN_BASE_URL + "/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
         os.path.join("static", "vendor", "bootstrap", "bootstrap.min.css"),
+        "3c8f27e6009ccfd710a905e6dcf12d0ee3c6f2ac7da05b0572d3e0d12e736fc8",
     ),
     (
-        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+        CDN_BASE_URL + "/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
         os.path.join("static", "vendor", "bootstrap", "bootstrap.bundle.min.js"),
+        "0833b2e9c3a26c258476c46266e6877fc75218625162e0460be9a3a098a61c6c",
     ),
 ]
 
 
-def _download(url: str, dest_path: str) -> None:
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download(url: str, dest_path: str, sha256: str, timeout: float) -> None:
     try:
-        with urllib.request.urlopen(url) as r:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
             data = r.read()
-        with open(dest_path, "wb") as f:
-            f.write(data)
     except (urllib.error.URLError, urllib.error.HTTPError, OSError) as e:
         raise RuntimeError(f"Failed to download {url} -> {dest_path}: {e}")
 
+    actual = hashlib.sha256(data).hexdigest()
+    if actual != sha256:
+        raise RuntimeError(f"Checksum mismatch for {url}: expected {sha256}, got {actual}")
 
-def main() -> None:
-    root = os.path.dirname(os.path.abspath(__file__))
+    # Written next to the destination and renamed, so a failed run never
+    # leaves a truncated file behind
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = dest_path + ".part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, dest_path)
+    except OSError as e:
+        raise RuntimeError(f"Failed to write {dest_path}: {e}")
 
-    failures = 0
-    for url, rel_dest in ASSETS:
-        abs_dest = os.path.join(root, rel_dest)
+
+def fetch(url: str, dest_path: str, sha256: str, timeout: float = 30.0) -> str:
+    """Download ``url`` unless ``dest_path`` already has the pinned hash.
+
+    Returns "cached" or "downloaded"; raises RuntimeError on a network
+    error or a checksum mismatch.
+    """
+    if os.path.isfile(dest_path) and _sha256_file(dest_path) == sha256:
+        return "cached"
+    _download(url, dest_path, sha256, timeout)
+    return "downloaded"
+
+
+def fetch_all(assets, root: str, base_url: str = CDN_BASE_URL, workers: int = 4, timeout: float = 30.0):
+    """Fetch every asset concurrently.
+
+    ``base_url`` replaces the CDN origin, e.g. a local mirror or test server.
+    Returns a list of (relative destination, status or RuntimeError).
+    """
+
+    def _one(asset):
+        url, rel_dest, sha256 = asset
+        if base_url != CDN_BASE_URL and url.startswith(CDN_BASE_URL):
+            url = base_url.rstrip("/") + url[len(CDN_BASE_URL):]
         try:
-            _download(url, abs_dest)
+            return rel_dest, fetch(url, os.path.join(root, rel_dest), sha256, timeout)
         except RuntimeError as e:
-            failures += 1
-            print(str(e), file=sys.stderr)
-            continue
+            return rel_dest, e
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(_one, assets))
 
-        if not os.path.exists(abs_dest) or os.path.getsize(abs_dest) == 0:
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Download the pinned vendor assets into static/vendor")
+    parser.add_argument("--base-url", default=os.environ.get("VENDOR_BASE_URL") or CDN_BASE_URL,
+                        help="origin to fetch from instead of the CDN")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+
+    failures = 0
+    for rel_dest, status in fetch_all(ASSETS, root, args.base_url, args.workers, args.timeout):
+        if isinstance(status, RuntimeError):
             failures += 1
-            print(f"Download produced an empty file: {rel_dest}", file=sys.stderr)
+            print(str(status), file=sys.stderr)
             continue
-
-        print(f"Saved: {rel_dest} ({os.path.getsize(abs_dest)} bytes)")
+        abs_dest = os.path.join(root, rel_dest)
+        if status == "cached":
+            print(f"Up to date: {rel_dest}")
+        else:
+            print(f"Saved: {rel_dest} ({os.path.getsize(abs_dest)} bytes)")
 
     if failures:
         raise SystemExit(1)
@@ -7,11 +7,11 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # Import the Flask app
-from main import app, db
+from main import app, init_database
 
-# Create database tables if they don't exist
+# Create or upgrade the database (see MIGRATIONS in main.py)
 with app.app_context():
-    db.create_all()
+    init_database()
 
 # PythonAnywhere will look for the 'application' variable
 application = app